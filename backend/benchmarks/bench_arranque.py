@@ -0,0 +1,88 @@
+# benchmarks/bench_arranque.py
+"""
+Tiempo de arranque: importación de `main` en un intérprete limpio (mediana de
+varias repeticiones, con los módulos más caros según -X importtime) y
+duración de cada fase del calentamiento (necesita MySQL y Mongo accesibles).
+
+Uso (desde backend/):
+    python benchmarks/bench_arranque.py --repeticiones 5
+    python benchmarks/bench_arranque.py --sin-calentamiento
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+_SONDA = (
+    "import time, sys; t0 = time.perf_counter(); import main; "
+    "print(time.perf_counter() - t0); "
+    "print(','.join(m for m in ('pandas', 'pgmpy', 'numpy') if m in sys.modules))"
+)
+
+
+def tiempo_importacion(repeticiones: int):
+    tiempos, pesados = [], ""
+    for _ in range(repeticiones):
+        out = subprocess.run(
+            [sys.executable, "-c", _SONDA], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.split("\n")
+        tiempos.append(float(out[0]))
+        pesados = out[1]
+    return statistics.median(tiempos), pesados
+
+
+def modulos_mas_caros(n: int = 10):
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    ).stderr
+    filas = []
+    for linea in err.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        partes = linea.split("|")
+        try:
+            propio = int(partes[0].split(":")[1])
+        except ValueError:
+            continue  # cabecera
+        filas.append((propio, partes[2].strip()))
+    return sorted(filas, reverse=True)[:n]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=5)
+    ap.add_argument("--sin-calentamiento", action="store_true")
+    args = ap.parse_args()
+
+    t_imp, pesados = tiempo_importacion(args.repeticiones)
+    print(f"import main: {t_imp * 1e3:.1f} ms (mediana de {args.repeticiones})")
+    print(f"módulos pesados ya importados: {pesados or 'ninguno'}")
+    print("módulos más caros (tiempo propio):")
+    for us, nombre in modulos_mas_caros():
+        print(f"  {us / 1e3:8.1f} ms  {nombre}")
+
+    if args.sin_calentamiento:
+        return
+
+    os.chdir(BACKEND)  # las rutas de las configs son relativas a backend/
+    from servicios import arranque
+
+    t0 = time.perf_counter()
+    estado = arranque.calentar()
+    total = time.perf_counter() - t0
+    print(f"calentamiento: {total * 1e3:.1f} ms  listo={estado['listo']}")
+    for fase, seg in estado["tiempos"].items():
+        print(f"  {fase:<20}{seg * 1e3:10.1f} ms")
+    if estado["error"]:
+        print(f"  error: {estado['error']}")
+
+
+if __name__ == "__main__":
+    main()
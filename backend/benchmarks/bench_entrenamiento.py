@@ -0,0 +1,98 @@
+# benchmarks/bench_entrenamiento.py
+"""
+Tiempo de entrenamiento de naive_bayes (entrenar_modelos + instantánea) a
+tamaños de catálogo crecientes, frente a la referencia de antes: un
+groupby por atributo y red sobre una copia de la tabla.
+
+Con --repetidas R cada personaje aparece en R filas (el conteo por
+personaje deja de ser la propia tabla). Comprueba que las tablas
+coinciden con la referencia.
+
+Uso (desde backend/):
+    python benchmarks/bench_entrenamiento.py --tamanos 1000,10000,100000
+    python benchmarks/bench_entrenamiento.py --tamanos 200000 --sin-referencia
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("ADIVINADOR_LOG_MUESTREO", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+from servicios import naive_bayes  # noqa: E402
+from servicios.naive_bayes import ALPHA, EPS  # noqa: E402
+
+
+def _referencia(df, rutas_config):
+    """Entrenamiento anterior: fillna/astype de toda la tabla y un groupby por atributo."""
+    df = df.copy()
+    df["personaje"] = df["nombre"]
+    bin_cols = [c for c in df.columns if c not in ("personaje", "nombre", "id")]
+    df[bin_cols] = df[bin_cols].fillna(0).astype(int)
+    personajes = list(df["personaje"].astype(str).unique())
+    modelos = {}
+    for red, ruta in rutas_config.items():
+        attrs = [a for a in naive_bayes._cargar_config(ruta) if a in df.columns]
+        sub = df[["personaje"] + attrs]
+        n_p = sub["personaje"].value_counts().reindex(personajes, fill_value=0).astype(float)
+        prior = (n_p + ALPHA) / (float(n_p.sum()) + ALPHA * len(personajes))
+        attr_logs = {}
+        for a in attrs:
+            unos = sub.groupby("personaje")[a].sum().reindex(personajes, fill_value=0).astype(float)
+            p1 = (unos + ALPHA) / (n_p + 2.0 * ALPHA)
+            attr_logs[a] = {1: np.log(np.clip(p1.values, EPS, None)), 0: np.log(np.clip(1.0 - p1.values, EPS, None))}
+        modelos[red] = {"personajes": personajes, "prior_log": np.log(np.clip(prior.values, EPS, None)),
+                        "attr_logs": attr_logs, "attrs": attrs}
+    return modelos
+
+
+def _diferencia(a: dict, b: dict) -> float:
+    d = 0.0
+    for red, m in a.items():
+        d = max(d, float(np.max(np.abs(m["prior_log"] - b[red]["prior_log"]))))
+        for attr, logs in m["attr_logs"].items():
+            d = max(d, float(np.max(np.abs(logs[1] - b[red]["attr_logs"][attr][1]))))
+    return d
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tamanos", default="1000,10000,50000", help="personajes por prueba, separados por comas")
+    ap.add_argument("--repetidas", type=int, default=1, help="filas por personaje")
+    ap.add_argument("--sin-referencia", action="store_true")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"{'personajes':>11}{'filas':>9}{'atributos':>11}{'nuevo s':>10}{'instant. s':>12}"
+          f"{'referencia s':>14}{'x':>7}{'Δ máx':>10}")
+    for n in (int(t) for t in args.tamanos.split(",")):
+        df = sintetico.dataframe_sintetico(n, seed=args.seed).drop(columns=["id"])
+        if args.repetidas > 1:
+            rng = np.random.default_rng(args.seed)
+            df = df.loc[df.index.repeat(args.repetidas)].reset_index(drop=True)
+            cols = df.columns[1:]
+            df[cols] = (rng.random((len(df), len(cols))) < 0.2).astype(np.int8)
+
+        t0 = time.perf_counter()
+        modelos = naive_bayes.entrenar_modelos(df, naive_bayes.RUTAS_CONFIG)
+        t_nuevo = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        snap = naive_bayes.Instantanea.desde_modelos(modelos)
+        t_snap = time.perf_counter() - t0
+
+        fila = (f"{n:>11}{len(df):>9}{len(snap.matrices['attrs']):>11}"
+                f"{t_nuevo:>10.3f}{t_snap:>12.3f}")
+        if not args.sin_referencia:
+            t0 = time.perf_counter()
+            ref = _referencia(df, naive_bayes.RUTAS_CONFIG)
+            t_ref = time.perf_counter() - t0
+            fila += f"{t_ref:>14.3f}{t_ref / t_nuevo:>7.1f}{_diferencia(ref, modelos):>10.1e}"
+        print(fila)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_fragmentos.py
+"""
+Inferencia repartida (servicios/fragmentos) con varios procesos locales
+haciendo de nodos, frente al modelo entero en un solo proceso.
+
+Reparte las columnas de los modelos sintéticos entre N nodos (personaje
+i -> nodo i % N), arranca cada nodo en su proceso y, para varios estados de
+partida, compara con igv.estado_posterior + igv.ganancias sobre todo:
+top-k, probabilidades, ganancia de cada candidato y atributo elegido.
+También comprueba el modo estricto (filtrando las columnas a mano).
+
+Cada nodo hace unas 1,6 veces el trabajo por columna del proceso único (las
+rondas recalculan en lugar de guardar estado): la latencia baja con nodos en
+máquinas o núcleos distintos, no con varios procesos en un solo núcleo.
+
+Uso (desde backend/):
+    python benchmarks/bench_fragmentos.py --personajes 200000 --nodos 1 2 4
+"""
+import argparse
+import os
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+from servicios import fragmentos  # noqa: E402
+from servicios import ig_vectorizado as igv  # noqa: E402
+
+CLAVE = b"bench-fragmentos"
+
+
+def _nodo(matrices: dict, puerto: int) -> None:
+    frag = fragmentos.Fragmento(matrices)
+    fragmentos.servir(fragmentos.Nodo(lambda: frag), ("127.0.0.1", puerto), CLAVE)
+
+
+def _referencia(m: dict, evidencia, idx: np.ndarray, k: int):
+    estado = igv.estado_posterior(m["log1"], m["log0"], m["red"], m["prior_log"], evidencia)
+    i, p = igv.top_k(estado["probs"], k)
+    gain, h0, h1, p1 = igv.ganancias(m["log1"], m["log0"], m["red"], estado, idx)
+    return [(m["personajes"][j], float(q)) for j, q in zip(i, p)], gain
+
+
+def _arrancar(ctx, m: dict, n: int, puerto: int):
+    procesos = []
+    for f in range(n):
+        cols = np.arange(f, len(m["personajes"]), n)
+        p = ctx.Process(target=_nodo, args=(igv.restringir(m, cols), puerto + f), daemon=True)
+        p.start()
+        procesos.append(p)
+    direcciones = [("127.0.0.1", puerto + f) for f in range(n)]
+    t0 = time.time()
+    while True:  # espera a que escuchen todos
+        try:
+            coord = fragmentos.Coordinador(direcciones, CLAVE)
+            coord.cargar(1)
+            return coord, procesos
+        except (ConnectionError, OSError):
+            if time.time() - t0 > 120:
+                raise
+            time.sleep(0.2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=50000)
+    ap.add_argument("--repetir", type=int, default=1, help="multiplica el nº de atributos por red")
+    ap.add_argument("--nodos", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--estados", type=int, default=10)
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--puerto", type=int, default=7300)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    sint = sintetico.modelos_sinteticos(args.personajes, repetir=args.repetir, seed=args.seed)
+    m = igv.construir_matrices(sint["modelos"])
+    rng = np.random.default_rng(args.seed)
+    estados = []
+    for i in range(args.estados):
+        n = int(rng.integers(0, 12))
+        respuestas = sintetico.respuestas_de(int(rng.integers(args.personajes)), sint, n=n, seed=i) if n else {}
+        evidencia = igv.codificar_respuestas(m["indice"], respuestas)
+        idx = np.asarray(sorted(m["indice"][a] for a in m["attrs"] if a not in respuestas), dtype=np.int64)
+        estados.append((evidencia, idx))
+
+    t_ref, referencias = [], []
+    for evidencia, idx in estados:
+        t0 = time.perf_counter()
+        referencias.append(_referencia(m, evidencia, idx, args.top))
+        t_ref.append(time.perf_counter() - t0)
+    print(f"personajes={args.personajes} atributos={len(m['attrs'])} estados={len(estados)}")
+    print(f"\n{'modo':<14}{'p50 ms':>9}{'máx ms':>9}{'Δ prob':>10}{'Δ ganancia':>12}{'top igual':>11}{'elegido':>9}")
+    ms = np.asarray(t_ref) * 1e3
+    print(f"{'un proceso':<14}{np.percentile(ms, 50):>9.1f}{ms.max():>9.1f}")
+
+    ctx = get_context("spawn")
+    for n in args.nodos:
+        coord, procesos = _arrancar(ctx, m, n, args.puerto)
+        try:
+            tiempos, d_prob, d_gain, iguales, elegidos = [], 0.0, 0.0, 0, 0
+            for (evidencia, idx), (top_ref, gain_ref) in zip(estados, referencias):
+                t0 = time.perf_counter()
+                top, g = coord.consultar(1, evidencia, idx, args.top)
+                tiempos.append(time.perf_counter() - t0)
+                d_prob = max(d_prob, max(abs(p - q) for (_, p), (_, q) in zip(top, top_ref)))
+                d_gain = max(d_gain, float(np.max(np.abs(g["ganancia"] - gain_ref))))
+                # Con empates exactos el orden puede cambiar entre nodos: se comparan las probabilidades
+                iguales += np.allclose([p for _, p in top], [p for _, p in top_ref], rtol=0, atol=1e-12)
+                elegidos += (igv.mejor_candidato(idx, g["ganancia"]) == igv.mejor_candidato(idx, gain_ref))
+            ms = np.asarray(tiempos) * 1e3
+            print(f"{f'{n} nodos':<14}{np.percentile(ms, 50):>9.1f}{ms.max():>9.1f}{d_prob:>10.1e}"
+                  f"{d_gain:>12.1e}{iguales:>8}/{len(estados)}{elegidos:>6}/{len(estados)}")
+
+            # Modo estricto: cada nodo filtra sus columnas; referencia con las columnas filtradas a mano
+            evidencia, idx = max(estados, key=lambda e: len(e[0]))
+            uno = m["log1"] > m["log0"]
+            cols = np.flatnonzero(np.all([uno[i] == bool(v) for i, v in evidencia], axis=0))
+            if 0 < len(cols) < len(m["personajes"]):
+                top_ref, gain_ref = _referencia(igv.restringir(m, cols), evidencia, idx, args.top)
+                top, g = coord.consultar(1, evidencia, idx, args.top, estricto=True)
+                print(f"{'':<14}estricto: consistentes={coord.contar(1, evidencia)} ({len(cols)})"
+                      f"  Δ ganancia={float(np.max(np.abs(g['ganancia'] - gain_ref))):.1e}"
+                      f"  top igual={np.allclose([p for _, p in top], [p for _, p in top_ref], rtol=0, atol=1e-12)}")
+        finally:
+            for p in procesos:
+                p.terminate()
+            args.puerto += n
+
+
+if __name__ == "__main__":
+    main()
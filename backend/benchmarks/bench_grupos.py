@@ -0,0 +1,115 @@
+# benchmarks/bench_grupos.py
+"""
+Partidas simuladas con y sin grupos categóricos (config.IG_GRUPOS).
+
+Genera una tabla sintética en la que las familias declaradas como "grupos"
+en bayes_tematica (especie, origen, género) son one-hot de verdad (o todo
+0 con probabilidad --ninguno), entrena el motor naive_bayes con las configs
+reales y juega partidas contra personajes al azar contestando siempre la
+verdad: una pregunta de grupo se contesta con la opción del personaje.
+La partida acaba al proponer (top-1 >= 0.5) o al llegar a --max-turnos.
+
+Compara turnos por partida, aciertos, ms por turno y trabajo de ganancia de
+información por turno: posteriors hipotéticos calculados (2 por atributo
+suelto, miembros + 1 por grupo).
+
+Uso (desde backend/):
+    python benchmarks/bench_grupos.py --personajes 5000 --partidas 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+import config  # noqa: E402
+from servicios import ig_vectorizado as igv  # noqa: E402
+from servicios import naive_bayes  # noqa: E402
+
+TRABAJO = {"posteriores": 0}
+
+
+def _contar(fn, coste):
+    def envoltura(*args, **kwargs):
+        TRABAJO["posteriores"] += coste(*args, **kwargs)
+        return fn(*args, **kwargs)
+    return envoltura
+
+
+def _tabla(n: int, ninguno: float, seed: int):
+    """Tabla sintética con los grupos de las configs convertidos en one-hot."""
+    df = sintetico.dataframe_sintetico(n, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    grupos = []
+    for ruta in naive_bayes.RUTAS_CONFIG.values():
+        grupos += [g["atributos"] for g in naive_bayes._cargar_grupos(ruta)]
+    for attrs in grupos:
+        # Categorías con frecuencias desiguales (como en el catálogo real: muchos humanos)
+        pesos = rng.dirichlet(np.full(len(attrs), 0.7))
+        elegido = rng.choice(len(attrs), size=n, p=pesos)
+        elegido[rng.random(n) < ninguno] = -1
+        for j, a in enumerate(attrs):
+            df[a] = (elegido == j).astype(np.int8)
+    return df, grupos
+
+
+def _jugar(snap, df, objetivo: int, max_turnos: int):
+    fila = df.iloc[objetivo]
+    respuestas, turnos, tiempo = {}, 0, 0.0
+    while turnos < max_turnos:
+        t0 = time.perf_counter()
+        personajes, probs, mejor = naive_bayes.turno(respuestas, (), None, snap=snap)
+        tiempo += time.perf_counter() - t0
+        top = int(np.argmax(probs))
+        if probs[top] >= 0.5 or mejor is None:
+            return turnos, personajes[top] == fila["nombre"], tiempo
+        turnos += 1
+        if mejor.get("tipo") == "grupo":
+            miembros = [o["atributo"] for o in mejor["opciones"] if o["atributo"]]
+            respuestas.update({a: int(fila[a]) for a in miembros})
+        else:
+            respuestas[mejor["atributo"]] = int(fila[mejor["atributo"]])
+    return turnos, False, tiempo
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=5000)
+    ap.add_argument("--partidas", type=int, default=200)
+    ap.add_argument("--max-turnos", type=int, default=40)
+    ap.add_argument("--ninguno", type=float, default=0.1, help="fracción sin ninguna opción de cada grupo")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    df, grupos = _tabla(args.personajes, args.ninguno, args.seed)
+    modelos = naive_bayes.entrenar_modelos(df.drop(columns=["id"]), naive_bayes.RUTAS_CONFIG)
+    snap = naive_bayes.Instantanea.desde_modelos(modelos)
+    print(f"personajes={args.personajes} atributos={len(snap.matrices['attrs'])} "
+          f"grupos={ {g: len(v['atributos']) for g, v in snap.matrices['grupos'].items()} } partidas={args.partidas}")
+
+    igv.ganancias = _contar(igv.ganancias, lambda *a, **k: 2 * len(a[4]))
+    igv.ganancia_grupo = _contar(igv.ganancia_grupo, lambda *a, **k: len(a[4]) + 1)
+    config.IG_EJECUTOR = "local"  # el recuento sólo ve las llamadas de este proceso
+
+    objetivos = np.random.default_rng(args.seed).choice(args.personajes, size=args.partidas, replace=False)
+    print(f"\n{'modo':<14}{'turnos':>8}{'p90':>6}{'aciertos':>10}{'ms/turno':>10}{'posteriors/turno':>18}")
+    for modo, activo in (("atributos", False), ("grupos", True)):
+        config.IG_GRUPOS = activo
+        TRABAJO["posteriores"] = 0
+        turnos, aciertos, tiempo = [], 0, 0.0
+        for o in objetivos:
+            n, ok, t = _jugar(snap, df, int(o), args.max_turnos)
+            turnos.append(n)
+            aciertos += ok
+            tiempo += t
+        total = max(1, sum(turnos) + len(turnos))  # + el turno final (propuesta)
+        print(f"{modo:<14}{np.mean(turnos):>8.2f}{np.percentile(turnos, 90):>6.0f}"
+              f"{aciertos:>7}/{len(turnos)}{tiempo / total * 1e3:>10.2f}{TRABAJO['posteriores'] / total:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_ig_paralelo.py
+"""
+Escalado de la ganancia de información y de la inferencia por lotes con el
+pool de procesos (memoria compartida) frente al modo local.
+
+Uso (desde backend/):
+    python benchmarks/bench_ig_paralelo.py --personajes 20000 --repetir 4 --procesos 1 2 4 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+from servicios import ig_paralelo  # noqa: E402
+from servicios.ig_vectorizado import construir_matrices, mejor_candidato  # noqa: E402
+
+
+def _medir(fn, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=20000)
+    ap.add_argument("--repetir", type=int, default=4, help="multiplica el nº de atributos por red")
+    ap.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--lote", type=int, default=256, help="partidas por llamada de inferencia por lotes")
+    ap.add_argument("--repeticiones", type=int, default=5)
+    args = ap.parse_args()
+
+    sint = sintetico.modelos_sinteticos(args.personajes, repetir=args.repetir)
+    matrices = construir_matrices(sint["modelos"])
+    respuestas = sintetico.respuestas_de(0, sint, n=5)
+    candidatos = [a for a in matrices["attrs"] if a not in respuestas]
+    lote = [sintetico.respuestas_de(i % args.personajes, sint, n=8, seed=i) for i in range(args.lote)]
+
+    print(f"personajes={args.personajes} atributos={len(matrices['attrs'])} candidatos={len(candidatos)}")
+
+    def ig(ejecutor, procesos):
+        attrs, gain, *_ = ig_paralelo.evaluar_candidatos(
+            matrices, 1, respuestas, candidatos, ejecutor=ejecutor, procesos=procesos
+        )
+        return attrs[mejor_candidato([matrices["indice"][a] for a in attrs], gain)]
+
+    def lt(ejecutor, procesos):
+        return ig_paralelo.inferir_lote(matrices, 1, lote, 5, ejecutor=ejecutor, procesos=procesos)
+
+    ref_attr = ig("local", 1)
+    t_ig_local = _medir(lambda: ig("local", 1), args.repeticiones)
+    t_lote_local = _medir(lambda: lt("local", 1), args.repeticiones)
+    print(f"{'modo':<14}{'IG (ms)':>10}{'x':>7}{'lote (ms)':>12}{'x':>7}")
+    print(f"{'local':<14}{t_ig_local * 1e3:>10.1f}{1.0:>7.2f}{t_lote_local * 1e3:>12.1f}{1.0:>7.2f}")
+
+    for n in args.procesos:
+        ig_paralelo.cerrar_pool()
+        # calentamiento: arranque de procesos + adjuntar la memoria compartida
+        attr = ig("procesos", n)
+        lt("procesos", n)
+        assert attr == ref_attr, f"resultado distinto con {n} procesos: {attr} != {ref_attr}"
+        t_ig = _medir(lambda: ig("procesos", n), args.repeticiones)
+        t_lote = _medir(lambda: lt("procesos", n), args.repeticiones)
+        print(f"{'procesos=' + str(n):<14}{t_ig * 1e3:>10.1f}{t_ig_local / t_ig:>7.2f}"
+              f"{t_lote * 1e3:>12.1f}{t_lote_local / t_lote:>7.2f}")
+
+    ig_paralelo.cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
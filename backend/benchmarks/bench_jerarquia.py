@@ -0,0 +1,134 @@
+# benchmarks/bench_jerarquia.py
+"""
+Posterior plano frente a jerárquico (servicios/jerarquia).
+
+Genera un catálogo sintético de --personajes a partir de --arquetipos
+perfiles con --ruido bits cambiados al azar (como un catálogo real, con
+muchos personajes casi iguales; --arquetipos 0 = filas aleatorias, el peor
+caso para la jerarquía), entrena el formato de naive_bayes y juega las
+mismas partidas guiadas por ganancia de información con la jerarquía
+apagada y encendida (config.JERARQUIA_TOLERANCIA).
+
+Compara ms por turno, turnos, aciertos y, turno a turno, la variación total
+medida frente al posterior exacto con la cota que devuelve la jerarquía.
+
+Uso (desde backend/):
+    python benchmarks/bench_jerarquia.py --personajes 200000 --arquetipos 3000 --partidas 20
+    python benchmarks/bench_jerarquia.py --personajes 50000 --arquetipos 0 --tolerancia 0.01
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("ADIVINADOR_LOG_MUESTREO", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+import config  # noqa: E402
+from servicios import ig_vectorizado as igv  # noqa: E402
+from servicios import naive_bayes  # noqa: E402
+
+
+def _catalogo(n: int, arquetipos: int, ruido: float, seed: int):
+    """(instantánea, matriz real personajes x attrs) con perfiles repetidos."""
+    rng = np.random.default_rng(seed)
+    grupos = sintetico.atributos_por_red(1)
+    todos = [a for attrs in grupos.values() for a in attrs]
+    if arquetipos:
+        perfiles = rng.random((arquetipos, len(todos))) < 0.2
+        x = perfiles[rng.integers(arquetipos, size=n)] ^ (rng.random((n, len(todos))) < ruido)
+    else:
+        x = rng.random((n, len(todos))) < 0.2
+    x = x.astype(np.int8)
+    p1 = (x + sintetico.ALPHA) / (1.0 + 2.0 * sintetico.ALPHA)
+    log1, log0 = np.log(p1), np.log(1.0 - p1)
+    personajes = [f"personaje_{i}" for i in range(n)]
+    prior_log = np.full(n, -np.log(n))
+    modelos, col = {}, 0
+    for red, attrs in grupos.items():
+        modelos[red] = {
+            "personajes": personajes,
+            "prior_log": prior_log,
+            "attr_logs": {a: {1: log1[:, col + j].copy(), 0: log0[:, col + j].copy()} for j, a in enumerate(attrs)},
+            "attrs": attrs,
+        }
+        col += len(attrs)
+    return naive_bayes.Instantanea.desde_modelos(modelos), x
+
+
+def _jugar(snap, x, objetivo: int, max_turnos: int, medir: bool):
+    """(turnos, acierto, segundos, [(tv, cota)], primera pregunta)."""
+    m = snap.matrices
+    respuestas, turnos, tiempo, errores, primera = {}, 0, 0.0, [], None
+    while True:
+        t0 = time.perf_counter()
+        personajes, probs, mejor = naive_bayes.turno(respuestas, (), None, snap=snap)
+        tiempo += time.perf_counter() - t0
+        if medir:
+            exacto = igv.estado_posterior(m["log1"], m["log0"], m["red"], m["prior_log"],
+                                          igv.codificar_respuestas(m["indice"], respuestas))["probs"]
+            _, res, _ = naive_bayes._posterior_jerarquico(respuestas, snap)
+            errores.append((0.5 * float(np.abs(probs - exacto).sum()), res["error"]))
+        top = int(np.argmax(probs))
+        if probs[top] >= 0.5 or mejor is None or turnos >= max_turnos:
+            return turnos, probs[top] >= 0.5 and top == objetivo, tiempo, errores, primera
+        turnos += 1
+        primera = primera or mejor["atributo"]
+        respuestas[mejor["atributo"]] = int(x[objetivo, m["indice"][mejor["atributo"]]])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=100000)
+    ap.add_argument("--arquetipos", type=int, default=2000, help="perfiles distintos (0 = filas aleatorias)")
+    ap.add_argument("--ruido", type=float, default=0.02, help="fracción de bits cambiados respecto al perfil")
+    ap.add_argument("--tolerancia", type=float, default=1e-3)
+    ap.add_argument("--hoja", type=int, default=config.JERARQUIA_HOJA)
+    ap.add_argument("--partidas", type=int, default=20)
+    ap.add_argument("--max-turnos", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    config.IG_EJECUTOR = "local"
+    config.IG_GRUPOS = False  # el catálogo sintético no respeta los grupos one-hot
+    config.JERARQUIA_MIN_PERSONAJES = 0
+    config.JERARQUIA_HOJA = args.hoja
+
+    t0 = time.perf_counter()
+    snap, x = _catalogo(args.personajes, args.arquetipos, args.ruido, args.seed)
+    print(f"personajes={args.personajes} atributos={len(snap.matrices['attrs'])} "
+          f"arquetipos={args.arquetipos} ruido={args.ruido} ({time.perf_counter() - t0:.1f}s)")
+
+    config.JERARQUIA_TOLERANCIA = args.tolerancia
+    t0 = time.perf_counter()
+    indice = naive_bayes._jerarquia(snap)
+    print(f"jerarquía: {indice.nodos} nodos, hoja={args.hoja}, construida en {time.perf_counter() - t0:.2f}s")
+
+    objetivos = np.random.default_rng(args.seed).choice(args.personajes, size=args.partidas, replace=False)
+    print(f"\n{'modo':<12}{'turnos':>8}{'aciertos':>10}{'ms/turno':>10}{'tv max':>10}{'cota max':>10}")
+    primeras = {}
+    for modo, tolerancia in (("plano", 0.0), ("jerarquico", args.tolerancia)):
+        config.JERARQUIA_TOLERANCIA = tolerancia
+        turnos, aciertos, tiempo, errores, primeras[modo] = [], 0, 0.0, [], []
+        for o in objetivos:
+            n, ok, t, e, p = _jugar(snap, x, int(o), args.max_turnos, medir=tolerancia > 0)
+            turnos.append(n)
+            aciertos += ok
+            tiempo += t
+            errores += e
+            primeras[modo].append(p)
+        total = sum(turnos) + len(turnos)
+        tv, cota = (np.max(errores, axis=0) if errores else (0.0, 0.0))
+        print(f"{modo:<12}{np.mean(turnos):>8.2f}{aciertos:>7}/{len(turnos)}{tiempo / total * 1e3:>10.2f}"
+              f"{tv:>10.1e}{cota:>10.1e}")
+        if errores and any(a > b + 1e-9 for a, b in errores):
+            print("  ¡la variación total supera la cota en algún turno!")
+    iguales = sum(a == b for a, b in zip(primeras["plano"], primeras["jerarquico"]))
+    print(f"\nprimera pregunta igual en {iguales}/{len(objetivos)} partidas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_partidas.py
+"""
+Tamaño y coste de agregación de `partidas` en formato original frente al
+compacto (servicios/partidas_compactas), sobre los sustitutos en proceso de
+MySQL (SQLite, para los ids de personaje) y Mongo.
+
+1. Inserta N partidas sintéticas en el formato original.
+2. Mide la agregación de la analítica de fallos (analitica_fallos.contar
+   sobre la lectura de las partidas fallidas) y el listado de 50 partidas.
+3. Migra con partidas_compactas.migrar (bytes BSON antes/después).
+4. Repite 2 sobre las partidas compactas y comprueba que los contadores y
+   los listados decodificados coinciden con los originales.
+
+La escritura de los contadores no se mide: en el sustituto de Mongo cada
+upsert recorre la colección y taparía el resto.
+
+Uso (desde backend/):
+    python benchmarks/bench_partidas.py --partidas 20000 --personajes 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("ADIVINADOR_CALENTAR", "0")
+os.environ.setdefault("ADIVINADOR_LOG_MUESTREO", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sustitutos  # noqa: E402
+
+
+def _partidas(filas, atributos, n, seed):
+    """Partidas con 8-25 respuestas (un 10% "no sé") y un top-5 de personajes reales."""
+    rng = np.random.default_rng(seed)
+    salida = []
+    for k in range(n):
+        real = filas[int(rng.integers(len(filas)))]
+        elegidos = rng.choice(len(atributos), size=int(rng.integers(8, 26)), replace=False)
+        respuestas = {atributos[i]: (None if rng.random() < 0.1 else int(real[atributos[i]])) for i in elegidos}
+        top = [filas[int(i)]["nombre"] for i in rng.choice(len(filas), size=5, replace=False)]
+        probs = np.sort(rng.dirichlet(np.ones(8))[:5])[::-1]
+        acertado = bool(rng.random() < 0.6)
+        salida.append({
+            "respuestas": respuestas,
+            "resultado": [[nombre, float(p)] for nombre, p in zip(top, probs)],
+            "acertado": acertado,
+            "propuesto": top[0],
+            "personaje_real": top[0] if acertado else real["nombre"],
+            "motivo_fallo": None,
+            "timestamp": f"2026-01-01T00:00:{k:09d}",
+        })
+    return salida
+
+
+def _medir(fn, repetir):
+    tiempos = []
+    for _ in range(repetir):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return float(np.median(tiempos)) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--partidas", type=int, default=20000)
+    ap.add_argument("--personajes", type=int, default=2000)
+    ap.add_argument("--repetir", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    env = sustitutos.instalar(args.personajes, seed=args.seed)
+    from rutas import partidas as rutas_partidas
+    from servicios import analitica_fallos, partidas_compactas
+
+    db = env["mongo"]
+    for doc in _partidas(env["personajes"], env["atributos"], args.partidas, args.seed):
+        db["partidas"].insert_one(doc)
+
+    listar = lambda: rutas_partidas.listar_partidas(limit=50)  # noqa: E731
+    agregar = lambda: analitica_fallos.contar(analitica_fallos.partidas_fallidas())  # noqa: E731
+    t_ana_orig = _medir(agregar, args.repetir)
+    leidas = list(analitica_fallos.partidas_fallidas())
+    t_cont_orig = _medir(lambda: analitica_fallos.contar(leidas), args.repetir)
+    ref_contadores = agregar()
+    t_lista_orig = _medir(listar, args.repetir)
+    ref_lista = listar()["partidas"]
+
+    t0 = time.perf_counter()
+    informe = partidas_compactas.migrar()
+    t_migrar = time.perf_counter() - t0
+
+    t_ana_comp = _medir(agregar, args.repetir)
+    leidas = list(analitica_fallos.partidas_fallidas())
+    t_cont_comp = _medir(lambda: analitica_fallos.contar(leidas), args.repetir)
+    iguales = agregar() == ref_contadores
+    t_lista_comp = _medir(listar, args.repetir)
+    lista = listar()["partidas"]
+    max_error = max(abs(p - q) for a, b in zip(ref_lista, lista)
+                    for (_, p), (_, q) in zip(a["resultado"], b["resultado"]))
+    decodifica = all(a["respuestas"] == b["respuestas"]
+                     and [n for n, _ in a["resultado"]] == [n for n, _ in b["resultado"]]
+                     for a, b in zip(ref_lista, lista))
+
+    n = max(1, informe["migradas"])
+    print(f"partidas={args.partidas} migradas={informe['migradas']} en {t_migrar:.2f}s")
+    print(f"bytes/partida: original {informe['bytes_antes'] / n:.0f}  compacta {informe['bytes_despues'] / n:.0f}"
+          f"  (-{informe['reduccion']:.0%})")
+    print(f"\n{'operación':<28}{'original ms':>13}{'compacta ms':>13}{'x':>7}")
+    for nombre, a, b in (("agregar analítica", t_ana_orig, t_ana_comp),
+                         ("  sólo contar (sin lectura)", t_cont_orig, t_cont_comp),
+                         ("listar 50", t_lista_orig, t_lista_comp)):
+        print(f"{nombre:<28}{a:>13.1f}{b:>13.1f}{a / max(b, 1e-9):>7.1f}")
+    print(f"\ncontadores iguales: {iguales}  listado igual: {decodifica}  error máx. prob: {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_plazo.py
+"""
+Pregunta siguiente con plazo ("anytime") frente a la búsqueda exhaustiva.
+
+Para varios estados de partida (0..N respuestas verdaderas de un personaje al
+azar) mide la latencia, la fracción de candidatos evaluados, cuántas veces
+coincide el atributo elegido con el exhaustivo y la pérdida de ganancia
+(ganancia exacta del mejor - ganancia exacta del elegido).
+
+Uso (desde backend/):
+    python benchmarks/bench_plazo.py --personajes 100000 --repetir 4 --plazos 5 20 --masas 1 0.999
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+from servicios import ig_vectorizado as igv  # noqa: E402
+
+
+def _exhaustivo(matrices, respuestas, candidatos):
+    idx = np.asarray(sorted(matrices["indice"][a] for a in candidatos), dtype=np.int64)
+    estado = igv.estado_posterior(matrices["log1"], matrices["log0"], matrices["red"], matrices["prior_log"],
+                                  igv.codificar_respuestas(matrices["indice"], respuestas))
+    gain, *_ = igv.ganancias(matrices["log1"], matrices["log0"], matrices["red"], estado, idx)
+    return {matrices["attrs"][i]: float(g) for i, g in zip(idx, gain)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=20000)
+    ap.add_argument("--repetir", type=int, default=4, help="multiplica el nº de atributos por red")
+    ap.add_argument("--plazos", type=float, nargs="+", default=[5.0, 20.0], help="ms")
+    ap.add_argument("--masas", type=float, nargs="+", default=[1.0, 0.999])
+    ap.add_argument("--estados", type=int, default=20, help="estados de partida a evaluar")
+    ap.add_argument("--max-respuestas", type=int, default=12)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    sint = sintetico.modelos_sinteticos(args.personajes, repetir=args.repetir)
+    matrices = igv.construir_matrices(sint["modelos"])
+    rng = np.random.default_rng(args.seed)
+    estados = []
+    for i in range(args.estados):
+        n = int(rng.integers(0, args.max_respuestas + 1))
+        respuestas = sintetico.respuestas_de(int(rng.integers(args.personajes)), sint, n=n, seed=i) if n else {}
+        candidatos = [a for a in matrices["attrs"] if a not in respuestas]
+        estados.append((respuestas, candidatos))
+
+    print(f"personajes={args.personajes} atributos={len(matrices['attrs'])} estados={len(estados)}")
+    referencia, t_ref = [], []
+    for respuestas, candidatos in estados:
+        t0 = time.perf_counter()
+        gains = _exhaustivo(matrices, respuestas, candidatos)
+        t_ref.append(time.perf_counter() - t0)
+        referencia.append(gains)
+    ms = np.asarray(t_ref) * 1e3
+    print(f"\n{'modo':<22}{'p50 ms':>9}{'p99 ms':>9}{'evaluados':>11}{'coincide':>10}{'pérdida':>10}")
+    print(f"{'exhaustivo':<22}{np.percentile(ms, 50):>9.1f}{np.percentile(ms, 99):>9.1f}"
+          f"{'100%':>11}{'100%':>10}{0.0:>10.4f}")
+
+    for plazo in args.plazos:
+        for masa in args.masas:
+            tiempos, fraccion, aciertos, perdida = [], [], 0, []
+            for (respuestas, candidatos), gains in zip(estados, referencia):
+                t0 = time.perf_counter()
+                attrs, gain, _, _, _, informe = igv.evaluar_con_plazo(
+                    matrices, respuestas, candidatos, plazo / 1000.0, masa)
+                tiempos.append(time.perf_counter() - t0)
+                pos = igv.mejor_candidato([matrices["indice"][a] for a in attrs], gain)
+                elegido = attrs[pos]
+                mejor = max(gains.values())
+                aciertos += gains[elegido] == mejor
+                perdida.append(mejor - gains[elegido])
+                fraccion.append(informe["evaluados"] / max(1, informe["candidatos"]))
+            ms = np.asarray(tiempos) * 1e3
+            print(f"{f'plazo={plazo:g}ms masa={masa:g}':<22}{np.percentile(ms, 50):>9.1f}"
+                  f"{np.percentile(ms, 99):>9.1f}{np.mean(fraccion):>11.0%}"
+                  f"{aciertos / len(estados):>10.0%}{np.mean(perdida):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_similitud.py
+"""
+Coste del índice de similitud (servicios/similitud) con catálogos grandes:
+construcción, grupos indistinguibles (0 y 1), vecinos, colisiones y separadores.
+
+Uso (desde backend/):
+    python benchmarks/bench_similitud.py --personajes 100000 --duplicados 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+import db_sql  # noqa: E402
+from servicios.similitud import IndiceSimilitud  # noqa: E402
+
+
+def _ms(fn, repeticiones=1):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        r = fn()
+    return r, 1000.0 * (time.perf_counter() - t0) / repeticiones
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=100_000)
+    ap.add_argument("--duplicados", type=int, default=200, help="personajes copiados de otro (distancia 0)")
+    ap.add_argument("--casi", type=int, default=200, help="copias con un atributo cambiado (distancia 1)")
+    args = ap.parse_args()
+
+    attrs = list(db_sql.ATRIBUTOS_BINARIOS)
+    x = sintetico.matriz_binaria(args.personajes, len(attrs))
+    rng = np.random.default_rng(1)
+    origen = rng.integers(args.personajes, size=args.duplicados + args.casi)
+    destino = rng.choice(args.personajes, size=len(origen), replace=False)
+    x[destino] = x[origen]
+    casi = destino[args.duplicados:]
+    x[casi, rng.integers(len(attrs), size=len(casi))] ^= 1
+    nombres = [f"personaje_{i}" for i in range(args.personajes)]
+
+    ix, t_build = _ms(lambda: IndiceSimilitud(nombres, x, attrs))
+    g0, t_g0 = _ms(lambda: ix.grupos(0))
+    g1, t_g1 = _ms(lambda: ix.grupos(1))
+    _, t_knn = _ms(lambda: ix.vecinos(ix.bits[7], 10), repeticiones=50)
+    fila = {a: int(v) for a, v in zip(attrs, x[7])}
+    _, t_col = _ms(lambda: ix.colisiones(fila, 1), repeticiones=50)
+    top = nombres[:20]
+    _, t_sep = _ms(lambda: ix.separadores(top, np.linspace(1, 0.1, len(top))), repeticiones=50)
+
+    print(f"personajes={args.personajes} atributos={len(attrs)} palabras/personaje={ix.bits.shape[1]} "
+          f"memoria índice={ix.bits.nbytes / 2**20:.1f} MB")
+    print(f"{'construcción':<26}{t_build:>10.1f} ms")
+    print(f"{'grupos distancia 0':<26}{t_g0:>10.1f} ms  ({len(g0)} grupos)")
+    print(f"{'grupos distancia <= 1':<26}{t_g1:>10.1f} ms  ({len(g1)} grupos)")
+    print(f"{'vecinos (k=10)':<26}{t_knn:>10.2f} ms")
+    print(f"{'colisiones (upsert)':<26}{t_col:>10.2f} ms")
+    print(f"{'separadores (top 20)':<26}{t_sep:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_ws_vs_http.py
+"""
+Turnos/segundo de una partida por WebSocket (/ws/partida) frente al flujo
+HTTP actual (POST /inferir + POST /pregunta_siguiente con todas las
+respuestas en cada turno), en un único worker y con modelos sintéticos.
+
+Uso (desde backend/):
+    python benchmarks/bench_ws_vs_http.py --personajes 2000 --partidas 20 --turnos 15
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("ADIVINADOR_CALENTAR", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+def _verdad(sint, personaje, atributo):
+    return int(sint["matriz"][personaje, sint["atributos"].index(atributo)])
+
+
+def partida_http(cliente, sint, personaje, turnos):
+    respuestas, hechos = {}, 0
+    for _ in range(turnos):
+        q = cliente.post("/pregunta_siguiente", json={"respuestas": respuestas}).json()
+        if not q.get("atributo"):
+            break
+        respuestas[q["atributo"]] = _verdad(sint, personaje, q["atributo"])
+        cliente.post("/inferir", json={"respuestas": respuestas}).json()
+        hechos += 1
+    return hechos
+
+
+def partida_ws(cliente, sint, personaje, turnos):
+    hechos = 0
+    with cliente.websocket_connect("/ws/partida") as ws:
+        ws.send_json({"t": "e"})
+        estado = ws.receive_json()
+        for _ in range(turnos):
+            if not estado.get("q"):
+                break
+            a = estado["q"]["a"]
+            ws.send_json({"t": "r", "a": a, "v": _verdad(sint, personaje, a)})
+            estado = ws.receive_json()
+            hechos += 1
+    return hechos
+
+
+def main_bench():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=2000)
+    ap.add_argument("--partidas", type=int, default=20)
+    ap.add_argument("--turnos", type=int, default=15)
+    args = ap.parse_args()
+
+    sint = sintetico.modelos_sinteticos(args.personajes)
+    sintetico.instalar_en_memoria(sint)
+    print(f"personajes={args.personajes} atributos={len(sint['atributos'])} "
+          f"partidas={args.partidas} turnos/partida<={args.turnos}")
+
+    with TestClient(main.app) as cliente:
+        for nombre, fn in (("http", partida_http), ("websocket", partida_ws)):
+            fn(cliente, sint, 0, 2)  # calentamiento (matrices, pool, conexiones)
+            t0 = time.perf_counter()
+            turnos = sum(fn(cliente, sint, i % args.personajes, args.turnos) for i in range(args.partidas))
+            dt = time.perf_counter() - t0
+            print(f"{nombre:<10} turnos={turnos:<6} {turnos / dt:>8.1f} turnos/s  {1000 * dt / turnos:>7.2f} ms/turno")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,200 @@
+# benchmarks/carga.py
+"""
+Prueba de carga con jugadores simulados contra la app FastAPI en proceso,
+con MySQL y Mongo sustituidos por SQLite y colecciones en memoria
+(ver benchmarks/sustitutos.py).
+
+Cada jugador elige un personaje de la tabla y juega como Inferencia.vue:
+GET /preguntas/activas, y por turno POST /pregunta_siguiente + POST /inferir,
+respondiendo con la verdad, hasta que se alcanza el umbral o se agotan los
+turnos; al final POST /guardar_partida. Una fracción de jugadores piensa en
+un personaje que no está en la tabla: esas partidas fallan y terminan con
+POST /fallo/upsert_personaje, como en el frontend.
+
+Se barre una lista de niveles de concurrencia (jugadores simultáneos) y se
+informa de partidas/s, p50/p99 por endpoint y del máximo de partidas/s que
+cumple el SLO de p99 por turno.
+
+Uso (desde backend/):
+    python benchmarks/carga.py --personajes 500 --concurrencia 1 4 16 --duracion 10
+    python benchmarks/carga.py --salida informe_carga.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+os.environ.setdefault("ADIVINADOR_CALENTAR", "0")
+os.environ.setdefault("ADIVINADOR_LOG_MUESTREO", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sustitutos  # noqa: E402
+
+
+class Resultados:
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.turnos: List[float] = []
+        self.partidas = 0
+        self.aciertos = 0
+        self.errores = 0
+
+    def resumen(self, duracion: float) -> dict:
+        def pct(v):
+            if not v:
+                return {"n": 0, "p50_ms": None, "p99_ms": None}
+            ms = np.asarray(v) * 1000.0
+            return {"n": len(v), "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                    "p99_ms": round(float(np.percentile(ms, 99)), 2)}
+
+        return {
+            "partidas": self.partidas,
+            "partidas_s": round(self.partidas / duracion, 2) if duracion else 0.0,
+            "tasa_acierto": round(self.aciertos / self.partidas, 3) if self.partidas else None,
+            "errores": self.errores,
+            "turno": pct(self.turnos),
+            "endpoints": {k: pct(v) for k, v in sorted(self.latencias.items())},
+        }
+
+
+async def _llamar(cliente, res: Resultados, metodo: str, ruta: str, **kwargs):
+    t0 = time.perf_counter()
+    r = await cliente.request(metodo, ruta, **kwargs)
+    res.latencias[f"{metodo} {ruta}"].append(time.perf_counter() - t0)
+    if r.status_code >= 400:
+        res.errores += 1
+        return None
+    return r.json()
+
+
+async def jugador(cliente, res: Resultados, personajes: List[dict], args, rng: random.Random, fin: float):
+    """Un jugador: partidas seguidas hasta que se acaba el tiempo del nivel."""
+    atributos = [a for a in personajes[0] if a != "nombre"]
+    while time.perf_counter() < fin:
+        desconocido = rng.random() < args.p_desconocido
+        if desconocido:
+            objetivo = {"nombre": f"nuevo_{rng.getrandbits(48):x}",
+                        **{a: int(rng.random() < 0.2) for a in atributos}}
+        else:
+            objetivo = rng.choice(personajes)
+        await _llamar(cliente, res, "GET", "/preguntas/activas")
+
+        respuestas: Dict[str, int] = {}
+        resultado, propuesto = [], None
+        for _ in range(args.turnos):
+            t0 = time.perf_counter()
+            q = await _llamar(cliente, res, "POST", "/pregunta_siguiente", json={"respuestas": respuestas})
+            if not q or not q.get("atributo"):
+                break
+            if q.get("tipo") == "grupo":
+                # Se contesta con los atributos del grupo (la opción del objetivo a 1, el resto a 0)
+                miembros = [o["atributo"] for o in q["opciones"] if o["atributo"]]
+                respuestas.update({a: int(objetivo.get(a, 0)) for a in miembros})
+            else:
+                respuestas[q["atributo"]] = int(objetivo.get(q["atributo"], 0))
+            inf = await _llamar(cliente, res, "POST", "/inferir", json={"respuestas": respuestas})
+            res.turnos.append(time.perf_counter() - t0)
+            if not inf:
+                break
+            resultado = inf.get("resultado", [])
+            if inf.get("umbral"):
+                propuesto = inf.get("candidato")
+                break
+
+        acertado = propuesto == objetivo["nombre"]
+        partida = {"respuestas": respuestas, "resultado": resultado, "acertado": acertado,
+                   "propuesto": propuesto, "personaje_real": objetivo["nombre"]}
+        if not acertado and desconocido:
+            await _llamar(cliente, res, "POST", "/fallo/upsert_personaje", json={
+                "personaje_real": objetivo["nombre"], "respuestas": respuestas,
+                "atributos": {a: objetivo[a] for a in atributos},
+                "propuesto": propuesto or "",
+            })
+        await _llamar(cliente, res, "POST", "/guardar_partida", json=partida)
+        res.partidas += 1
+        res.aciertos += int(acertado)
+
+
+async def nivel(app, personajes, concurrencia: int, args) -> dict:
+    import httpx
+
+    res = Resultados()
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://carga") as cliente:
+        t0 = time.perf_counter()
+        fin = t0 + args.duracion
+        await asyncio.gather(*[
+            jugador(cliente, res, personajes, args, random.Random(args.seed * 1000 + i), fin)
+            for i in range(concurrencia)
+        ])
+        duracion = time.perf_counter() - t0
+    return {"concurrencia": concurrencia, "duracion_s": round(duracion, 2), **res.resumen(duracion)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=500)
+    ap.add_argument("--concurrencia", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    ap.add_argument("--duracion", type=float, default=10.0, help="segundos por nivel de concurrencia")
+    ap.add_argument("--turnos", type=int, default=20, help="máximo de preguntas por partida")
+    ap.add_argument("--p-desconocido", type=float, default=0.05,
+                    help="fracción de partidas con un personaje que no está en la tabla")
+    ap.add_argument("--slo-p99-ms", type=float, default=250.0, help="p99 máximo aceptable por turno")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--salida", help="guardar el informe completo en JSON")
+    args = ap.parse_args()
+
+    entorno = sustitutos.instalar(args.personajes, seed=args.seed)
+    import main as app_main
+    from rutas import preguntas
+    from servicios.motores import motor_activo
+
+    t0 = time.perf_counter()
+    preguntas.cargar_catalogo(forzar=True)
+    motor_activo().asegurar_entrenado()
+    print(f"personajes={args.personajes} motor={motor_activo().nombre} "
+          f"entrenado en {time.perf_counter() - t0:.2f}s")
+
+    niveles = []
+    for c in args.concurrencia:
+        r = asyncio.run(nivel(app_main.app, entorno["personajes"], c, args))
+        niveles.append(r)
+        print(f"c={c:<4} partidas/s={r['partidas_s']:>7.2f}  turno p50={r['turno']['p50_ms']}ms "
+              f"p99={r['turno']['p99_ms']}ms  acierto={r['tasa_acierto']}  errores={r['errores']}")
+
+    sostenibles = [r for r in niveles if r["turno"]["p99_ms"] is not None
+                   and r["turno"]["p99_ms"] <= args.slo_p99_ms and r["errores"] == 0]
+    maximo = max(sostenibles, key=lambda r: r["partidas_s"]) if sostenibles else None
+
+    print(f"\n{'endpoint':<28}" + "".join(f"{'c=' + str(r['concurrencia']):>18}" for r in niveles))
+    rutas = sorted({e for r in niveles for e in r["endpoints"]})
+    for ruta in rutas:
+        celdas = []
+        for r in niveles:
+            e = r["endpoints"].get(ruta, {})
+            celdas.append(f"{e.get('p50_ms')}/{e.get('p99_ms')}" if e else "-")
+        print(f"{ruta:<28}" + "".join(f"{c:>18}" for c in celdas))
+    print("(p50/p99 en ms)")
+    if maximo:
+        print(f"\nmáximo sostenible: {maximo['partidas_s']} partidas/s "
+              f"(c={maximo['concurrencia']}, p99 turno <= {args.slo_p99_ms} ms)")
+    else:
+        print(f"\nningún nivel cumple p99 turno <= {args.slo_p99_ms} ms")
+
+    if args.salida:
+        informe = {"parametros": vars(args), "niveles": niveles,
+                   "maximo_sostenible": maximo and {"concurrencia": maximo["concurrencia"],
+                                                    "partidas_s": maximo["partidas_s"]}}
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"informe: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# benchmarks/harness_motores.py
+"""
+Paridad y rendimiento de los motores de inferencia (servicios/motores).
+
+Entrena cada motor con la misma tabla de personajes, pasa los mismos
+conjuntos de respuestas por todos y compara contra "naive_bayes":
+
+- latencia p50/p95 de posterior y de siguiente_pregunta
+- memoria: pico de tracemalloc durante el entrenamiento
+- acuerdo de ranking: top-1 igual, solapamiento del top-5 y misma pregunta
+
+Uso (desde backend/):
+    python benchmarks/harness_motores.py --personajes 300 --partidas 50
+    python benchmarks/harness_motores.py --bd            # tabla real de MySQL
+    python benchmarks/harness_motores.py --motores naive_bayes pgmpy_laplace
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+from servicios import motores  # noqa: E402
+
+REFERENCIA = "naive_bayes"
+
+
+def _percentiles(tiempos):
+    if not tiempos:
+        return float("nan"), float("nan")
+    ms = np.asarray(tiempos) * 1000.0
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 95))
+
+
+def _conjuntos_respuestas(df, n_partidas, n_respuestas, seed):
+    """Respuestas verdaderas de personajes al azar (dict atributo -> 0/1)."""
+    rng = np.random.default_rng(seed)
+    attrs = [c for c in df.columns if c not in ("id", "nombre", "personaje")]
+    salida = []
+    for _ in range(n_partidas):
+        fila = df.iloc[int(rng.integers(len(df)))]
+        cols = rng.choice(len(attrs), size=min(n_respuestas, len(attrs)), replace=False)
+        salida.append({attrs[c]: int(fila[attrs[c]] or 0) for c in cols})
+    return salida
+
+
+def _ranking(personajes, probs, k=5):
+    orden = np.argsort(-probs, kind="stable")[:k]
+    return [personajes[i] for i in orden]
+
+
+def evaluar(nombre, df, partidas, n_preguntas):
+    motor = motores.obtener_motor(nombre)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    motor.entrenar(df)
+    t_entreno = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t_post, rankings = [], []
+    for r in partidas:
+        t0 = time.perf_counter()
+        personajes, probs = motor.posterior(r)
+        t_post.append(time.perf_counter() - t0)
+        rankings.append(_ranking(personajes, probs))
+
+    t_preg, preguntas = [], []
+    for r in partidas[:n_preguntas]:
+        t0 = time.perf_counter()
+        mejor = motor.siguiente_pregunta(r)
+        t_preg.append(time.perf_counter() - t0)
+        preguntas.append(mejor["atributo"] if mejor else None)
+
+    return {
+        "entreno_s": t_entreno,
+        "memoria_mb": pico / 2**20,
+        "posterior": _percentiles(t_post),
+        "pregunta": _percentiles(t_preg),
+        "rankings": rankings,
+        "preguntas": preguntas,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--motores", nargs="+", default=list(motores.MOTORES))
+    ap.add_argument("--personajes", type=int, default=300, help="tamaño de la tabla sintética")
+    ap.add_argument("--bd", action="store_true", help="usar db_sql.cargar_personajes en vez de datos sintéticos")
+    ap.add_argument("--partidas", type=int, default=50, help="conjuntos de respuestas a comparar")
+    ap.add_argument("--respuestas", type=int, default=8, help="respuestas por conjunto")
+    ap.add_argument("--preguntas", type=int, default=10,
+                    help="conjuntos sobre los que medir siguiente_pregunta (pgmpy es lento)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.bd:
+        from db_sql import cargar_personajes
+        df = cargar_personajes()
+    else:
+        df = sintetico.dataframe_sintetico(args.personajes, seed=args.seed)
+    partidas = _conjuntos_respuestas(df, args.partidas, args.respuestas, args.seed)
+    print(f"personajes={len(df)} partidas={len(partidas)} respuestas/partida={args.respuestas}")
+
+    nombres = [REFERENCIA] + [m for m in args.motores if m != REFERENCIA]
+    resultados = {}
+    for nombre in nombres:
+        try:
+            resultados[nombre] = evaluar(nombre, df, partidas, args.preguntas)
+        except ImportError as e:
+            print(f"{nombre}: omitido ({e})")
+
+    ref = resultados.get(REFERENCIA)
+    print(f"{'motor':<16}{'entreno s':>10}{'mem MB':>8}{'post p50':>10}{'p95':>8}"
+          f"{'preg p50':>10}{'p95':>9}{'top1':>7}{'top5':>7}{'preg=':>7}")
+    for nombre, r in resultados.items():
+        top1 = top5 = igual = float("nan")
+        if ref is not None:
+            pares = list(zip(r["rankings"], ref["rankings"]))
+            top1 = np.mean([a[:1] == b[:1] for a, b in pares])
+            top5 = np.mean([len(set(a) & set(b)) / max(1, len(b)) for a, b in pares])
+            igual = np.mean([a == b for a, b in zip(r["preguntas"], ref["preguntas"])])
+        print(f"{nombre:<16}{r['entreno_s']:>10.2f}{r['memoria_mb']:>8.1f}"
+              f"{r['posterior'][0]:>10.2f}{r['posterior'][1]:>8.2f}"
+              f"{r['pregunta'][0]:>10.2f}{r['pregunta'][1]:>9.2f}"
+              f"{top1:>7.2f}{top5:>7.2f}{igual:>7.2f}")
+    print("(latencias en ms; acuerdo frente a", REFERENCIA + ")")
+
+
+if __name__ == "__main__":
+    main()
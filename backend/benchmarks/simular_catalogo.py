@@ -0,0 +1,118 @@
+# benchmarks/simular_catalogo.py
+"""
+Autojuego de todo el catálogo con servicios/simulador: preguntas necesarias
+por personaje, fallos y tiempo total.
+
+Por defecto usa una tabla sintética (benchmarks/sintetico); con --real
+entrena con la tabla `personajes` de MySQL (config.py). Con --comprobar K
+juega además K partidas turno a turno con naive_bayes.turno (el camino de
+/turno) y comprueba que acaban con las mismas preguntas y el mismo
+propuesto, midiendo lo que tardaría así el catálogo entero.
+
+Uso (desde backend/):
+    python benchmarks/simular_catalogo.py --personajes 5000 --comprobar 50
+    python benchmarks/simular_catalogo.py --real --salida informe_simulacion.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("ADIVINADOR_LOG_MUESTREO", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sintetico  # noqa: E402
+
+from servicios import naive_bayes, simulador  # noqa: E402
+
+
+def _tabla(args):
+    if args.real:
+        from servicios import datos_personajes
+        df, _ = datos_personajes.instantanea()
+    else:
+        df = sintetico.dataframe_sintetico(args.personajes, seed=args.seed)
+    return df.drop(columns=["id"]) if "id" in df.columns else df
+
+
+def _comprobar(snap, verdad, objetivos, args, informe):
+    """Mismas partidas por el motor, turno a turno; devuelve (discrepancias, segundos)."""
+    m = snap.matrices
+    por_nombre = {r["nombre"]: r for r in informe}
+    discrepancias, t0 = 0, time.perf_counter()
+    for o in objetivos:
+        respuestas, n = {}, 0
+        while True:
+            personajes, probs, mejor = naive_bayes.turno(respuestas, (), None, snap=snap)
+            top = int(np.argmax(probs))
+            if probs[top] >= args.umbral or n >= args.max_preguntas or mejor is None:
+                break
+            n += 1
+            if mejor.get("tipo") == "grupo":
+                miembros = [op["atributo"] for op in mejor["opciones"] if op["atributo"]]
+                unos = [a for a in miembros if verdad[o, m["indice"][a]]]
+                respuestas.update({a: int(bool(unos) and a == unos[0]) for a in miembros})
+            else:
+                respuestas[mejor["atributo"]] = int(verdad[o, m["indice"][mejor["atributo"]]])
+        r = por_nombre[personajes[o]]
+        if r["preguntas"] != n or r["propuesto"] != personajes[top]:
+            discrepancias += 1
+            print(f"  discrepancia {personajes[o]}: simulador={r['preguntas']}/{r['propuesto']} "
+                  f"motor={n}/{personajes[top]}")
+    return discrepancias, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--personajes", type=int, default=2000)
+    ap.add_argument("--real", action="store_true", help="catálogo real de MySQL en vez de sintético")
+    ap.add_argument("--lote", type=int, default=simulador.LOTE)
+    ap.add_argument("--umbral", type=float, default=simulador.UMBRAL)
+    ap.add_argument("--max-preguntas", type=int, default=simulador.MAX_PREGUNTAS)
+    ap.add_argument("--comprobar", type=int, default=0, help="partidas a repetir con naive_bayes.turno")
+    ap.add_argument("--salida", help="informe por personaje (.csv o .json)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    df = _tabla(args)
+    snap = naive_bayes.construir(df)
+    verdad = simulador.verdad_desde_df(df, snap.matrices)
+    print(f"personajes={len(snap.personajes)} atributos={len(snap.matrices['attrs'])} lote={args.lote}")
+
+    sim = simulador.simular(snap.matrices, verdad, umbral=args.umbral,
+                            max_preguntas=args.max_preguntas, lote=args.lote)
+    res = sim["resumen"]
+    print(f"simulador: {res['partidas']} partidas en {res['segundos']:.2f}s  "
+          f"preguntas media={res['media']:.2f} p50={res['p50']:.0f} p90={res['p90']:.0f} max={res['max']}  "
+          f"fallos={res['fallos']}  estados={res['estados']} de {res['turnos']} turnos")
+    peores = sorted(sim["personajes"], key=lambda r: (r["acierto"], -r["preguntas"]))[:5]
+    for r in peores:
+        print(f"  {r['nombre']:<28} preguntas={r['preguntas']:>3} acierto={r['acierto']} "
+              f"propuesto={r['propuesto']} p={r['p']:.3f}")
+
+    if args.comprobar:
+        objetivos = np.random.default_rng(args.seed).choice(len(snap.personajes),
+                                                            size=min(args.comprobar, len(snap.personajes)),
+                                                            replace=False)
+        discrepancias, seg = _comprobar(snap, verdad, objetivos, args, sim["personajes"])
+        por_partida = seg / len(objetivos)
+        print(f"motor turno a turno: {len(objetivos)} partidas en {seg:.2f}s "
+              f"({por_partida * len(snap.personajes):.1f}s estimados para el catálogo)  "
+              f"discrepancias={discrepancias}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8", newline="") as f:
+            if args.salida.endswith(".json"):
+                json.dump(sim, f, ensure_ascii=False, indent=2)
+            else:
+                w = csv.DictWriter(f, fieldnames=["nombre", "preguntas", "acierto", "propuesto", "p"])
+                w.writeheader()
+                w.writerows(sim["personajes"])
+        print(f"informe -> {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
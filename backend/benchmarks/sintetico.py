@@ -0,0 +1,111 @@
+# benchmarks/sintetico.py
+"""
+Catálogos y modelos sintéticos para los benchmarks (no necesitan MySQL ni Mongo).
+
+Los atributos se toman de las configs de bayes_tematica; con `repetir > 1`
+cada red se amplía con copias renombradas (`attr__2`, `attr__3`, ...) para
+simular catálogos con más preguntas.
+"""
+import json
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+DIR_CONFIGS = os.path.join(BACKEND, "adivinador_backend", "bayes_tematica")
+REDES = [
+    "poderes", "afiliaciones_heroes", "afiliaciones_villanos",
+    "especie", "origen", "armas", "genero_ocupacion",
+]
+ALPHA = 1.0
+
+
+def atributos_por_red(repetir: int = 1) -> Dict[str, List[str]]:
+    salida = {}
+    for red in REDES:
+        with open(os.path.join(DIR_CONFIGS, f"config_{red}.json"), encoding="utf-8") as f:
+            base = list(json.load(f).get("atributos", []))
+        attrs = list(base)
+        for k in range(2, repetir + 1):
+            attrs += [f"{a}__{k}" for a in base]
+        salida[red] = attrs
+    return salida
+
+
+def matriz_binaria(n_personajes: int, n_attrs: int, densidad: float = 0.2, seed: int = 0) -> np.ndarray:
+    """Matriz personaje x atributo de 0/1 con filas casi siempre distintas."""
+    rng = np.random.default_rng(seed)
+    return (rng.random((n_personajes, n_attrs)) < densidad).astype(np.int8)
+
+
+def modelos_sinteticos(n_personajes: int, repetir: int = 1, seed: int = 0) -> dict:
+    """
+    MODELOS con el mismo formato que rutas/inferencia (un registro por personaje,
+    suavizado de Laplace), entrenados sobre una matriz binaria aleatoria.
+    """
+    grupos = atributos_por_red(repetir)
+    todos = [a for attrs in grupos.values() for a in attrs]
+    x = matriz_binaria(n_personajes, len(todos), seed=seed)
+    personajes = [f"personaje_{i}" for i in range(n_personajes)]
+
+    prior = np.full(n_personajes, (1.0 + ALPHA) / (n_personajes * (1.0 + ALPHA)))
+    prior_log = np.log(prior)
+    p1 = (x + ALPHA) / (1.0 + 2.0 * ALPHA)
+    log1, log0 = np.log(p1), np.log(1.0 - p1)
+
+    modelos, col = {}, 0
+    for red, attrs in grupos.items():
+        attr_logs = {}
+        for a in attrs:
+            attr_logs[a] = {1: log1[:, col].copy(), 0: log0[:, col].copy()}
+            col += 1
+        modelos[red] = {
+            "personajes": personajes,
+            "prior_log": prior_log,
+            "attr_logs": attr_logs,
+            "attrs": attrs,
+        }
+    return {"modelos": modelos, "matriz": x, "atributos": todos, "personajes": personajes}
+
+
+def respuestas_de(personaje: int, sintetico: dict, n: int, seed: int = 0) -> Dict[str, int]:
+    """n respuestas verdaderas (al azar) del personaje indicado."""
+    rng = np.random.default_rng(seed)
+    attrs = sintetico["atributos"]
+    cols = rng.choice(len(attrs), size=min(n, len(attrs)), replace=False)
+    return {attrs[c]: int(sintetico["matriz"][personaje, c]) for c in cols}
+
+
+def dataframe_sintetico(n_personajes: int, seed: int = 0):
+    """
+    Tabla `personajes` sintética con el formato de db_sql.cargar_personajes
+    (id, nombre + una columna 0/1 por atributo de las configs), para entrenar
+    cualquier motor sin base de datos.
+    """
+    import pandas as pd
+
+    todos = [a for attrs in atributos_por_red().values() for a in attrs]
+    todos = list(dict.fromkeys(todos))
+    x = matriz_binaria(n_personajes, len(todos), seed=seed)
+    df = pd.DataFrame(x, columns=todos)
+    df.insert(0, "nombre", [f"personaje_{i}" for i in range(n_personajes)])
+    df.insert(0, "id", np.arange(1, n_personajes + 1))
+    return df
+
+
+def instalar_en_memoria(sint: dict) -> None:
+    """
+    Publica los modelos sintéticos como instantánea del motor naive_bayes y un
+    catálogo de preguntas a juego, para ejercitar la API sin MySQL ni Mongo.
+    """
+    from rutas import preguntas
+    from servicios import naive_bayes
+
+    naive_bayes.publicar(naive_bayes.Instantanea.desde_modelos(sint["modelos"]))
+    preguntas.CATALOGO = [{"atributo": a, "texto": f"¿{a}?", "activa": True} for a in sint["atributos"]]
+    preguntas._TEXTOS = {a: f"¿{a}?" for a in sint["atributos"]}
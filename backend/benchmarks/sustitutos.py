@@ -0,0 +1,240 @@
+# benchmarks/sustitutos.py
+"""
+Sustitutos en proceso de MySQL y Mongo para las pruebas de carga.
+
+- SQL: el almacén SQLite de db_sql sobre un fichero temporal, poblado con
+  personajes sintéticos. Los motores se entrenan con él por el camino real
+  (db_sql.cargar_personajes).
+- Mongo: colecciones en memoria con el subconjunto de la API de pymongo que
+  usa el backend (insert_one, find/sort/limit, count_documents, bulk_write
+  de UpdateOne con $inc/$set y ReplaceOne, delete_many, create_index).
+
+`instalar()` sustituye `db_sql.engine` y `db.db` en todos los módulos que
+ya los importaron (`from db_sql import engine`, `from db import db`).
+"""
+import atexit
+import copy
+import itertools
+import os
+import sys
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+
+# =========================
+#  🍃 MONGO EN MEMORIA
+# =========================
+def _cumple(doc: dict, filtro: dict) -> bool:
+    for campo, cond in (filtro or {}).items():
+        valor = doc.get(campo)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            for op, ref in cond.items():
+                if op == "$gt" and not (valor is not None and valor > ref):
+                    return False
+                if op == "$gte" and not (valor is not None and valor >= ref):
+                    return False
+                if op == "$lt" and not (valor is not None and valor < ref):
+                    return False
+                if op == "$lte" and not (valor is not None and valor <= ref):
+                    return False
+                if op == "$ne" and valor == ref:
+                    return False
+                if op == "$in" and valor not in ref:
+                    return False
+                if op == "$not" and _cumple(doc, {campo: ref}):
+                    return False
+        elif valor != cond:
+            return False
+    return True
+
+
+def _proyectar(doc: dict, proyeccion: Optional[dict]) -> dict:
+    if not proyeccion:
+        return copy.deepcopy(doc)
+    incluir = [k for k, v in proyeccion.items() if v and k != "_id"]
+    if incluir:
+        salida = {k: copy.deepcopy(doc[k]) for k in incluir if k in doc}
+        if proyeccion.get("_id", 1) and "_id" in doc:
+            salida["_id"] = doc["_id"]
+        return salida
+    return {k: copy.deepcopy(v) for k, v in doc.items() if proyeccion.get(k, 1)}
+
+
+class CursorMemoria:
+    def __init__(self, docs: List[dict], proyeccion: Optional[dict]):
+        self._docs = docs
+        self._proyeccion = proyeccion
+        self._limite = 0
+
+    def sort(self, clave: str, direccion: int = 1) -> "CursorMemoria":
+        self._docs.sort(key=lambda d: (d.get(clave) is None, d.get(clave)), reverse=direccion < 0)
+        return self
+
+    def limit(self, n: int) -> "CursorMemoria":
+        self._limite = int(n)
+        return self
+
+    def __iter__(self):
+        docs = self._docs[: self._limite] if self._limite else self._docs
+        return (_proyectar(d, self._proyeccion) for d in docs)
+
+
+class ColeccionMemoria:
+    def __init__(self):
+        self._docs: List[dict] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def create_index(self, *args, **kwargs) -> str:
+        return "indice_memoria"
+
+    def insert_one(self, doc: dict):
+        with self._lock:
+            doc.setdefault("_id", next(self._ids))
+            self._docs.append(copy.deepcopy(doc))
+
+    def find(self, filtro: Optional[dict] = None, proyeccion: Optional[dict] = None) -> CursorMemoria:
+        with self._lock:
+            docs = [d for d in self._docs if _cumple(d, filtro or {})]
+        return CursorMemoria(docs, proyeccion)
+
+    def count_documents(self, filtro: dict) -> int:
+        with self._lock:
+            return sum(1 for d in self._docs if _cumple(d, filtro))
+
+    def delete_many(self, filtro: dict) -> None:
+        with self._lock:
+            self._docs = [d for d in self._docs if not _cumple(d, filtro)]
+
+    def update_one(self, filtro: dict, cambios: dict, upsert: bool = False) -> None:
+        with self._lock:
+            doc = next((d for d in self._docs if _cumple(d, filtro)), None)
+            if doc is None:
+                if not upsert:
+                    return
+                doc = {k: v for k, v in filtro.items() if not isinstance(v, dict) or k == "_id"}
+                doc.setdefault("_id", next(self._ids))
+                self._docs.append(doc)
+            for campo, n in cambios.get("$inc", {}).items():
+                doc[campo] = doc.get(campo, 0) + n
+            doc.update(copy.deepcopy(cambios.get("$set", {})))
+
+    def replace_one(self, filtro: dict, doc: dict, upsert: bool = False, _posicion: Optional[dict] = None) -> None:
+        with self._lock:
+            if _posicion is not None and set(filtro) == {"_id"}:
+                i = _posicion.get(filtro["_id"])
+                candidatos = [] if i is None else [i]
+            else:
+                candidatos = range(len(self._docs))
+            for i in candidatos:
+                if _cumple(self._docs[i], filtro):
+                    nuevo = copy.deepcopy(doc)
+                    nuevo.setdefault("_id", self._docs[i].get("_id"))
+                    self._docs[i] = nuevo
+                    return
+            if upsert:
+                nuevo = copy.deepcopy(doc)
+                nuevo.setdefault("_id", next(self._ids))
+                self._docs.append(nuevo)
+
+    def bulk_write(self, operaciones: Iterable[Any], ordered: bool = True) -> None:
+        from pymongo import ReplaceOne
+
+        posicion = None
+        for op in operaciones:  # pymongo.UpdateOne / ReplaceOne
+            if isinstance(op, ReplaceOne):
+                if posicion is None:  # las migraciones reemplazan por _id: índice para todo el lote
+                    with self._lock:
+                        posicion = {d.get("_id"): i for i, d in enumerate(self._docs)}
+                self.replace_one(op._filter, op._doc, upsert=op._upsert, _posicion=posicion)
+            else:
+                self.update_one(op._filter, op._doc, upsert=op._upsert)
+
+
+class BaseMemoria:
+    """Equivalente a `cliente["adivinador_tfm"]`: colecciones creadas al vuelo."""
+
+    def __init__(self):
+        self._colecciones: Dict[str, ColeccionMemoria] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, nombre: str) -> ColeccionMemoria:
+        with self._lock:
+            if nombre not in self._colecciones:
+                self._colecciones[nombre] = ColeccionMemoria()
+            return self._colecciones[nombre]
+
+
+# =========================
+#  🗄️ SQL EN SQLITE
+# =========================
+def motor_sqlite(n_personajes: int, seed: int = 0, ruta: Optional[str] = None):
+    """
+    Engine SQLAlchemy sobre un fichero SQLite con `personajes` poblada.
+    Devuelve (engine, filas) con filas = [{nombre, atributo: 0/1, ...}].
+    Sin `ruta` se usa un fichero temporal (se borra al cerrar el proceso).
+    """
+    from sqlalchemy import insert
+
+    import db_sql
+    from sintetico import matriz_binaria
+
+    if ruta is None:
+        fd, ruta = tempfile.mkstemp(prefix="adivinador_carga_", suffix=".sqlite")
+        os.close(fd)
+        atexit.register(lambda: os.path.exists(ruta) and os.remove(ruta))
+    engine = db_sql.crear_engine("sqlite", ruta)
+    db_sql.metadata.drop_all(engine)
+    db_sql.metadata.create_all(engine)
+
+    attrs = list(db_sql.ATRIBUTOS_BINARIOS)
+
+    x = matriz_binaria(n_personajes, len(attrs), seed=seed)
+    filas = [
+        {"nombre": f"personaje_{i}", **{a: int(v) for a, v in zip(attrs, x[i])}}
+        for i in range(n_personajes)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(db_sql.personajes), filas)
+    return engine, filas
+
+
+def preguntas_de(atributos: Iterable[str]) -> List[dict]:
+    return [{"atributo": a, "texto": f"¿{a.replace('_', ' ')}?", "activa": True} for a in atributos]
+
+
+# =========================
+#  🔌 INSTALACIÓN
+# =========================
+def _sustituir_en_modulos(original: Any, nuevo: Any, nombre: str) -> List[str]:
+    tocados = []
+    for mod_nombre, mod in list(sys.modules.items()):
+        if mod is not None and getattr(mod, nombre, None) is original:
+            setattr(mod, nombre, nuevo)
+            tocados.append(mod_nombre)
+    return tocados
+
+
+def instalar(n_personajes: int = 300, seed: int = 0) -> dict:
+    """
+    Cambia MySQL y Mongo por los sustitutos en todos los módulos cargados.
+    Importa main antes para que todos los routers estén en sys.modules.
+    """
+    import db
+    import db_sql
+    import main  # noqa: F401
+
+    engine, filas = motor_sqlite(n_personajes, seed=seed)
+    mongo = BaseMemoria()
+    for p in preguntas_de(db_sql.ATRIBUTOS_BINARIOS):
+        mongo["preguntas"].insert_one(p)
+
+    _sustituir_en_modulos(db_sql.engine, engine, "engine")
+    _sustituir_en_modulos(db.db, mongo, "db")
+    return {"engine": engine, "mongo": mongo, "personajes": filas,
+            "atributos": list(db_sql.ATRIBUTOS_BINARIOS)}
@@ -1,5 +1,64 @@
-from pymongo import MongoClient
+import threading
+import time
 
-cliente = MongoClient("mongodb://localhost:27017")
-db = cliente["adivinador_tfm"]
+from pymongo import MongoClient, monitoring
 
+import config
+from servicios import metricas
+
+
+class _MedidorPool(monitoring.ConnectionPoolListener):
+    """Uso del pool del cliente compartido en metricas (almacen="mongo")."""
+
+    def __init__(self):
+        self._inicio = threading.local()  # el préstamo empieza y acaba en el mismo hilo
+
+    def pool_created(self, evento):
+        metricas.POOL_CAPACIDAD.set(evento.options.get("maxPoolSize", config.MONGO_POOL_MAX), almacen="mongo")
+
+    def pool_ready(self, evento):
+        pass
+
+    def pool_cleared(self, evento):
+        pass
+
+    def pool_closed(self, evento):
+        pass
+
+    def connection_created(self, evento):
+        metricas.POOL_ABIERTAS.inc(almacen="mongo")
+
+    def connection_ready(self, evento):
+        pass
+
+    def connection_closed(self, evento):
+        metricas.POOL_ABIERTAS.dec(almacen="mongo")
+
+    def connection_check_out_started(self, evento):
+        self._inicio.t = time.perf_counter()
+
+    def connection_check_out_failed(self, evento):
+        metricas.POOL_FALLOS.inc(almacen="mongo")
+
+    def connection_checked_out(self, evento):
+        t0 = getattr(self._inicio, "t", None)
+        if t0 is not None:
+            metricas.POOL_ESPERA.observe(time.perf_counter() - t0, almacen="mongo")
+        metricas.POOL_EN_USO.inc(almacen="mongo")
+
+    def connection_checked_in(self, evento):
+        metricas.POOL_EN_USO.dec(almacen="mongo")
+
+
+# Un solo cliente (y un solo pool) por proceso para todos los routers y servicios.
+# connect=False: no se abre ninguna conexión hasta la primera operación,
+# así importar este módulo no bloquea el arranque si Mongo tarda en responder.
+cliente = MongoClient(
+    config.MONGO_URL,
+    connect=False,
+    maxPoolSize=config.MONGO_POOL_MAX,
+    minPoolSize=config.MONGO_POOL_MIN,
+    waitQueueTimeoutMS=config.MONGO_POOL_ESPERA_S * 1000,
+    event_listeners=[_MedidorPool()],
+)
+db = cliente[config.MONGO_BD]
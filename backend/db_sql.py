@@ -1,28 +1,74 @@
 # db_sql.py
 from __future__ import annotations
-from typing import Dict, List
-import pandas as pd
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List
 
 from sqlalchemy import (
-    create_engine, MetaData, Table, Column, Integer, String, select, text
+    create_engine, event, func, inspect, insert, update, MetaData, Table, Column, Integer,
+    SmallInteger, String, DateTime, select,
 )
 from sqlalchemy.dialects.mysql import TINYINT
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+import config
+
+if TYPE_CHECKING:  # pandas sólo se importa cuando de verdad se carga la tabla
+    import pandas as pd
 
 # =========================
-#  ⚙️ CONFIGURACIÓN MYSQL
+#  ⚙️ ALMACÉN (config.ALMACEN_SQL)
 # =========================
-USER = "adivinador"
-PASSWORD = "clave_segura123"
-HOST = "localhost"
-DATABASE = "personajes_marvel"
-
-# Conexión
-engine: Engine = create_engine(
-    f"mysql+mysqlconnector://{USER}:{PASSWORD}@{HOST}/{DATABASE}",
-    pool_pre_ping=True,
-    future=True,
-)
+# "mysql":  servidor MySQL (config.MYSQL_URL), pool de config.MYSQL_POOL*
+# "sqlite": fichero local (config.SQLITE_RUTA), sin servidor ni red
+def crear_engine(almacen: str | None = None, ruta_sqlite: str | None = None) -> Engine:
+    almacen = almacen or config.ALMACEN_SQL
+    if almacen == "mysql":
+        return create_engine(
+            config.MYSQL_URL,
+            future=True,
+            pool_pre_ping=True,
+            pool_size=config.MYSQL_POOL,
+            max_overflow=config.MYSQL_POOL_EXTRA,
+            pool_timeout=config.MYSQL_POOL_ESPERA_S,
+            pool_recycle=config.MYSQL_POOL_RECICLAR_S,
+        )
+    if almacen == "sqlite":
+        ruta = ruta_sqlite or config.SQLITE_RUTA
+        eng = create_engine(
+            f"sqlite:///{ruta}",
+            future=True,
+            connect_args={"check_same_thread": False, "timeout": 30},
+        )
+
+        @event.listens_for(eng, "connect")
+        def _pragmas(conexion, _registro):
+            # WAL: los lectores no se bloquean mientras un upsert escribe
+            cur = conexion.cursor()
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            cur.close()
+
+        return eng
+    raise ValueError(f"Almacén SQL desconocido: {almacen!r} (usa 'mysql' o 'sqlite')")
+
+
+def _medir_pool(eng: Engine, almacen: str = "sql") -> None:
+    """Conexiones prestadas/abiertas del pool de `eng` en metricas (adivinador_pool_*)."""
+    from servicios import metricas
+
+    pool = eng.pool
+    if hasattr(pool, "size"):  # QueuePool: tamaño fijo + desbordamiento (-1 = sin límite)
+        metricas.POOL_CAPACIDAD.set(pool.size() + max(0, getattr(pool, "_max_overflow", 0)), almacen=almacen)
+    event.listen(eng, "connect", lambda *_: metricas.POOL_ABIERTAS.inc(almacen=almacen))
+    event.listen(eng, "close", lambda *_: metricas.POOL_ABIERTAS.dec(almacen=almacen))
+    event.listen(eng, "checkout", lambda *_: metricas.POOL_EN_USO.inc(almacen=almacen))
+    event.listen(eng, "checkin", lambda *_: metricas.POOL_EN_USO.dec(almacen=almacen))
+
+
+# Conexión compartida por todos los routers y servicios (un pool por proceso)
+engine: Engine = crear_engine()
+_medir_pool(engine)
 
 metadata = MetaData()
 
@@ -84,12 +130,73 @@ personajes = Table(
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("nombre", String(100), nullable=False, unique=True, index=True),
-    # Todas las columnas binarias como TINYINT(1)
-    *[Column(col, TINYINT(1), nullable=False, server_default="0") for col in ATRIBUTOS_BINARIOS],
+    # Todas las columnas binarias como TINYINT(1) (SMALLINT en otros almacenes)
+    *[Column(col, SmallInteger().with_variant(TINYINT(1), "mysql"), nullable=False, server_default="0")
+      for col in ATRIBUTOS_BINARIOS],
 )
 
-# Crear tabla si no existe
-metadata.create_all(engine)
+# Registro de cambios: una fila por alta/modificación de un personaje. Lo
+# escriben todos los upserts en la misma transacción; `rev` crece siempre y
+# permite pedir sólo lo cambiado desde la última revisión vista.
+personajes_cambios = Table(
+    "personajes_cambios",
+    metadata,
+    Column("rev", Integer, primary_key=True, autoincrement=True),
+    Column("nombre", String(100), nullable=False, index=True),
+    Column("momento", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+_esquema_listo = False
+_lock_creacion = threading.Lock()
+
+
+def inicializar_esquema() -> None:
+    """Crea las tablas que falten. Se llama en el calentamiento, no al importar."""
+    global _esquema_listo
+    with _lock_creacion:
+        metadata.create_all(engine)
+        _esquema_listo = True
+    olvidar_esquema()
+
+
+def asegurar_esquema() -> None:
+    """`inicializar_esquema` la primera vez que se usa el registro de cambios (sin calentamiento)."""
+    if not _esquema_listo:
+        inicializar_esquema()
+
+
+# =========================
+#  📐 REGISTRO DEL ESQUEMA
+# =========================
+# Tablas reflejadas del almacén: el esquema se lee una vez por tabla y proceso
+# (no en cada upsert). Si se alteran las tablas en caliente, olvidar_esquema().
+_ESQUEMA: Dict[str, Table] = {}
+_lock_esquema = threading.Lock()
+
+
+def tabla_reflejada(nombre: str) -> Table:
+    """Tabla `nombre` tal como está en el almacén (LookupError si no existe)."""
+    from servicios.metricas import CACHE
+
+    t = _ESQUEMA.get(nombre)
+    if t is not None:
+        CACHE.inc(cache="esquema", resultado="acierto")
+        return t
+    with _lock_esquema:
+        t = _ESQUEMA.get(nombre)
+        if t is None:
+            CACHE.inc(cache="esquema", resultado="fallo")
+            if not inspect(engine).has_table(nombre):
+                raise LookupError(f"No existe la tabla {nombre!r}")
+            t = Table(nombre, MetaData(), autoload_with=engine)
+            _ESQUEMA[nombre] = t
+    return t
+
+
+def olvidar_esquema() -> None:
+    with _lock_esquema:
+        _ESQUEMA.clear()
 
 
 # =========================
@@ -113,7 +220,83 @@ def _normalizar_atributos(atributos: Dict[str, int | None]) -> Dict[str, int]:
 # =========================
 def cargar_personajes() -> pd.DataFrame:
     """Devuelve un DataFrame con toda la tabla personajes."""
-    return pd.read_sql("SELECT * FROM personajes", engine)
+    import pandas as pd
+    from servicios.metricas import CARGA_BD, cronometro
+
+    with cronometro(CARGA_BD):
+        return pd.read_sql("SELECT * FROM personajes", engine)
+
+
+def cargar_tabla(tabla: str) -> pd.DataFrame:
+    """
+    Tabla completa de otro catálogo (ver servicios/catalogos): mismo formato
+    que `personajes` (nombre + columnas 0/1), atributos propios. El nombre se
+    valida contra el esquema real antes de consultarla.
+    """
+    import pandas as pd
+    from servicios.metricas import CARGA_BD, cronometro
+
+    if tabla == "personajes":
+        return cargar_personajes()
+    t = tabla_reflejada(tabla)
+    if "nombre" not in t.c:
+        raise ValueError(f"La tabla {tabla!r} no tiene columna 'nombre'")
+    with cronometro(CARGA_BD), engine.connect() as conn:
+        return pd.read_sql(select(t), conn)
+
+
+def revision_actual() -> int:
+    """Última revisión del registro de cambios (0 si no hay ninguna)."""
+    asegurar_esquema()
+    with engine.connect() as conn:
+        return int(conn.execute(select(func.coalesce(func.max(personajes_cambios.c.rev), 0))).scalar_one())
+
+
+def _revisiones(conn, desde_rev: int) -> Dict[int, str]:
+    """{rev: nombre} posteriores a `desde_rev` menos la ventana (config.CAMBIOS_VENTANA)."""
+    filas = conn.execute(
+        select(personajes_cambios.c.rev, personajes_cambios.c.nombre)
+        .where(personajes_cambios.c.rev > desde_rev - config.CAMBIOS_VENTANA)
+    )
+    return {int(rev): nombre for rev, nombre in filas}
+
+
+def revisiones_recientes(desde_rev: int) -> set[int]:
+    """Revisiones de la ventana de `desde_rev` (las que `cargar_cambios` vuelve a mirar)."""
+    asegurar_esquema()
+    with engine.connect() as conn:
+        return set(_revisiones(conn, desde_rev))
+
+
+def cargar_cambios(desde_rev: int, vistas: Iterable[int] = ()) -> tuple[pd.DataFrame, int, set[int]]:
+    """
+    Filas actuales de los personajes cambiados después de `desde_rev`, la
+    revisión hasta la que llegan y las revisiones leídas.
+
+    `rev` es autoincremental: una transacción puede confirmarse con una rev
+    menor que otra ya leída. Por eso se releen las últimas
+    config.CAMBIOS_VENTANA revisiones y sólo se cargan las que no estén en
+    `vistas` (las ya aplicadas). El coste depende del nº de cambios, no del
+    tamaño de la tabla (rev es la clave primaria del registro).
+    """
+    import pandas as pd
+    from servicios.metricas import CARGA_BD, cronometro
+
+    asegurar_esquema()
+    vistas = set(vistas)
+    with cronometro(CARGA_BD), engine.connect() as conn:
+        leidas = _revisiones(conn, desde_rev)
+        hasta = max([desde_rev, *leidas])
+        cambiados = {nombre for rev, nombre in leidas.items() if rev not in vistas}
+        if not cambiados:
+            return pd.DataFrame(columns=[c.name for c in personajes.c]), hasta, set(leidas)
+        consulta = select(personajes).where(personajes.c.nombre.in_(sorted(cambiados)))
+        df = pd.read_sql(consulta, conn).drop_duplicates("nombre", keep="last")
+        return df, hasta, set(leidas)
+
+
+def _anotar_cambio(conn, nombre: str) -> None:
+    conn.execute(insert(personajes_cambios).values(nombre=nombre))
 
 
 def columnas_personajes() -> List[str]:
@@ -121,14 +304,63 @@ def columnas_personajes() -> List[str]:
     return list(ATRIBUTOS_BINARIOS)
 
 
+def columnas_tabla(tabla: str = "personajes") -> set[str]:
+    """Columnas reales de `tabla` en el almacén (vale para MySQL y SQLite; del registro del esquema)."""
+    return {c.name for c in tabla_reflejada(tabla).c}
+
+
+def _existe(conn, nombre: str) -> bool:
+    return conn.execute(
+        select(personajes.c.id).where(personajes.c.nombre == nombre).limit(1)
+    ).first() is not None
+
+
+def ids_personajes(nombres: Iterable[str]) -> Dict[str, int]:
+    """{nombre: id} de los personajes que existen (los demás no aparecen)."""
+    nombres = list(dict.fromkeys(nombres))
+    if not nombres:
+        return {}
+    with engine.connect() as conn:
+        filas = conn.execute(select(personajes.c.nombre, personajes.c.id).where(personajes.c.nombre.in_(nombres)))
+        return {n: int(i) for n, i in filas}
+
+
+def nombres_personajes(ids: Iterable[int]) -> Dict[int, str]:
+    """{id: nombre}; el inverso de `ids_personajes`."""
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    if not ids:
+        return {}
+    with engine.connect() as conn:
+        filas = conn.execute(select(personajes.c.id, personajes.c.nombre).where(personajes.c.id.in_(ids)))
+        return {int(i): n for i, n in filas}
+
+
 def personaje_existe(nombre: str) -> bool:
     """Comprueba si existe un personaje por nombre (case sensitive)."""
     with engine.connect() as conn:
-        res = conn.execute(
-            text("SELECT 1 FROM personajes WHERE nombre = :n LIMIT 1"),
-            {"n": nombre},
-        ).first()
-        return res is not None
+        return _existe(conn, nombre)
+
+
+def insertar_personaje(nombre: str, atributos: Dict[str, int | None]) -> bool:
+    """
+    Inserta un personaje NUEVO (atributos normalizados a 0/1, los que falten a 0).
+    Si ya existe no lo toca y devuelve False.
+    """
+    nombre = (nombre or "").strip()
+    if not nombre:
+        raise ValueError("El nombre del personaje no puede estar vacío")
+    fila = {"nombre": nombre, **_normalizar_atributos(atributos)}
+    asegurar_esquema()  # antes de abrir la transacción (SQLite no crea tablas con otra abierta)
+    try:
+        with engine.begin() as conn:
+            if _existe(conn, nombre):
+                return False
+            conn.execute(insert(personajes).values(**fila))
+            _anotar_cambio(conn, nombre)
+            return True
+    except IntegrityError:
+        # Otro proceso lo insertó entre la comprobación y el INSERT
+        return False
 
 
 def upsert_personaje(nombre: str, atributos: Dict[str, int | None]) -> dict:
@@ -137,7 +369,7 @@ def upsert_personaje(nombre: str, atributos: Dict[str, int | None]) -> dict:
     - Si no existe -> INSERT con todos los campos normalizados (0/1).
     - Si existe     -> UPDATE de los campos provistos (normalizados), sin tocar los demás (se mantienen).
 
-    Devuelve un dict con {accion: 'insert'|'update', nombre: str}
+    Devuelve un dict con {accion: 'insert'|'update'|'noop', nombre: str}
     """
     nombre = (nombre or "").strip()
     if not nombre:
@@ -145,30 +377,43 @@ def upsert_personaje(nombre: str, atributos: Dict[str, int | None]) -> dict:
 
     # Normalizamos a 0/1
     norm = _normalizar_atributos(atributos)
+    # UPDATE solo de los campos que llegan (lo que el usuario respondió en esta sesión)
+    cambios = {c: norm[c] for c in ATRIBUTOS_BINARIOS if c in (atributos or {})}
+    asegurar_esquema()
 
-    with engine.begin() as conn:
-        if not personaje_existe(nombre):
-            # INSERT con todos los campos
-            cols = ["nombre"] + ATRIBUTOS_BINARIOS
-            vals = [nombre] + [norm[c] for c in ATRIBUTOS_BINARIOS]
-            placeholders = ", ".join([":" + c for c in cols])
-            sql = text(f"INSERT INTO personajes ({', '.join(cols)}) VALUES ({placeholders})")
-            params = {c: v for c, v in zip(cols, vals)}
-            conn.execute(sql, params)
-            return {"accion": "insert", "nombre": nombre}
-
-        # UPDATE solo de los campos que llegan (pero normalizados)
-        set_fragments = []
-        params = {"n": nombre}
-        for col in ATRIBUTOS_BINARIOS:
-            if col in atributos:  # solo actualiza los que el usuario respondió en esta sesión
-                set_fragments.append(f"{col} = :{col}")
-                params[col] = norm[col]
-
-        if set_fragments:
-            sql = text(f"UPDATE personajes SET {', '.join(set_fragments)} WHERE nombre = :n")
-            conn.execute(sql, params)
-            return {"accion": "update", "nombre": nombre}
-
-        # Si no había nada que actualizar (p.ej. atributos vacío)
-        return {"accion": "noop", "nombre": nombre}
+    for intento in range(2):
+        try:
+            with engine.begin() as conn:
+                if not _existe(conn, nombre):
+                    conn.execute(insert(personajes).values(nombre=nombre, **norm))
+                    _anotar_cambio(conn, nombre)
+                    return {"accion": "insert", "nombre": nombre}
+                if not cambios:
+                    return {"accion": "noop", "nombre": nombre}
+                conn.execute(update(personajes).where(personajes.c.nombre == nombre).values(**cambios))
+                _anotar_cambio(conn, nombre)
+                return {"accion": "update", "nombre": nombre}
+        except IntegrityError:
+            # Carrera con otro INSERT del mismo nombre: la segunda vuelta actualiza
+            if intento:
+                raise
+
+
+def volcar_a_sqlite(ruta: str, lote: int = 1000) -> int:
+    """
+    Copia la tabla `personajes` del almacén actual a un fichero SQLite (mismo
+    esquema), para nodos de sólo lectura con ADIVINADOR_ALMACEN=sqlite.
+    Devuelve el número de filas copiadas.
+    """
+    destino = crear_engine("sqlite", ruta)
+    # El registro de cambios no se copia: el fichero es una foto con revisión propia
+    metadata.drop_all(destino)
+    metadata.create_all(destino)
+    total = 0
+    with engine.connect() as origen, destino.begin() as dst:
+        filas = origen.execution_options(stream_results=True).execute(select(personajes))
+        for bloque in filas.mappings().partitions(lote):
+            dst.execute(insert(personajes), [dict(f) for f in bloque])
+            total += len(bloque)
+    destino.dispose()
+    return total
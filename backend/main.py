@@ -1,15 +1,34 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from servicios.inferencia_multiple import inferir_personaje_desde_redes
+import config
+from servicios import admision, arranque, metricas
+from servicios.perfilado import MiddlewarePerfilado
 from rutas.partidas import router as partidas_router
 from rutas.preguntas import router as preguntas_router
 from rutas.inferencia import router as inferencia_router
 from rutas.pregunta_siguiente import router as pregunta_siguiente_router
+from rutas.turno import router as turno_router
 from rutas.fallos import router as fallos_router
 from rutas.personajes import router as personajes_router
+from rutas.partida_ws import router as partida_ws_router
+from rutas.similitud import router as similitud_router
+from rutas.catalogos import router as catalogos_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Entrena modelos y carga preguntas sin bloquear el arranque; /ready informa
+    if config.CALENTAR_AL_ARRANCAR:
+        arranque.calentar_en_segundo_plano()
+    arranque.iniciar_refresco()
+    yield
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,21 +38,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class RespuestasUsuario(BaseModel):
-    respuestas: dict
-
 app.include_router(partidas_router, tags=["Partidas"])
 
 app.include_router(inferencia_router)
 app.include_router(pregunta_siguiente_router)
+app.include_router(turno_router)
 app.include_router(preguntas_router, prefix="/preguntas", tags=["Preguntas"])
 app.include_router(fallos_router)
 app.include_router(personajes_router, tags=["personajes"])
-@app.post("/inferir")
-def inferir(respuestas: RespuestasUsuario):
+app.include_router(partida_ws_router)
+app.include_router(similitud_router, tags=["similitud"])
+app.include_router(catalogos_router, tags=["catalogos"])
+
+
+@app.exception_handler(admision.Saturado)
+async def saturado(request: Request, exc: admision.Saturado):
+    # Rechazo inmediato del control de admisión: el cliente reintenta tras Retry-After
+    return JSONResponse(status_code=exc.codigo, headers={"Retry-After": str(exc.reintentar_s)},
+                        content={"detail": "servidor saturado", "motivo": exc.motivo})
+
+
+# Perfilado por petición: sin habilitar en config ni siquiera se instala
+if config.PERFILADO_HABILITADO:
+    app.add_middleware(MiddlewarePerfilado)
+
+
+@app.middleware("http")
+async def medir_peticiones(request: Request, call_next):
+    metricas.PETICIONES_EN_CURSO.inc()
+    t0 = time.perf_counter()
+    estado = 500
     try:
-        respuestas_filtradas = {k: v for k, v in respuestas.respuestas.items() if v is not None}
-        resultado = inferir_personaje_desde_redes(respuestas_filtradas)
-        return {"resultado": resultado}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        respuesta = await call_next(request)
+        estado = respuesta.status_code
+        return respuesta
+    finally:
+        metricas.PETICIONES_EN_CURSO.dec()
+        # Etiquetamos con la plantilla de la ruta (no con la URL) para acotar la cardinalidad
+        ruta = getattr(request.scope.get("route"), "path", "otra")
+        metricas.PETICION.observe(time.perf_counter() - t0, ruta=ruta, metodo=request.method, estado=str(estado))
+
+
+@app.get("/ready")
+def ready():
+    estado = dict(arranque.ESTADO)
+    return JSONResponse(status_code=200 if estado["listo"] else 503, content=estado)
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
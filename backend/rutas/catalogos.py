@@ -0,0 +1,59 @@
+# rutas/catalogos.py
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+import config
+from servicios import catalogos, registro
+from servicios.motores import MotorInferencia
+
+router = APIRouter()
+
+
+def motor_de(catalogo: Optional[str]) -> MotorInferencia:
+    """Motor del catálogo pedido (None = por defecto); 404 si no existe, 503 si no carga."""
+    try:
+        return catalogos.motor(catalogo)
+    except catalogos.CatalogoDesconocido as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        registro.error("error_cargando_catalogo", catalogo=catalogo, error=str(e))
+        raise HTTPException(status_code=503, detail=f"No se pudo cargar el catálogo {catalogo!r}")
+
+
+# ----------------------
+# Estado del registro
+# ----------------------
+@router.get("/catalogos")
+def listar_catalogos():
+    """Catálogos declarados, cuáles están en memoria y cuánto ocupan."""
+    return {"catalogos": catalogos.estado()}
+
+
+@router.post("/catalogos/{catalogo}/cargar")
+def cargar_catalogo(catalogo: str):
+    """Precarga un catálogo (p.ej. antes de abrirlo al público)."""
+    motor_de(catalogo).asegurar_entrenado()
+    return {"catalogo": catalogo, "cargado": True}
+
+
+@router.post("/modelos/reconstruir")
+def reconstruir_modelos(catalogo: Optional[str] = None):
+    """
+    Reentrena el motor del catálogo en segundo plano y publica la nueva
+    instantánea al terminar; mientras tanto se responde con la actual.
+    """
+    motor = motor_de(catalogo)
+    version = motor.instantanea().version if motor.entrenado else None
+    programada = motor.reconstruccion.pedir()
+    return {"catalogo": catalogo or config.CATALOGO_POR_DEFECTO, "version": version,
+            "programada": programada, "en_curso": motor.reconstruccion.en_curso,
+            "ultima": motor.reconstruccion.ultima}
+
+
+@router.delete("/catalogos/{catalogo}")
+def descargar_catalogo(catalogo: str):
+    """Libera la memoria de un catálogo adicional (se recargará al volver a usarlo)."""
+    if catalogos.es_por_defecto(catalogo):
+        raise HTTPException(status_code=400, detail="El catálogo por defecto no se descarga")
+    return {"catalogo": catalogo, "descargado": catalogos.descargar(catalogo)}
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, field_validator
 from typing import Dict, Optional, Any
-from sqlalchemy import text, inspect
 from sqlalchemy.exc import SQLAlchemyError
 
-from db_sql import engine  # usa el engine que ya tienes
+import db_sql  # acceso compartido a `personajes` (MySQL o SQLite según config)
+from servicios import nombres, registro, similitud
 
 router = APIRouter()
 
@@ -43,24 +43,30 @@ class UpsertPersonajeReq(BaseModel):
 
 
 # ===== Utilidades internas =====
-def _tabla_personajes_columnas() -> set[str]:
-    """Lee las columnas reales de la tabla para filtrar el dict antes de insertar."""
-    insp = inspect(engine)
-    cols = {c["name"] for c in insp.get_columns("personajes")}
-    return cols
-
-def _existe_personaje(nombre: str) -> bool:
-    with engine.connect() as conn:
-        r = conn.execute(text("SELECT COUNT(*) FROM personajes WHERE nombre = :n"), {"n": nombre}).scalar()
-        return (r or 0) > 0
+def _aviso_colisiones(nombre: str, row: Dict[str, Any]) -> Optional[dict]:
+    """Personajes existentes indistinguibles (0) o casi (1 atributo) del nuevo."""
+    try:
+        colisiones = similitud.indice().colisiones(row, distancia_max=1, excluir=[nombre])
+    except Exception as e:  # el aviso nunca debe impedir el alta
+        registro.error("error_colisiones", nombre=nombre, error=str(e))
+        return None
+    if not colisiones:
+        return None
+    registro.aviso("personaje_colisiona", nombre=nombre, colisiones=colisiones[:10])
+    return {
+        "mensaje": "El personaje coincide (o casi) con otros: las preguntas actuales no lo distinguen",
+        "colisiones": [{"nombre": n, "distancia": d} for n, d in colisiones[:10]],
+    }
 
 
 # ===== Endpoints =====
 
 @router.post("/personajes/existe")
 def personajes_existe(body: ExisteReq):
+    """Existencia exacta desde el índice en memoria (+ nombres parecidos, para no duplicar)."""
     try:
-        return {"existe": _existe_personaje(body.nombre)}
+        ix = nombres.indice()
+        return {"existe": ix.existe(body.nombre), "parecidos": ix.parecidos(body.nombre)}
     except SQLAlchemyError as e:
         # Mensaje claro para el frontend
         raise HTTPException(status_code=500, detail=f"Error comprobando existencia: {str(e)}")
@@ -78,8 +84,9 @@ def upsert_personaje(req: UpsertPersonajeReq):
         raise HTTPException(status_code=422, detail="personaje_real vacío")
 
     # 1) si ya existe, no insertamos y devolvemos estado
+    #    (el índice en memoria basta para el caso positivo; el INSERT vuelve a comprobarlo)
     try:
-        if _existe_personaje(nombre):
+        if nombres.indice().existe(nombre):
             return {
                 "insertado": False,
                 "motivo": "ya_existe",
@@ -90,7 +97,7 @@ def upsert_personaje(req: UpsertPersonajeReq):
 
     # 2) Construir diccionario a insertar
     try:
-        columnas = _tabla_personajes_columnas()
+        columnas = db_sql.columnas_tabla()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"No pude leer columnas de 'personajes': {str(e)}")
 
@@ -114,21 +121,30 @@ def upsert_personaje(req: UpsertPersonajeReq):
         if col not in row:
             row[col] = 0  # por defecto 0
 
-    # 3) Insert
-    # Construir SQL dinámico seguro
-    cols_sorted = sorted(row.keys())
-    placeholders = ", ".join([f":{c}" for c in cols_sorted])
-    cols_sql = ", ".join(cols_sorted)
-    sql = f"INSERT INTO personajes ({cols_sql}) VALUES ({placeholders})"
+    # 3) ¿Choca con alguien? (mismo vector o a un atributo): se inserta igual, pero se avisa
+    aviso = _aviso_colisiones(nombre, row)
 
+    # 4) Insert (si otro lo insertó entre medias, no se toca)
+    cols_sorted = sorted(row.keys())
     try:
-        with engine.begin() as conn:
-            conn.execute(text(sql), row)
-        return {
+        if not db_sql.insertar_personaje(nombre, row):
+            nombres.anotar(nombre)
+            return {"insertado": False, "motivo": "ya_existe", "nombre": nombre}
+        parecidos = nombres.indice().parecidos(nombre)
+        nombres.anotar(nombre)
+        similitud.anotar(nombre, row)
+        respuesta = {
             "insertado": True,
             "nombre": nombre,
             "columnas_set": [c for c in cols_sorted if c not in ("id",)],
         }
+        if aviso:
+            respuesta["aviso"] = aviso
+        if parecidos:
+            # Posible duplicado escrito de otra forma ("Spider-Man" / "Spiderman")
+            registro.aviso("personaje_parecido", nombre=nombre, parecidos=parecidos)
+            respuesta["parecidos"] = parecidos
+        return respuesta
     except SQLAlchemyError as e:
         # Mensaje claro para ver exactamente qué falló
         raise HTTPException(status_code=500, detail=f"Fallo insertando personaje: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,192 @@
+# rutas/partida_ws.py
+"""
+Partida por WebSocket: una conexión por partida y un mensaje por turno.
+
+Con HTTP cada turno es una petición (/turno) que reenvía el diccionario
+completo de respuestas. Aquí el estado de la partida vive en memoria
+mientras dura la conexión y el cliente sólo manda la última respuesta.
+
+Protocolo (JSON con claves cortas):
+
+    cliente -> servidor
+      {"t": "r", "a": "<atributo>", "v": 1|0|null}   respuesta (null = no sé)
+      {"t": "g", "g": "<grupo>", "v": "<atributo>"|""|null}
+                                                     respuesta a una pregunta de grupo:
+                                                     una opción, "" = ninguna, null = no sé
+                                                     (también vale {"t": "r"} con la opción
+                                                     a 1 o con el grupo a 0|null)
+      {"t": "x", "n": "<personaje>"}                 descartar candidato ("no es")
+      {"t": "e"}                                     pedir el estado sin cambios
+      {"t": "b"}                                     reiniciar la partida
+
+    servidor -> cliente (tras cada mensaje)
+      {"t": "e", "n": turno, "top": [[nombre, p], ...], "u": umbral_alcanzado,
+       "c": candidato|null, "q": {"a": atributo, "x": texto, "g": ganancia}|null,
+       "v": versión del modelo usado en el turno}
+       + en "q", "o": [[atributo|null, p], ...] si la pregunta es de un grupo
+         (especie, origen...: se contesta con {"t": "g"}; null = ninguna)
+       + "nc": candidatos consistentes, "i": inconsistente (sólo en modo estricto)
+      {"t": "err", "m": "<motivo>"}
+       + "r": segundos antes de reintentar si el servidor está saturado
+         (servicios/admision; la respuesta ya está aplicada, basta {"t": "e"})
+
+Parámetros de conexión: ?k=<tamaño del top> (5 por defecto),
+?estricto=1|0 (por defecto config.INFERENCIA_ESTRICTA, ver servicios/bitmaps),
+?catalogo=<id> (por defecto config.CATALOGO_POR_DEFECTO, ver servicios/catalogos).
+Guardar la partida sigue siendo POST /guardar_partida al terminar.
+"""
+import time
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+import config
+from rutas.preguntas import texto_pregunta
+from servicios import admision, catalogos, metricas, registro
+from servicios.motores import MotorInferencia
+
+router = APIRouter()
+
+UMBRAL = 0.5
+TOP_MAX = 20
+
+
+class EstadoPartida:
+    """Estado de una partida abierta (una conexión)."""
+
+    def __init__(self, motor: MotorInferencia, k: int = 5, estricto: bool = False):
+        self.motor = motor
+        self.k = k
+        self.estricto = estricto
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        self.turno = 0
+        self.respuestas: Dict[str, Optional[int]] = {}
+        self.exclusiones: Set[str] = set()
+        self.grupos: Dict[str, List[str]] = {}  # opciones de los grupos ya preguntados
+        self.sin_respuesta: Set[str] = set()    # grupos contestados con "no sé"
+
+    def aplicar(self, msg: dict) -> Optional[str]:
+        """Aplica un mensaje del cliente; devuelve un error legible o None."""
+        tipo = msg.get("t")
+        if tipo == "r":
+            atributo, valor = msg.get("a"), msg.get("v")
+            if not isinstance(atributo, str) or valor not in (0, 1, None):
+                return "respuesta inválida: se espera {'t':'r','a':str,'v':0|1|null}"
+            if atributo in self.grupos:
+                # Sí/no al propio grupo: 0 = ninguna opción, null = no sé; 1 no dice cuál
+                if valor == 1:
+                    return "respuesta de grupo inválida: se contesta con {'t':'g'} o con la opción a 1"
+                return self.aplicar({"t": "g", "g": atributo, "v": "" if valor == 0 else None})
+            miembros = next((m for m in self.grupos.values() if atributo in m), None)
+            if miembros is not None and valor == 1:
+                return self.aplicar({"t": "g", "g": next(g for g, m in self.grupos.items() if m is miembros),
+                                     "v": atributo})
+            self.respuestas[atributo] = valor
+            self.turno += 1
+        elif tipo == "g":
+            grupo, valor = msg.get("g"), msg.get("v")
+            miembros = self.grupos.get(grupo)
+            if miembros is None or not (valor is None or valor == "" or valor in miembros):
+                return "respuesta de grupo inválida: se espera {'t':'g','g':grupo preguntado,'v':opción|''|null}"
+            if valor is None:
+                self.sin_respuesta.add(grupo)
+            else:
+                # Una opción: ese atributo a 1 y los demás del grupo a 0 ("" = todos a 0)
+                self.respuestas.update({a: int(a == valor) for a in miembros})
+            self.turno += 1
+        elif tipo == "x":
+            nombre = msg.get("n")
+            if not isinstance(nombre, str):
+                return "descarte inválido: se espera {'t':'x','n':str}"
+            self.exclusiones.add(nombre)
+        elif tipo == "b":
+            self.reiniciar()
+        elif tipo != "e":
+            return f"tipo de mensaje desconocido: {tipo!r}"
+        return None
+
+    def turno_siguiente(self) -> dict:
+        """Posterior (sin los descartados), decisión de propuesta y siguiente pregunta."""
+        motor = self.motor
+        with motor.fijar() as version:
+            filtro, informe = None, None
+            if self.estricto:
+                filtro, informe = motor.restriccion(self.respuestas)
+            # Posterior y siguiente pregunta con un solo cálculo del posterior
+            with metricas.cronometro(metricas.POSTERIOR, endpoint="/ws/partida"):
+                personajes, probs, mejor = motor.turno(self.respuestas, list(self.sin_respuesta), filtro,
+                                                       plazo_ms=config.IG_PLAZO_MS, masa=config.IG_PLAZO_MASA)
+            if self.exclusiones:
+                probs = np.where([p in self.exclusiones for p in personajes], 0.0, probs)
+                total = probs.sum()
+                if total > 0:
+                    probs = probs / total
+            orden = np.argsort(-probs, kind="stable")[: self.k]
+            top = [[personajes[i], round(float(probs[i]), 6)] for i in orden]
+
+            umbral = bool(top) and top[0][1] >= UMBRAL
+        pregunta = None
+        if mejor is not None:
+            pregunta = {"a": mejor["atributo"], "x": mejor.get("texto") or texto_pregunta(mejor["atributo"]),
+                        "g": round(mejor["ganancia"], 6)}
+            if mejor.get("tipo") == "grupo":
+                self.grupos[mejor["atributo"]] = [o["atributo"] for o in mejor["opciones"] if o["atributo"]]
+                pregunta["o"] = [[o["atributo"], round(o["p"], 6)] for o in mejor["opciones"]]
+        salida = {"t": "e", "n": self.turno, "top": top, "u": umbral,
+                  "c": top[0][0] if umbral else None, "q": pregunta, "v": version}
+        if informe is not None:
+            salida.update(nc=informe["candidatos"], i=informe["inconsistente"])
+        return salida
+
+
+@router.websocket("/ws/partida")
+async def partida_ws(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        k = min(TOP_MAX, max(1, int(websocket.query_params.get("k", 5))))
+    except ValueError:
+        k = 5
+    estricto = websocket.query_params.get("estricto")
+    try:
+        motor = await run_in_threadpool(catalogos.motor, websocket.query_params.get("catalogo"))
+    except catalogos.CatalogoDesconocido as e:
+        await websocket.send_json({"t": "err", "m": str(e)})
+        await websocket.close(code=1008)
+        return
+    except Exception as e:
+        registro.error("error_cargando_catalogo", error=str(e))
+        await websocket.send_json({"t": "err", "m": "no se pudo cargar el catálogo"})
+        await websocket.close(code=1011)
+        return
+    estado = EstadoPartida(motor, k, config.INFERENCIA_ESTRICTA if estricto is None
+                           else estricto in ("1", "true", "si"))
+    metricas.SESIONES_WS.inc()
+    try:
+        while True:
+            msg = await websocket.receive_json()
+            t0 = time.perf_counter()
+            error = estado.aplicar(msg) if isinstance(msg, dict) else "se espera un objeto JSON"
+            if error:
+                await websocket.send_json({"t": "err", "m": error})
+                continue
+            try:
+                # El cálculo es CPU (NumPy): al pool de inferencia, con control de admisión
+                salida = await admision.CONTROL.ejecutar("/ws/partida", estado.turno_siguiente)
+            except admision.Saturado as e:
+                await websocket.send_json({"t": "err", "m": "servidor saturado", "r": e.reintentar_s})
+                continue
+            except Exception as e:
+                registro.error("error_turno_ws", error=str(e))
+                await websocket.send_json({"t": "err", "m": "error calculando el turno"})
+                continue
+            await websocket.send_json(salida)
+            metricas.TURNO_WS.observe(time.perf_counter() - t0)
+            registro.muestreado("turno_ws", turno=estado.turno, top1=salida["top"][:1])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        metricas.SESIONES_WS.dec()
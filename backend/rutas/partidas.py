@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from typing import List, Dict, Union, Optional
 from db import db
 from datetime import datetime
+import config
+from servicios import analitica_fallos, metricas, partidas_compactas, registro
 
 router = APIRouter()
 
@@ -19,40 +21,56 @@ class Partida(BaseModel):
 def guardar_partida(partida: Partida):
     doc = partida.dict()
     doc["timestamp"] = datetime.utcnow().isoformat()
-    db["partidas"].insert_one(doc)
+    # Formato compacto opcional (se guarda el original si la partida no cabe en él)
+    compacta = partidas_compactas.codificar(doc) if config.PARTIDAS_COMPACTAS else None
+    with metricas.cronometro(metricas.MONGO_GUARDADO, operacion="partida"):
+        db["partidas"].insert_one(compacta or doc)
 
-    # Guardar si fue fallida para mejorar después
-    if partida.acertado is False and partida.propuesto:
-        print(f"⚠ Partida fallida: propuso {partida.propuesto}, real {partida.personaje_real}")
+    # Guardar si fue fallida para mejorar después (contadores incrementales)
+    if partida.acertado is False:
+        with metricas.cronometro(metricas.MONGO_GUARDADO, operacion="analitica_fallos"):
+            analitica_fallos.registrar_partida_fallida(doc)
+        registro.muestreado("partida_fallida", propuesto=partida.propuesto, real=partida.personaje_real)
 
     return {"mensaje": "✅ Partida guardada correctamente"}
 @router.get("/partidas")
 def listar_partidas(limit: int = 50):
-    cur = db["partidas"].find({}, {"_id": 0}).sort("timestamp", -1).limit(limit)
-    return {"partidas": list(cur)}
+    with metricas.cronometro(metricas.MONGO_CONSULTA, operacion="partidas"):
+        cur = db["partidas"].find({}, {"_id": 0}).sort("timestamp", -1).limit(limit)
+        return {"partidas": partidas_compactas.decodificar_todas(cur)}
 @router.get("/partidas_fallidas")
 def partidas_fallidas():
-    return {"partidas": list(db["partidas"].find({"acertado": False}, {"_id": 0}).sort("timestamp", -1))}
+    with metricas.cronometro(metricas.MONGO_CONSULTA, operacion="partidas_fallidas"):
+        cur = db["partidas"].find({"acertado": False}, {"_id": 0}).sort("timestamp", -1)
+        return {"partidas": partidas_compactas.decodificar_todas(cur)}
 
 @router.get("/sugerir_pregunta")
-def sugerir_pregunta():
-    # Buscar preguntas que más aparecen como null en fallidas
-    pipeline = [
-        {"$match": {"acertado": False}},
-        {"$project": {"respuestas": 1}},
-        {"$unwind": {"path": "$respuestas"}},
-        {"$match": {"respuestas": None}},
-        {"$group": {"_id": "$respuestas", "frecuencia": {"$sum": 1}}},
-        {"$sort": {"frecuencia": -1}},
-        {"$limit": 5}
-    ]
-    sugerencias = list(db["partidas"].aggregate(pipeline))
-    return {"sugerencias": sugerencias}
+def sugerir_pregunta(limit: int = 5):
+    # Preguntas que más se quedan sin responder (null o sin preguntar) en partidas fallidas.
+    # Se leen de los contadores que mantiene guardar_partida.
+    with metricas.cronometro(metricas.MONGO_CONSULTA, operacion="sugerencias"):
+        return {"sugerencias": analitica_fallos.sugerencias(limit)}
+
+@router.get("/confusiones")
+def confusiones(limit: int = 10):
+    # Pares (propuesto, personaje_real) más confundidos en partidas fallidas
+    with metricas.cronometro(metricas.MONGO_CONSULTA, operacion="confusiones"):
+        return {"confusiones": analitica_fallos.confusiones(limit)}
+
+@router.post("/partidas/compactar")
+def compactar_partidas(lote: int = 500):
+    # Migra las partidas antiguas al formato compacto (idempotente)
+    return partidas_compactas.migrar(max(1, lote))
+
+@router.post("/analitica/reconstruir")
+def reconstruir_analitica():
+    # Recalcula los contadores desde el histórico de partidas
+    return analitica_fallos.reconstruir()
 
 @router.get("/partidas")
 def listar_partidas(limit: int = 50):
     cur = db["partidas"].find({}, {"_id": 0}).sort("timestamp", -1).limit(limit)
-    return {"partidas": list(cur)}
+    return {"partidas": partidas_compactas.decodificar_todas(cur)}
 
 @router.get("/estadisticas")
 def estadisticas():
@@ -2,8 +2,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import Dict, Optional
-from sqlalchemy import text
-from db_sql import engine  # usa el engine que ya tienes (mysql+mysqlconnector://...)
+import db_sql  # acceso compartido a `personajes` (MySQL o SQLite según config)
+from servicios import datos_personajes, nombres, registro, similitud
 
 router = APIRouter()
 
@@ -21,19 +21,9 @@ def columnas_personajes():
     Lee las columnas reales de la tabla para filtrar el dict de atributos.
     Evita columnas auto/ID y mantiene solo 0/1.
     """
-    with engine.connect() as conn:
-        cols = conn.execute(
-            text("""
-                SELECT COLUMN_NAME
-                FROM information_schema.COLUMNS
-                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'personajes'
-            """)
-        ).fetchall()
-    # a plano
-    cols = [c[0] for c in cols]
     # típicas columnas a ignorar si existen
     ignora = {"id", "_id", "created_at", "updated_at"}
-    return [c for c in cols if c not in ignora]
+    return [c for c in db_sql.columnas_tabla() if c not in ignora]
 
 # ---- ENDPOINTS ----
 @router.post("/personajes/existe")
@@ -41,11 +31,17 @@ def personajes_existe(payload: PersonajeExiste):
     nombre = payload.nombre.strip()
     if not nombre:
         return {"existe": False}
-    with engine.connect() as conn:
-        r = conn.execute(text(
-            "SELECT COUNT(*) FROM personajes WHERE nombre = :n"
-        ), {"n": nombre}).scalar_one()
-    return {"existe": (r > 0)}
+    return {"existe": nombres.indice().existe(nombre)}
+
+@router.get("/personajes/sugerir")
+def personajes_sugerir(q: str, k: int = 10):
+    """
+    Autocompletado del nombre del personaje (índice en memoria, ver servicios/nombres):
+    misma forma normalizada, luego por prefijo y luego con erratas.
+    """
+    if not q.strip():
+        return {"q": q, "sugerencias": []}
+    return {"q": q, "sugerencias": nombres.indice().sugerencias(q, min(50, max(1, k)))}
 
 @router.post("/fallo/upsert_personaje")
 def fallo_upsert_personaje(body: UpsertPersonaje):
@@ -62,25 +58,21 @@ def fallo_upsert_personaje(body: UpsertPersonaje):
     if 'nombre' not in cols_validas:
         raise HTTPException(status_code=500, detail="La tabla 'personajes' no tiene columna 'nombre'")
 
-    # Construir INSERT dinámico (si existe, se actualiza)
-    # Requiere que 'nombre' sea UNIQUE o PRIMARY KEY para que ON DUPLICATE KEY funcione como UPSERT
-    columnas = ['nombre'] + list(attrs.keys())
-    placeholders = [":nombre"] + [f":{k}" for k in attrs.keys()]
-    ondup = ", ".join([f"{k}=VALUES({k})" for k in attrs.keys()]) or "nombre=nombre"
-
-    params = {"nombre": nombre, **attrs}
-    sql = f"""
-        INSERT INTO personajes ({", ".join(columnas)})
-        VALUES ({", ".join(placeholders)})
-        ON DUPLICATE KEY UPDATE {ondup}
-    """
-
+    # Inserta o actualiza sólo los atributos recibidos (mismo comportamiento en MySQL y SQLite)
     try:
-        with engine.begin() as conn:
-            res = conn.execute(text(sql), params)
-        # Si res.rowcount > 0 se insertó o actualizó
+        db_sql.upsert_personaje(nombre, attrs)
+        nombres.anotar(nombre)
+        similitud.anotar(nombre, attrs)
         return {"ok": True, "insertado": True}
-    except Exception as e:
-        # Log claro para depurar
-        print("❌ upsert_personaje:", e)
+    except Exception:
+        registro.excepcion("error_upsert_personaje", nombre=nombre)
         raise HTTPException(status_code=500, detail="No se pudo upsertar el personaje")
+
+@router.post("/personajes/refrescar")
+def refrescar_personajes():
+    """Aplica al dataset y a los modelos sólo los personajes cambiados desde la última revisión."""
+    try:
+        return datos_personajes.refrescar()
+    except Exception:
+        registro.excepcion("error_refrescar_personajes")
+        raise HTTPException(status_code=500, detail="No se pudo refrescar personajes")
@@ -1,11 +1,50 @@
 from fastapi import APIRouter
+from typing import Dict, List, Optional
 from db import db
 import random
+import threading
+from servicios import metricas
 
 router = APIRouter()
 
+# Catálogo de preguntas en memoria (se carga en el calentamiento del arranque)
+CATALOGO: Optional[List[dict]] = None
+_TEXTOS: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def cargar_catalogo(forzar: bool = False) -> List[dict]:
+    """Lee la colección 'preguntas' una vez y la deja en memoria."""
+    global CATALOGO, _TEXTOS
+    with _lock:
+        if CATALOGO is None or forzar:
+            metricas.CACHE.inc(cache="preguntas", resultado="fallo")
+            with metricas.cronometro(metricas.MONGO_CONSULTA, operacion="preguntas"):
+                preguntas = list(db["preguntas"].find({}, {"_id": 0}))
+            _TEXTOS = {
+                p["atributo"]: p["texto"]
+                for p in preguntas
+                if p.get("atributo") and p.get("texto") and p.get("activa", True)
+            }
+            CATALOGO = preguntas
+        else:
+            metricas.CACHE.inc(cache="preguntas", resultado="acierto")
+        return CATALOGO
+
+
+def texto_pregunta(atributo: str) -> Optional[str]:
+    """Texto de la pregunta activa asociada a un atributo (None si no hay)."""
+    cargar_catalogo()
+    return _TEXTOS.get(atributo)
+
+
 @router.get("/activas")
 def listar_preguntas():
-    preguntas = list(db["preguntas"].find({}, {"_id": 0}))
+    preguntas = [dict(p) for p in cargar_catalogo()]
     random.shuffle(preguntas)  # 🔹 Mezcla aleatoria
-    return {"preguntas": preguntas}
\ No newline at end of file
+    return {"preguntas": preguntas}
+
+
+@router.post("/recargar")
+def recargar_preguntas():
+    return {"total": len(cargar_catalogo(forzar=True))}
@@ -0,0 +1,55 @@
+# rutas/similitud.py
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+import numpy as np
+from servicios import similitud
+from servicios.admision import admitido
+from servicios.motores import motor_activo
+
+router = APIRouter()
+
+
+class ReqSeparadores(BaseModel):
+    respuestas: Dict[str, Optional[int]] = {}
+    excluidas: List[str] = []   # candidatos ya descartados ("no es X")
+    top: int = 10               # candidatos del posterior que se quieren separar
+    limite: int = 10            # atributos a devolver
+
+
+@router.get("/similitud/grupos")
+def grupos_indistinguibles(distancia: int = 0, limite: int = 100):
+    """
+    Personajes que ninguna secuencia de preguntas separa (distancia 0) o que
+    sólo separa una pregunta concreta (distancia 1).
+    """
+    if distancia not in (0, 1):
+        raise HTTPException(status_code=422, detail="distancia debe ser 0 o 1")
+    grupos = similitud.indice().grupos(distancia)
+    return {"total": len(grupos), "grupos": grupos[: max(0, limite)]}
+
+
+@router.get("/similitud/vecinos")
+def vecinos(nombre: str, k: int = 5):
+    ix = similitud.indice()
+    i = ix.posicion.get(nombre)
+    if i is None:
+        raise HTTPException(status_code=404, detail=f"Personaje desconocido: {nombre}")
+    return {"nombre": nombre,
+            "vecinos": [{"nombre": n, "distancia": d} for n, d in ix.vecinos(ix.bits[i], k, excluir=[nombre])]}
+
+
+@router.post("/similitud/separadores")
+@admitido("/similitud/separadores")
+def separadores(req: ReqSeparadores):
+    """Atributos (no respondidos) que mejor separan a los candidatos actuales del posterior."""
+    personajes, probs = motor_activo().posterior(req.respuestas)
+    excl = set(req.excluidas)
+    orden = [i for i in np.argsort(-probs, kind="stable") if personajes[i] not in excl][: max(2, req.top)]
+    nombres = [personajes[i] for i in orden]
+    respondidos = [a for a, v in req.respuestas.items() if v is not None]
+    return {
+        "candidatos": [[personajes[i], float(probs[i])] for i in orden],
+        "atributos": similitud.indice().separadores(
+            nombres, [float(probs[i]) for i in orden], excluir=respondidos, limite=req.limite),
+    }
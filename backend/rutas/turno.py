@@ -0,0 +1,94 @@
+# rutas/turno.py
+"""
+Un turno de partida en una sola petición.
+
+El cliente que llama a /inferir y después a /pregunta_siguiente con las
+mismas respuestas hace dos peticiones y el posterior se calcula dos veces.
+/turno lo calcula una vez (ver MotorInferencia.turno) y devuelve el top-k,
+la decisión de propuesta y la siguiente pregunta con la misma instantánea.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+import config
+from rutas.catalogos import motor_de
+from rutas.preguntas import texto_pregunta
+from servicios import metricas, registro
+from servicios.admision import admitido
+from servicios.perfilado import perfilable
+
+router = APIRouter()
+
+UMBRAL = 0.5  # igual que /inferir
+TOP_MAX = 20
+
+
+# ----------------------
+# Entrada
+# ----------------------
+class ReqTurno(BaseModel):
+    respuestas: Dict[str, Optional[int]] = {}
+    excluidas: Optional[List[str]] = None  # atributos que no se deben preguntar
+    top: int = 5
+    estricto: Optional[bool] = None        # None -> config.INFERENCIA_ESTRICTA
+    catalogo: Optional[str] = None         # None -> config.CATALOGO_POR_DEFECTO
+    plazo_ms: Optional[float] = None       # None -> config.IG_PLAZO_MS (0 = sin plazo)
+    masa: Optional[float] = None           # None -> config.IG_PLAZO_MASA (sólo con plazo)
+
+
+# ----------------------
+# ENDPOINT
+# ----------------------
+@router.post("/turno")
+@admitido("/turno")
+@perfilable
+def turno(req: ReqTurno):
+    """
+    Devuelve { resultado: top-k, umbral, candidato, pregunta, version_modelo }
+    con pregunta = { atributo, texto, ganancia, p1, H_si_0, H_si_1 (+ busqueda) }
+    o null si no quedan preguntas útiles (+ candidatos e inconsistente en modo estricto).
+    Una pregunta de grupo trae tipo "grupo" y opciones (ver /pregunta_siguiente);
+    se contesta con la opción elegida a 1 (los demás miembros sin responder pasan
+    a 0) o con el nombre del grupo a 0 (ninguna) o a null (no sé).
+    """
+    motor = motor_de(req.catalogo)
+    respuestas = req.respuestas or {}
+    try:
+        with motor.fijar() as version:
+            filtro, informe = None, {}
+            if config.INFERENCIA_ESTRICTA if req.estricto is None else req.estricto:
+                filtro, informe = motor.restriccion(respuestas)
+            plazo_ms = config.IG_PLAZO_MS if req.plazo_ms is None else max(0.0, req.plazo_ms)
+            masa = config.IG_PLAZO_MASA if req.masa is None else min(1.0, max(0.5, req.masa))
+            with metricas.cronometro(metricas.POSTERIOR, endpoint="/turno"):
+                personajes, probs, mejor = motor.turno(respuestas, req.excluidas or [], filtro,
+                                                       plazo_ms=plazo_ms, masa=masa)
+    except Exception as e:
+        registro.error("error_turno", error=str(e))
+        raise HTTPException(status_code=500, detail="Error calculando el turno")
+
+    orden = np.argsort(-probs, kind="stable")[: min(TOP_MAX, max(1, req.top))]
+    top = [(personajes[i], float(probs[i])) for i in orden]
+    umbral = bool(top) and top[0][1] >= UMBRAL
+
+    pregunta = None
+    if mejor is not None:
+        try:
+            txt = texto_pregunta(mejor["atributo"])
+        except Exception:
+            txt = None
+        pregunta = {"texto": txt, **mejor}
+    registro.muestreado("turno", motor=motor.nombre,
+                        respondidas=sum(v is not None for v in respuestas.values()),
+                        top3=top[:3], umbral=umbral, atributo=mejor and mejor["atributo"])
+    return {
+        "resultado": top,
+        "umbral": umbral,
+        "candidato": top[0][0] if umbral else None,
+        "pregunta": pregunta,
+        "version_modelo": version,
+        **informe,
+    }
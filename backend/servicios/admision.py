@@ -0,0 +1,134 @@
+# servicios/admision.py
+"""
+Control de admisión de los endpoints de inferencia (CPU).
+
+/inferir, /pregunta_siguiente, /turno... son NumPy puro y antes corrían en
+el threadpool compartido de Starlette: una ráfaga de ganancias de
+información lo ocupaba entero y /guardar_partida o /personajes/existe
+esperaban detrás. Ahora se ejecutan en un pool propio y acotado:
+
+- config.INFERENCIA_HILOS hilos de cálculo y como mucho config.INFERENCIA_COLA
+  peticiones esperando; con el pool lleno se rechaza en el acto con 503.
+- config.INFERENCIA_LIMITES: máximo de peticiones admitidas (en cola o en
+  curso) por endpoint; por encima, 429.
+- Los rechazos llevan Retry-After estimado con el tiempo medio de cálculo.
+
+Métricas: espera en cola y tiempo de cálculo por endpoint, rechazos, cola
+y hilos ocupados (adivinador_admision_*).
+"""
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import config
+from servicios import metricas
+
+
+class Saturado(Exception):
+    """Petición rechazada por el control de admisión (main.py la convierte en 429/503)."""
+
+    def __init__(self, codigo: int, motivo: str, reintentar_s: int):
+        super().__init__(motivo)
+        self.codigo = codigo
+        self.motivo = motivo
+        self.reintentar_s = reintentar_s
+
+
+class ControlAdmision:
+    def __init__(self, hilos: int, cola: int, limites: Optional[Dict[str, int]] = None):
+        self.hilos = max(1, hilos)
+        self.cola = max(0, cola)
+        self.limites = dict(limites or {})
+        self._lock = threading.Lock()
+        self._admitidas = 0
+        self._por_endpoint: Dict[str, int] = {}
+        self._t_medio = 0.05  # media móvil del tiempo de cálculo (s), para Retry-After
+        self._ejecutor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._ejecutor is None:
+            with self._lock:
+                if self._ejecutor is None:
+                    self._ejecutor = ThreadPoolExecutor(self.hilos, thread_name_prefix="inferencia")
+        return self._ejecutor
+
+    def reintentar_en(self) -> int:
+        """Segundos hasta que probablemente haya hueco: lo que hay por delante / hilos."""
+        return max(1, math.ceil((self._admitidas / self.hilos + 1) * self._t_medio))
+
+    def _admitir(self, endpoint: str) -> None:
+        with self._lock:
+            limite = self.limites.get(endpoint)
+            if limite is not None and self._por_endpoint.get(endpoint, 0) >= limite:
+                codigo, motivo = 429, "limite_endpoint"
+            elif self._admitidas >= self.hilos + self.cola:
+                codigo, motivo = 503, "cola_llena"
+            else:
+                self._admitidas += 1
+                self._por_endpoint[endpoint] = self._por_endpoint.get(endpoint, 0) + 1
+                metricas.COLA_ADMISION.set(max(0, self._admitidas - self.hilos))
+                return
+            reintentar = self.reintentar_en()
+        metricas.RECHAZOS_ADMISION.inc(endpoint=endpoint, motivo=motivo)
+        raise Saturado(codigo, motivo, reintentar)
+
+    def _liberar(self, endpoint: str) -> None:
+        with self._lock:
+            self._admitidas -= 1
+            self._por_endpoint[endpoint] -= 1
+            metricas.COLA_ADMISION.set(max(0, self._admitidas - self.hilos))
+
+    async def ejecutar(self, endpoint: str, fn: Callable, *args, **kwargs):
+        """Ejecuta fn(*args, **kwargs) en el pool de inferencia o lanza Saturado sin esperar."""
+        self._admitir(endpoint)
+        t_entrada = time.perf_counter()
+        ctx = contextvars.copy_context()  # perfilado, instantánea fijada...
+
+        def tarea():
+            t0 = time.perf_counter()
+            metricas.ESPERA_ADMISION.observe(t0 - t_entrada, endpoint=endpoint)
+            metricas.HILOS_ADMISION.inc()
+            try:
+                return ctx.run(fn, *args, **kwargs)
+            finally:
+                duracion = time.perf_counter() - t0
+                metricas.HILOS_ADMISION.dec()
+                metricas.COMPUTO_ADMISION.observe(duracion, endpoint=endpoint)
+                self._t_medio = 0.9 * self._t_medio + 0.1 * duracion
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), tarea)
+        finally:
+            self._liberar(endpoint)
+
+
+def _limites(valor: str) -> Dict[str, int]:
+    salida = {}
+    for parte in valor.split(","):
+        endpoint, _, n = parte.strip().partition("=")
+        if endpoint and n.strip().isdigit():
+            salida[endpoint] = int(n)
+    return salida
+
+
+CONTROL = ControlAdmision(config.INFERENCIA_HILOS, config.INFERENCIA_COLA, _limites(config.INFERENCIA_LIMITES))
+
+
+def admitido(endpoint: str) -> Callable:
+    """
+    Decorador de handlers síncronos de inferencia: los convierte en async y
+    los ejecuta en el pool de CONTROL (FastAPI sigue viendo la misma firma).
+    """
+    def decorador(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def envoltura(*args, **kwargs):
+            return await CONTROL.ejecutar(endpoint, fn, *args, **kwargs)
+
+        return envoltura
+
+    return decorador
@@ -0,0 +1,240 @@
+# servicios/analitica_fallos.py
+"""
+Contadores incrementales sobre las partidas fallidas.
+
+En lugar de recorrer toda la colección `partidas` en cada consulta, cada
+partida fallida que se guarda actualiza dos colecciones pequeñas:
+
+- `analitica_atributos`:  { _id: atributo, sin_responder, respondido_0, respondido_1 }
+- `analitica_confusiones`: { _id: {propuesto, real}, propuesto, real, veces }
+
+Así `/sugerir_pregunta` y el listado de pares más confundidos se sirven
+leyendo unos pocos documentos ya agregados.
+
+Un atributo queda "sin responder" en una partida si no se contestó con 0 ni
+con 1: "no sé" (null) o no llegó a preguntarse. Los clientes sólo mandan lo
+que se contestó, así que se cuentan todos los atributos del registro
+(servicios/partidas_compactas) que falten en `respuestas`.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DESCENDING, UpdateOne
+
+from db import db
+from servicios import partidas_compactas
+
+COL_ATRIBUTOS = "analitica_atributos"
+COL_CONFUSIONES = "analitica_confusiones"
+CAMPOS = ("sin_responder", "respondido_0", "respondido_1")
+MARGEN_S = 60  # `timestamp` se pone antes de insertar: holgura del corte de `reconstruir`
+
+_indices_listos = False
+
+
+def _asegurar_indices() -> None:
+    """Crea (una sola vez por proceso) los índices de ordenación."""
+    global _indices_listos
+    if _indices_listos:
+        return
+    db[COL_ATRIBUTOS].create_index([("sin_responder", DESCENDING)])
+    db[COL_CONFUSIONES].create_index([("veces", DESCENDING)])
+    _indices_listos = True
+
+
+def _campo_respuesta(valor: Optional[int]) -> str:
+    """0/1 -> 'respondido_0'/'respondido_1'; null, ausente u otro valor -> 'sin_responder'."""
+    if valor in (0, 1):
+        return f"respondido_{int(valor)}"
+    return "sin_responder"
+
+
+def _ahora(menos_s: float = 0.0) -> str:
+    """Mismo formato que el `timestamp` de las partidas (ISO, UTC): se comparan como cadenas."""
+    return (datetime.utcnow() - timedelta(seconds=menos_s)).isoformat()
+
+
+def _operaciones_atributos(respuestas: Dict[str, Optional[int]], ahora: str) -> List[UpdateOne]:
+    respuestas = respuestas or {}
+    atributos = dict.fromkeys([*partidas_compactas.atributos_actuales(), *respuestas])
+    return [UpdateOne({"_id": a}, {"$inc": {_campo_respuesta(respuestas.get(a)): 1},
+                                   "$set": {"actualizado": ahora}}, upsert=True)
+            for a in atributos]
+
+
+def _par_confusion(propuesto: Optional[str], real: Optional[str]) -> Optional[Tuple[str, str]]:
+    propuesto = (propuesto or "").strip()
+    real = (real or "").strip()
+    if not propuesto or not real or propuesto == real:
+        return None
+    return propuesto, real
+
+
+def _operacion_confusion(propuesto: Optional[str], real: Optional[str], ahora: str) -> Optional[UpdateOne]:
+    par = _par_confusion(propuesto, real)
+    if par is None:
+        return None
+    propuesto, real = par
+    return UpdateOne(
+        {"_id": {"propuesto": propuesto, "real": real}},
+        {"$inc": {"veces": 1}, "$set": {"propuesto": propuesto, "real": real, "actualizado": ahora}},
+        upsert=True,
+    )
+
+
+# =========================
+#  📦 API DEL MÓDULO
+# =========================
+def registrar_partida_fallida(partida: dict) -> None:
+    """
+    Actualiza los contadores con una partida fallida (acertado == False).
+    Se llama desde `guardar_partida` justo después de insertar el documento.
+    """
+    if partida.get("acertado") is not False:
+        return
+    _asegurar_indices()
+    ahora = _ahora()
+
+    ops = _operaciones_atributos(partida.get("respuestas") or {}, ahora)
+    if ops:
+        db[COL_ATRIBUTOS].bulk_write(ops, ordered=False)
+
+    op = _operacion_confusion(partida.get("propuesto"), partida.get("personaje_real"), ahora)
+    if op is not None:
+        db[COL_CONFUSIONES].bulk_write([op])
+
+
+def contar(partidas: Iterable[dict]) -> Tuple[Dict[str, Dict[str, int]], Dict[Tuple[str, str], int], int]:
+    """
+    Contadores de un lote de partidas fallidas sin escribirlos:
+    ({atributo: {campo: n}}, {(propuesto, real): veces}, partidas contadas).
+    Las partidas compactas se cuentan todas juntas sumando bits
+    (servicios/partidas_compactas).
+    """
+    respondidas: Dict[str, Dict[str, int]] = {}  # sólo 0/1 de las partidas en formato original
+    pares: Dict[Tuple[str, str], int] = {}
+    compactas: List[dict] = []
+    procesadas = 0
+    for partida in partidas:
+        procesadas += 1
+        if partidas_compactas.es_compacta(partida):
+            compactas.append(partida)
+        else:
+            for atributo, valor in (partida.get("respuestas") or {}).items():
+                fila = respondidas.setdefault(atributo, {})
+                if valor in (0, 1):
+                    campo = _campo_respuesta(valor)
+                    fila[campo] = fila.get(campo, 0) + 1
+        par = _par_confusion(partida.get("propuesto"), partida.get("personaje_real"))
+        if par is not None:
+            pares[par] = pares.get(par, 0) + 1
+
+    # Sin responder = partidas de cada formato en las que el atributo no es 0 ni 1
+    originales = procesadas - len(compactas)
+    de_compactas = partidas_compactas.contar_respuestas(compactas)
+    cuentas: Dict[str, Dict[str, int]] = {}
+    for atributo in dict.fromkeys([*partidas_compactas.atributos_actuales(), *respondidas, *de_compactas]):
+        orig, comp = respondidas.get(atributo, {}), de_compactas.get(atributo)
+        fila = {c: orig.get(c, 0) + (comp or {}).get(c, 0) for c in ("respondido_0", "respondido_1")}
+        fila["sin_responder"] = (originales - orig.get("respondido_0", 0) - orig.get("respondido_1", 0)
+                                 + (comp.get("sin_responder", 0) if comp is not None else len(compactas)))
+        fila = {c: n for c, n in fila.items() if n}
+        if fila:
+            cuentas[atributo] = fila
+    return cuentas, pares, procesadas
+
+
+def partidas_fallidas(antes_de: Optional[str] = None, desde: Optional[str] = None) -> Iterable[dict]:
+    """
+    Partidas fallidas con lo justo para `contar` (en cualquiera de los dos formatos),
+    opcionalmente sólo las de `timestamp` < `antes_de` (o sin timestamp) o >= `desde`.
+    """
+    filtro: dict = {"acertado": False}
+    if antes_de is not None:
+        filtro["timestamp"] = {"$not": {"$gte": antes_de}}
+    elif desde is not None:
+        filtro["timestamp"] = {"$gte": desde}
+    proyeccion = {"_id": 0, "acertado": 1, "respuestas": 1, "propuesto": 1, "personaje_real": 1,
+                  **partidas_compactas.PROYECCION_COMPACTA}
+    return db["partidas"].find(filtro, proyeccion)
+
+
+def _sumar(a: tuple, b: tuple) -> tuple:
+    """Suma dos resultados de `contar`."""
+    cuentas = {k: dict(v) for k, v in a[0].items()}
+    for atributo, campos in b[0].items():
+        fila = cuentas.setdefault(atributo, {})
+        for c, n in campos.items():
+            fila[c] = fila.get(c, 0) + n
+    pares = dict(a[1])
+    for par, n in b[1].items():
+        pares[par] = pares.get(par, 0) + n
+    return cuentas, pares, a[2] + b[2]
+
+
+def reconstruir() -> dict:
+    """
+    Recalcula los contadores desde cero a partir de `partidas`.
+    Útil para poblarlos con el histórico previo o tras borrar partidas a mano.
+    Se acumula en memoria y se escribe una vez por atributo/par, no por partida.
+
+    Los documentos se sobrescriben ($set con una marca de esta reconstrucción)
+    y después se borran los que no llevan la marca: una lectura concurrente o
+    un fallo a medias ven los contadores viejos o los nuevos, nunca vacíos.
+
+    Con partidas guardándose a la vez: el recorrido largo se corta MARGEN_S
+    antes del inicio y las partidas posteriores al corte se vuelven a leer
+    justo antes de escribir (su $inc incremental se pisa con el $set, así que
+    hay que sumarlas); el borrado respeta los documentos que
+    `registrar_partida_fallida` ha tocado desde el inicio (`actualizado`),
+    aunque no lleven la marca. Sólo queda expuesta la ventana de la propia
+    escritura (una partida guardada mientras se aplica el $set).
+    """
+    _asegurar_indices()
+    inicio, corte = _ahora(), _ahora(MARGEN_S)
+    historico = contar(partidas_fallidas(antes_de=corte))
+    cuentas, pares, procesadas = _sumar(historico, contar(partidas_fallidas(desde=corte)))
+    marca = uuid.uuid4().hex
+
+    ops = [UpdateOne({"_id": a}, {"$set": {**{c: campos.get(c, 0) for c in CAMPOS}, "reconstruccion": marca}},
+                     upsert=True)
+           for a, campos in cuentas.items()]
+    if ops:
+        db[COL_ATRIBUTOS].bulk_write(ops, ordered=False)
+    ops = [UpdateOne({"_id": {"propuesto": p, "real": r}},
+                     {"$set": {"propuesto": p, "real": r, "veces": veces, "reconstruccion": marca}}, upsert=True)
+           for (p, r), veces in pares.items()]
+    if ops:
+        db[COL_CONFUSIONES].bulk_write(ops, ordered=False)
+    obsoletos = {"reconstruccion": {"$ne": marca}, "actualizado": {"$not": {"$gte": inicio}}}
+    db[COL_ATRIBUTOS].delete_many(obsoletos)
+    db[COL_CONFUSIONES].delete_many(obsoletos)
+    return {"partidas_procesadas": procesadas}
+
+
+def sugerencias(limit: int = 5) -> List[dict]:
+    """Atributos que más se quedan sin responder en partidas fallidas."""
+    _asegurar_indices()
+    cur = (
+        db[COL_ATRIBUTOS]
+        .find({"sin_responder": {"$gt": 0}})
+        .sort("sin_responder", DESCENDING)
+        .limit(limit)
+    )
+    return [
+        {
+            "_id": doc["_id"],
+            "frecuencia": doc.get("sin_responder", 0),
+            "respondido_0": doc.get("respondido_0", 0),
+            "respondido_1": doc.get("respondido_1", 0),
+        }
+        for doc in cur
+    ]
+
+
+def confusiones(limit: int = 10) -> List[dict]:
+    """Pares (propuesto, personaje_real) más frecuentes en partidas fallidas."""
+    _asegurar_indices()
+    cur = db[COL_CONFUSIONES].find({}, {"_id": 0, "reconstruccion": 0, "actualizado": 0}).sort("veces", DESCENDING).limit(limit)
+    return list(cur)
@@ -0,0 +1,87 @@
+# servicios/arranque.py
+"""
+Calentamiento del servidor: crea el esquema SQL, carga el catálogo de
+preguntas y entrena el motor de inferencia antes de que llegue el primer usuario.
+
+Se ejecuta en un hilo aparte desde el `lifespan` de main.py; mientras tanto
+`/ready` responde 503 con la fase en curso.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from servicios import registro
+
+ESTADO: Dict[str, object] = {
+    "listo": False,
+    "fase": "pendiente",
+    "error": None,
+    "tiempos": {},  # fase -> segundos
+}
+_lock = threading.Lock()
+
+
+def _fase(nombre: str, fn) -> None:
+    ESTADO["fase"] = nombre
+    t0 = time.perf_counter()
+    fn()
+    ESTADO["tiempos"][nombre] = round(time.perf_counter() - t0, 4)
+
+
+def calentar() -> Dict[str, object]:
+    """Ejecuta todas las fases; si una falla queda registrada y el servicio no está listo."""
+    with _lock:
+        if ESTADO["listo"]:
+            return ESTADO
+        ESTADO["error"] = None
+        try:
+            # Importes diferidos: sólo el calentamiento paga pandas/numpy/etc.
+            import db_sql
+            from rutas import preguntas
+            from servicios import nombres
+            from servicios.motores import motor_activo
+
+            motor = motor_activo()
+
+            _fase("esquema_sql", db_sql.inicializar_esquema)
+            _fase("catalogo_preguntas", preguntas.cargar_catalogo)
+            _fase("modelos", motor.asegurar_entrenado)
+            if not motor.entrenado:
+                raise RuntimeError(f"No se entrenó el motor {motor.nombre}")
+            _fase("indice_nombres", nombres.indice)
+            ESTADO["fase"] = "listo"
+            ESTADO["listo"] = True
+            registro.info("calentamiento_listo", tiempos=ESTADO["tiempos"])
+        except Exception as e:
+            ESTADO["error"] = f"{ESTADO['fase']}: {e}"
+            registro.error("calentamiento_fallido", error=ESTADO["error"])
+        return ESTADO
+
+
+def _bucle_refresco(intervalo: int) -> None:
+    """Aplica periódicamente los cambios de `personajes` (servicios/datos_personajes)."""
+    from servicios import datos_personajes
+
+    while True:
+        time.sleep(intervalo)
+        if datos_personajes.DATASET is None:
+            continue  # aún sin carga completa (calentamiento o primera petición)
+        try:
+            datos_personajes.refrescar()
+        except Exception as e:
+            registro.error("refresco_fallido", error=str(e))
+
+
+def calentar_en_segundo_plano() -> Optional[threading.Thread]:
+    hilo = threading.Thread(target=calentar, name="calentamiento", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def iniciar_refresco() -> None:
+    """Hilo que aplica los cambios de `personajes` cada config.REFRESCO_PERSONAJES_S (con o sin calentamiento)."""
+    import config
+
+    if config.REFRESCO_PERSONAJES_S > 0:
+        threading.Thread(target=_bucle_refresco, args=(config.REFRESCO_PERSONAJES_S,),
+                         name="refresco_personajes", daemon=True).start()
@@ -0,0 +1,198 @@
+# servicios/bitmaps.py
+"""
+Índice invertido de bitmaps: para cada atributo de ATRIBUTOS_BINARIOS, el
+conjunto de personajes con valor 1 como bits empaquetados en uint64.
+
+Con datos fiables, cada respuesta binaria es un filtro duro: el conjunto de
+candidatos consistentes es un AND (respuesta 1) / AND NOT (respuesta 0) de
+bitmaps, unas decenas de microsegundos incluso con 100k personajes. El modo
+estricto de la inferencia restringe el posterior y la ganancia de
+información a ese conjunto.
+
+El índice se mantiene al día con los upserts: servicios/datos_personajes
+llama a `aplicar_cambios` con cada delta (pone/quita bits de los personajes
+cambiados y añade los nuevos al final).
+"""
+from __future__ import annotations
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import db_sql
+from servicios import datos_personajes, metricas
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+    def _contar_bits(palabras: np.ndarray) -> int:
+        return int(np.bitwise_count(palabras).sum(dtype=np.int64))
+else:
+    _TABLA_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _contar_bits(palabras: np.ndarray) -> int:
+        return int(_TABLA_BITS[palabras.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _a_palabras(bits: np.ndarray, palabras: int) -> np.ndarray:
+    """Vector 0/1 de longitud n -> `palabras` uint64 (bit i = personaje i)."""
+    relleno = np.zeros(palabras * 64, dtype=np.uint8)
+    relleno[: len(bits)] = bits != 0
+    return np.packbits(relleno, bitorder="little").view("<u8").astype(np.uint64, copy=False)
+
+
+class Candidatos:
+    """Resultado de un filtro: bitmap + utilidades (posiciones en el orden del índice)."""
+
+    def __init__(self, indice: "IndiceBitmaps", mascara: np.ndarray):
+        self.indice = indice
+        self.mascara = mascara
+        self.total = _contar_bits(mascara)
+
+    @property
+    def todos(self) -> bool:
+        return self.total == self.indice.n
+
+    def posiciones(self) -> np.ndarray:
+        bits = np.unpackbits(self.mascara.view(np.uint8), bitorder="little")[: self.indice.n]
+        return np.flatnonzero(bits)
+
+    def nombres(self) -> List[str]:
+        return [self.indice.nombres[i] for i in self.posiciones()]
+
+
+class IndiceBitmaps:
+    def __init__(self, nombres: Sequence[str], matriz: np.ndarray, atributos: Sequence[str], revision=None):
+        self.nombres: List[str] = list(nombres)
+        self.posicion: Dict[str, int] = {n: i for i, n in enumerate(self.nombres)}
+        self.atributos = list(atributos)
+        self.columna = {a: j for j, a in enumerate(self.atributos)}
+        self.n = len(self.nombres)
+        self.revision = revision
+        self.generacion = 0  # cambia con cada aplicar_cambios (para cachés derivadas)
+        palabras = max(1, -(-self.n // 64))
+        # A x W: fila j = bitmap del atributo j
+        self.bits = np.stack([_a_palabras(matriz[:, j], palabras) for j in range(len(self.atributos))]) \
+            if self.atributos else np.zeros((0, palabras), dtype=np.uint64)
+        self.universo = _a_palabras(np.ones(self.n, dtype=np.uint8), palabras)
+
+    # ---- consultas ----
+    def filtrar(self, respuestas: Dict[str, Optional[int]]) -> Candidatos:
+        """Personajes consistentes con todas las respuestas 0/1 (los atributos desconocidos se ignoran)."""
+        mascara = self.universo.copy()
+        for a, v in (respuestas or {}).items():
+            j = self.columna.get(a)
+            if j is None or v not in (0, 1):
+                continue
+            if v == 1:
+                np.bitwise_and(mascara, self.bits[j], out=mascara)
+            else:
+                np.bitwise_and(mascara, ~self.bits[j], out=mascara)
+        return Candidatos(self, mascara)
+
+    def con_valor(self, atributo: str) -> int:
+        j = self.columna.get(atributo)
+        return 0 if j is None else _contar_bits(self.bits[j])
+
+    # ---- mantenimiento ----
+    def _asegurar_capacidad(self, n: int) -> None:
+        palabras = self.bits.shape[1]
+        if n <= palabras * 64:
+            return
+        nuevas = max(palabras * 2, -(-n // 64))
+        extra = np.zeros((self.bits.shape[0], nuevas - palabras), dtype=np.uint64)
+        self.bits = np.hstack([self.bits, extra])
+        self.universo = np.concatenate([self.universo, np.zeros(nuevas - palabras, dtype=np.uint64)])
+
+    def aplicar_cambios(self, df: pd.DataFrame) -> dict:
+        """Filas nuevas/modificadas de `personajes`: O(cambios x atributos)."""
+        nuevos = 0
+        for fila in df.to_dict("records"):
+            nombre = str(fila["nombre"])
+            i = self.posicion.get(nombre)
+            if i is None:
+                i = self.n
+                self._asegurar_capacidad(i + 1)
+                self.nombres.append(nombre)
+                self.posicion[nombre] = i
+                self.n += 1
+                self.universo[i >> 6] |= np.uint64(1) << np.uint64(i & 63)
+                nuevos += 1
+            palabra, bit = i >> 6, np.uint64(1) << np.uint64(i & 63)
+            for a, j in self.columna.items():
+                if fila.get(a):
+                    self.bits[j, palabra] |= bit
+                else:
+                    self.bits[j, palabra] &= ~bit
+        self.generacion += 1
+        return {"actualizados": len(df) - nuevos, "nuevos": nuevos}
+
+
+# ---------------------------------------------------------------------
+#  Índice compartido
+# ---------------------------------------------------------------------
+_INDICE: Optional[IndiceBitmaps] = None
+_lock = threading.Lock()
+
+
+def desde_dataframe(df: pd.DataFrame, revision=None, atributos: Optional[Sequence[str]] = None) -> IndiceBitmaps:
+    """`atributos`: columnas a indexar (por defecto ATRIBUTOS_BINARIOS; otros catálogos traen las suyas)."""
+    atributos = [a for a in (atributos or db_sql.ATRIBUTOS_BINARIOS) if a in df.columns]
+    matriz = df[atributos].fillna(0).to_numpy(dtype=np.uint8)
+    return IndiceBitmaps(df["nombre"].astype(str).tolist(), matriz, atributos, revision)
+
+
+def indice() -> IndiceBitmaps:
+    """Índice al día con el dataset en memoria (se construye la primera vez o tras una recarga completa)."""
+    global _INDICE
+    actual = _INDICE
+    if actual is not None and actual.revision == datos_personajes.REVISION:
+        return actual
+    # Se construye fuera de _lock: refrescar() llama a aplicar_cambios con el
+    # lock de datos_personajes tomado y no queremos el orden inverso.
+    df, revision = datos_personajes.instantanea()
+    nuevo = desde_dataframe(df, revision)
+    with _lock:
+        if _INDICE is None or _INDICE.revision is None or _INDICE.revision < revision:
+            metricas.CACHE.inc(cache="bitmaps", resultado="fallo")
+            _INDICE = nuevo
+        return _INDICE
+
+
+def descartar() -> None:
+    """Olvida el índice (tras datos_personajes.recargar: la revisión puede no haber cambiado)."""
+    global _INDICE
+    with _lock:
+        _INDICE = None
+
+
+def aplicar_cambios(df: pd.DataFrame, revision) -> None:
+    """Llamado por datos_personajes.refrescar con cada delta (sólo si el índice ya existe)."""
+    with _lock:
+        if _INDICE is None:
+            return
+        if not df.empty:
+            _INDICE.aplicar_cambios(df)
+        _INDICE.revision = revision
+
+
+def filtrar(respuestas: Dict[str, Optional[int]], sobre: Optional[IndiceBitmaps] = None) -> Candidatos:
+    """Filtro estricto sobre el índice compartido o sobre `sobre` (p.ej. el de un catálogo)."""
+    candidatos = (sobre or indice()).filtrar(respuestas)
+    metricas.CANDIDATOS_ESTRICTOS.observe(candidatos.total)
+    return candidatos
+
+
+def restriccion(respuestas: Dict[str, Optional[int]],
+                sobre: Optional[IndiceBitmaps] = None) -> Tuple[Optional[Candidatos], dict]:
+    """
+    Modo estricto: (candidatos a los que restringir o None, informe para la respuesta).
+    Si ningún personaje es consistente (datos incompletos o el jugador se equivocó)
+    se vuelve al posterior suave y se indica con `inconsistente`.
+    """
+    candidatos = filtrar(respuestas, sobre)
+    informe = {"candidatos": candidatos.total, "inconsistente": candidatos.total == 0}
+    if candidatos.total == 0 or candidatos.todos:
+        return None, informe
+    return candidatos, informe
@@ -0,0 +1,278 @@
+# servicios/catalogos.py
+"""
+Registro de catálogos: varios juegos de adivinanza en un mismo despliegue
+(subconjuntos de Marvel, otros idiomas, DC...).
+
+Cada catálogo tiene su tabla SQL (mismo formato que `personajes`: nombre +
+columnas 0/1), sus configs de redes temáticas y sus propios modelos Naive
+Bayes. Se describen en un JSON (config.CATALOGOS_RUTA):
+
+    {
+      "dc":       {"tabla": "personajes_dc", "configs": "./catalogos/dc"},
+      "marvel_en": {"tabla": "personajes", "configs": {"poderes": "./en/config_poderes.json"}}
+    }
+
+`configs` es un directorio con ficheros config_<red>.json o un dict red -> ruta.
+
+- El catálogo por defecto (config.CATALOGO_POR_DEFECTO) es el de siempre:
+  lo sirve el motor activo (servicios/motores), con refresco incremental, y
+  no se desaloja nunca.
+- Los demás se cargan al primer uso y se desalojan por LRU cuando la suma
+  de su memoria estimada supera config.CATALOGOS_MEMORIA_MB.
+
+Métricas por catálogo: tiempo de carga, bytes en memoria y desalojos.
+"""
+from __future__ import annotations
+import glob
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+import db_sql
+from servicios import bitmaps, metricas, registro
+from servicios.motores import MotorInferencia, Respuestas, motor_activo
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+class CatalogoDesconocido(LookupError):
+    pass
+
+
+class DefinicionCatalogo:
+    def __init__(self, id: str, tabla: str, rutas_config: Dict[str, str], descripcion: str = ""):
+        self.id = id
+        self.tabla = tabla
+        self.rutas_config = rutas_config
+        self.descripcion = descripcion
+
+    @classmethod
+    def desde_json(cls, id: str, datos: dict) -> "DefinicionCatalogo":
+        configs = datos.get("configs", {})
+        if isinstance(configs, str):
+            rutas = {
+                os.path.basename(r)[len("config_"):-len(".json")]: r
+                for r in sorted(glob.glob(os.path.join(configs, "config_*.json")))
+            }
+        else:
+            rutas = dict(configs)
+        return cls(id, datos.get("tabla", "personajes"), rutas, datos.get("descripcion", ""))
+
+
+# ---------------------------------------------------------------------
+#  Motor de un catálogo adicional
+# ---------------------------------------------------------------------
+class _EstadoCatalogo:
+    """Modelos (naive_bayes.Instantanea) + índice de bitmaps de un catálogo, publicados juntos."""
+
+    def __init__(self, modelos, indice: bitmaps.IndiceBitmaps):
+        self.modelos = modelos
+        self.indice = indice
+        self.version = modelos.version
+        self.bytes = modelos.bytes + indice.bits.nbytes
+
+
+class MotorCatalogo(MotorInferencia):
+    """Naive Bayes de un catálogo: mismas cuentas que servicios/naive_bayes, instantánea propia."""
+
+    nombre = "naive_bayes"
+
+    def __init__(self, definicion: DefinicionCatalogo):
+        super().__init__()
+        self.definicion = definicion
+        self.segundos_carga = 0.0
+
+    @property
+    def bytes(self) -> int:
+        estado = self._estado
+        return estado.bytes if estado is not None else 0
+
+    def _datos(self, recargar: bool = False):
+        df = db_sql.cargar_tabla(self.definicion.tabla)
+        return (df.drop(columns=["id"]) if "id" in df.columns else df), None
+
+    def entrenar(self, df: pd.DataFrame, revision: Optional[int] = None) -> None:
+        from servicios import naive_bayes
+
+        modelos = naive_bayes.entrenar_modelos(df, self.definicion.rutas_config, catalogo=self.definicion.id)
+        if not modelos:
+            raise RuntimeError(f"El catálogo {self.definicion.id!r} no tiene ninguna red entrenable")
+        snap = naive_bayes.Instantanea.desde_modelos(modelos, revision)
+        indice = bitmaps.desde_dataframe(df, atributos=snap.matrices["attrs"])
+        self._estado = _EstadoCatalogo(snap, indice)
+
+    def restriccion(self, respuestas: Respuestas):
+        return bitmaps.restriccion(respuestas, self._fijada().indice)
+
+    def posterior(self, respuestas: Respuestas, personajes=None) -> Tuple[List[str], np.ndarray]:
+        from servicios import naive_bayes
+
+        return naive_bayes.posterior(respuestas, personajes, self._fijada().modelos)
+
+    def siguiente_pregunta(self, respuestas: Respuestas, excluidas: Iterable[str] = (),
+                           personajes=None, plazo_ms: Optional[float] = None,
+                           masa: float = 1.0) -> Optional[dict]:
+        from servicios import naive_bayes
+
+        return naive_bayes.siguiente_pregunta(respuestas, excluidas, personajes, plazo_ms, masa,
+                                              self._fijada().modelos)
+
+    def turno(self, respuestas: Respuestas, excluidas: Iterable[str] = (), personajes=None,
+              plazo_ms: Optional[float] = None, masa: float = 1.0) -> Tuple[List[str], np.ndarray, Optional[dict]]:
+        from servicios import naive_bayes
+
+        return naive_bayes.turno(respuestas, excluidas, personajes, plazo_ms, masa, self._fijada().modelos)
+
+    def inferir_lote(self, lista_respuestas: List[Respuestas], k: int = 5) -> List[List[Tuple[str, float]]]:
+        from servicios import naive_bayes
+
+        return naive_bayes.inferir_lote(lista_respuestas, k, self._fijada().modelos)
+
+
+# ---------------------------------------------------------------------
+#  Registro (LRU con presupuesto de memoria)
+# ---------------------------------------------------------------------
+_DEFINICIONES: Optional[Dict[str, DefinicionCatalogo]] = None
+_CARGADOS: "OrderedDict[str, MotorCatalogo]" = OrderedDict()  # menos reciente primero
+_ULTIMO_USO: Dict[str, float] = {}
+_lock = threading.Lock()
+_locks_carga: Dict[str, threading.Lock] = {}
+
+
+def definiciones(forzar: bool = False) -> Dict[str, DefinicionCatalogo]:
+    """Catálogos declarados: el de por defecto + los del JSON de config.CATALOGOS_RUTA."""
+    global _DEFINICIONES
+    if _DEFINICIONES is not None and not forzar:
+        return _DEFINICIONES
+    from servicios import naive_bayes
+
+    defs = {config.CATALOGO_POR_DEFECTO: DefinicionCatalogo(
+        config.CATALOGO_POR_DEFECTO, "personajes", dict(naive_bayes.RUTAS_CONFIG), "catálogo por defecto")}
+    if os.path.exists(config.CATALOGOS_RUTA):
+        try:
+            with open(config.CATALOGOS_RUTA, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            for id, d in datos.items():
+                if id == config.CATALOGO_POR_DEFECTO:
+                    registro.aviso("catalogo_por_defecto_redefinido", catalogo=id)
+                    continue
+                defs[id] = DefinicionCatalogo.desde_json(id, d)
+        except Exception as e:
+            registro.error("error_leyendo_catalogos", ruta=config.CATALOGOS_RUTA, error=str(e))
+    _DEFINICIONES = defs
+    return defs
+
+
+def es_por_defecto(id: Optional[str]) -> bool:
+    return id is None or id == config.CATALOGO_POR_DEFECTO
+
+
+def motor(id: Optional[str] = None) -> MotorInferencia:
+    """
+    Motor que sirve el catálogo `id` (None = por defecto). Carga el catálogo
+    si hace falta; lanza CatalogoDesconocido si no está declarado.
+    """
+    if es_por_defecto(id):
+        return motor_activo()
+    defs = definiciones()
+    if id not in defs:
+        raise CatalogoDesconocido(f"Catálogo desconocido: {id!r} (disponibles: {sorted(defs)})")
+
+    with _lock:
+        m = _CARGADOS.get(id)
+        if m is not None:
+            _CARGADOS.move_to_end(id)
+            _ULTIMO_USO[id] = time.time()
+            metricas.CACHE.inc(cache="catalogos", resultado="acierto")
+            return m
+        lock_carga = _locks_carga.setdefault(id, threading.Lock())
+
+    # Una sola carga por catálogo aunque lleguen varias peticiones a la vez
+    with lock_carga:
+        with _lock:
+            m = _CARGADOS.get(id)
+        if m is None:
+            metricas.CACHE.inc(cache="catalogos", resultado="fallo")
+            m = _cargar(defs[id])
+            with _lock:
+                _CARGADOS[id] = m
+                _ULTIMO_USO[id] = time.time()
+                _desalojar(conservar=id)
+    return m
+
+
+def _cargar(definicion: DefinicionCatalogo) -> MotorCatalogo:
+    t0 = time.perf_counter()
+    m = MotorCatalogo(definicion)
+    m.asegurar_entrenado()
+    m.segundos_carga = time.perf_counter() - t0
+    metricas.CARGA_CATALOGO.observe(m.segundos_carga, catalogo=definicion.id)
+    metricas.MEMORIA_CATALOGO.set(m.bytes, catalogo=definicion.id)
+    registro.info("catalogo_cargado", catalogo=definicion.id, tabla=definicion.tabla,
+                  personajes=len(m.instantanea().modelos.personajes), bytes=m.bytes,
+                  segundos=round(m.segundos_carga, 4))
+    return m
+
+
+def _desalojar(conservar: str) -> None:
+    """Descarga los catálogos menos usados hasta caber en el presupuesto (con _lock tomado)."""
+    presupuesto = config.CATALOGOS_MEMORIA_MB * 1024 * 1024
+    total = sum(m.bytes for m in _CARGADOS.values())
+    for id in list(_CARGADOS):
+        if total <= presupuesto:
+            break
+        if id == conservar:
+            continue
+        m = _CARGADOS.pop(id)
+        total -= m.bytes
+        metricas.DESALOJOS_CATALOGO.inc(catalogo=id)
+        metricas.MEMORIA_CATALOGO.set(0, catalogo=id)
+        registro.info("catalogo_desalojado", catalogo=id, bytes=m.bytes)
+    if total > presupuesto:
+        registro.aviso("catalogo_excede_presupuesto", catalogo=conservar, bytes=total,
+                       presupuesto=presupuesto)
+    metricas.CATALOGOS_CARGADOS.set(len(_CARGADOS))
+
+
+def descargar(id: str) -> bool:
+    with _lock:
+        m = _CARGADOS.pop(id, None)
+        metricas.CATALOGOS_CARGADOS.set(len(_CARGADOS))
+    if m is not None:
+        metricas.MEMORIA_CATALOGO.set(0, catalogo=id)
+    return m is not None
+
+
+def estado() -> List[dict]:
+    """Catálogos declarados con su estado (para GET /catalogos)."""
+    salida = []
+    for id, d in definiciones().items():
+        fila = {"id": id, "tabla": d.tabla, "descripcion": d.descripcion, "redes": sorted(d.rutas_config)}
+        if es_por_defecto(id):
+            from servicios import naive_bayes
+
+            activo = motor_activo()
+            fila.update(por_defecto=True, cargado=activo.entrenado,
+                        reconstruyendo=activo.reconstruccion.en_curso)
+            if activo.entrenado:
+                snap = activo.instantanea()
+                fila["version"] = snap.version
+                if isinstance(snap, naive_bayes.Instantanea):
+                    fila["bytes"] = snap.bytes
+                    metricas.MEMORIA_CATALOGO.set(fila["bytes"], catalogo=id)
+        else:
+            with _lock:
+                m = _CARGADOS.get(id)
+            fila.update(por_defecto=False, cargado=m is not None)
+            if m is not None and m.entrenado:
+                fila.update(personajes=len(m.instantanea().modelos.personajes), version=m.instantanea().version,
+                            bytes=m.bytes,
+                            segundos_carga=round(m.segundos_carga, 4), ultimo_uso=_ULTIMO_USO.get(id))
+        salida.append(fila)
+    return salida
@@ -0,0 +1,114 @@
+# servicios/datos_personajes.py
+"""
+Copia en memoria de la tabla `personajes` con la revisión hasta la que está
+al día (ver db_sql.personajes_cambios).
+
+- `dataset()` hace la carga completa la primera vez; `recargar()` la repite
+  (reconstrucción del motor, ver servicios/motores).
+- `refrescar()` pide sólo los personajes cambiados desde la última revisión,
+  los aplica al DataFrame, al motor activo y al índice de bitmaps
+  (`aplicar_cambios`), y avanza la revisión. Sin cambios cuesta una
+  consulta por la clave primaria.
+
+Las revisiones de la ventana de db_sql.cargar_cambios ya aplicadas se
+guardan en VISTAS: una rev menor que se confirma tarde se aplica en el
+siguiente refresco y las demás no se vuelven a aplicar.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import db_sql
+from servicios import metricas, registro
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATASET: Optional[pd.DataFrame] = None  # índice = nombre
+REVISION = 0
+VISTAS: set = set()  # revisiones de la ventana ya aplicadas
+_lock = threading.Lock()
+
+
+def _cargar_completo() -> None:
+    global DATASET, REVISION, VISTAS
+    # La revisión se lee ANTES que la tabla: lo que cambie entre medias se
+    # volverá a aplicar en el siguiente refresco (aplicar es idempotente).
+    rev = db_sql.revision_actual()
+    vistas = {r for r in db_sql.revisiones_recientes(rev) if r <= rev}
+    df = db_sql.cargar_personajes()
+    DATASET = df.set_index("nombre", drop=False)
+    REVISION, VISTAS = rev, vistas
+    registro.info("dataset_cargado", personajes=len(DATASET), revision=REVISION)
+
+
+def dataset() -> pd.DataFrame:
+    """DataFrame con la tabla completa (misma forma que db_sql.cargar_personajes)."""
+    with _lock:
+        if DATASET is None:
+            _cargar_completo()
+        return DATASET.reset_index(drop=True)
+
+
+def instantanea() -> Tuple[pd.DataFrame, int]:
+    """(dataset, revisión) leídos a la vez, para índices derivados (ver servicios/bitmaps)."""
+    with _lock:
+        if DATASET is None:
+            _cargar_completo()
+        return DATASET.reset_index(drop=True), REVISION
+
+
+def recargar() -> Tuple[pd.DataFrame, int]:
+    """Carga completa desde SQL (descarta la copia en memoria); devuelve como `instantanea`."""
+    from servicios import bitmaps, similitud
+
+    with _lock:
+        _cargar_completo()
+        df, revision = DATASET.reset_index(drop=True), REVISION
+    # Fuera de _lock: similitud.indice() toma su lock y después pide la instantánea
+    bitmaps.descartar()
+    similitud.descartar()
+    return df, revision
+
+
+def refrescar() -> dict:
+    """Aplica los cambios posteriores a REVISION al dataset y al motor activo."""
+    global DATASET, REVISION, VISTAS
+    from servicios import bitmaps
+    from servicios.motores import motor_activo
+
+    t0 = time.perf_counter()
+    with _lock:
+        if DATASET is None:
+            _cargar_completo()
+            return {"revision": REVISION, "cambios": 0, "completo": True}
+
+        cambios, hasta, leidas = db_sql.cargar_cambios(REVISION, VISTAS)
+        if cambios.empty:
+            bitmaps.aplicar_cambios(cambios, hasta)
+            REVISION, VISTAS = hasta, leidas
+            return {"revision": REVISION, "cambios": 0, "completo": False}
+
+        cambios = cambios.set_index("nombre", drop=False)
+        existentes = cambios.index.intersection(DATASET.index)
+        nuevos = cambios.index.difference(DATASET.index)
+        if len(existentes):
+            DATASET.loc[existentes, cambios.columns] = cambios.loc[existentes]
+        if len(nuevos):
+            import pandas as pd
+            DATASET = pd.concat([DATASET, cambios.loc[nuevos, DATASET.columns]])
+
+        motor = motor_activo()
+        if motor.entrenado:
+            motor.aplicar_cambios(cambios.reset_index(drop=True), hasta)
+        bitmaps.aplicar_cambios(cambios.reset_index(drop=True), hasta)
+        REVISION, VISTAS = hasta, leidas
+
+    dt = time.perf_counter() - t0
+    metricas.REFRESCO.observe(dt)
+    metricas.CAMBIOS_APLICADOS.inc(len(cambios))
+    registro.info("dataset_refrescado", revision=REVISION, actualizados=len(existentes),
+                  nuevos=len(nuevos), segundos=round(dt, 4))
+    return {"revision": REVISION, "cambios": len(cambios), "actualizados": len(existentes),
+            "nuevos": len(nuevos), "completo": False}
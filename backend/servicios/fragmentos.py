@@ -0,0 +1,428 @@
+# servicios/fragmentos.py
+"""
+Inferencia repartida por fragmentos de personajes (scatter-gather).
+
+Para catálogos que no caben en un nodo, los personajes se reparten entre N
+nodos (`id % N`): cada nodo guarda sólo sus columnas de las matrices de
+servicios/ig_vectorizado y el coordinador (el backend con
+ADIVINADOR_MOTOR=fragmentado) combina los resultados parciales.
+
+Todo lo que necesita un normalizador global se combina con log-sum-exp:
+cada nodo devuelve log(sum(exp(x))) de sus columnas y el coordinador une
+los parciales con otro log-sum-exp. Los recortes EPS de `_log_normalizado`
+y `entropia_filas` se aplican ya con el normalizador global, así que el
+resultado es el del modelo entero en un nodo (salvo el orden de las sumas
+en coma flotante). Un turno son tres rondas:
+
+1. normalizadores de cada red y de cada (candidato, respuesta hipotética);
+2. con ellos: normalizador del posterior combinado, top-k de cada nodo y
+   normalizadores del posterior combinado tras cada respuesta hipotética;
+3. con ellos: sumas parciales de la entropía actual, de P(attr=1) y de las
+   entropías tras cada respuesta hipotética.
+
+Los nodos no guardan nada entre rondas (cada mensaje lleva la evidencia) y
+sirven la versión que pide el coordinador; conservan la anterior mientras
+se recarga para las peticiones en vuelo. Conexiones de
+multiprocessing.connection autenticadas con config.FRAGMENTOS_CLAVE (sin
+clave no arranca ni el nodo ni el coordinador); los mensajes no van en
+pickle sino como una cabecera JSON seguida de los buffers de los arrays
+de NumPy (`codificar` / `decodificar`).
+
+Nodo (desde backend/):
+    python -m servicios.fragmentos --fragmento 0 --de 4 --puerto 7100
+
+Coordinador: ADIVINADOR_MOTOR=fragmentado y
+ADIVINADOR_FRAGMENTOS=host:7100,host:7101,... (ver config).
+benchmarks/bench_fragmentos.py arranca nodos locales y compara con un nodo.
+"""
+from __future__ import annotations
+import argparse
+import json
+import queue
+import struct
+import threading
+from collections import OrderedDict
+from multiprocessing.connection import Client, Listener
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+from servicios import ig_vectorizado as igv
+from servicios import metricas, registro
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LOG_EPS = float(np.log(igv.EPS))
+OPERACIONES = ("contar", "ronda1", "ronda2", "ronda3")
+
+
+def lse(x: np.ndarray, eje: int = -1) -> np.ndarray:
+    """log(sum(exp(x))) a lo largo de `eje`; -inf si no hay nada (fragmento vacío)."""
+    x = np.asarray(x, dtype=np.float64)
+    if x.shape[eje] == 0:
+        return np.full(tuple(np.delete(np.asarray(x.shape), eje)), -np.inf)
+    m = np.max(x, axis=eje, keepdims=True)
+    m = np.where(np.isfinite(m), m, 0.0)
+    with np.errstate(divide="ignore"):
+        return np.squeeze(m, axis=eje) + np.log(np.sum(np.exp(x - m), axis=eje))
+
+
+# ---------------------------------------------------------------------
+#  Mensajes: cabecera JSON + buffers de NumPy
+# ---------------------------------------------------------------------
+def _a_json(x, arrays: list):
+    """Sustituye cada ndarray por {"__nd__": i, dtype, shape} y lo guarda en `arrays`."""
+    if isinstance(x, np.ndarray):
+        if x.dtype.hasobject:
+            raise TypeError("Los arrays de objetos no se pueden enviar a los nodos")
+        arrays.append(np.ascontiguousarray(x))
+        return {"__nd__": len(arrays) - 1, "dtype": x.dtype.str, "shape": list(x.shape)}
+    if isinstance(x, np.generic):
+        return x.item()
+    if isinstance(x, dict):
+        return {str(k): _a_json(v, arrays) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [_a_json(v, arrays) for v in x]
+    return x
+
+
+def codificar(mensaje) -> bytes:
+    """Mensaje -> longitud de la cabecera (4 bytes) + cabecera JSON + buffers de los arrays."""
+    arrays: list = []
+    cabecera = json.dumps(_a_json(mensaje, arrays)).encode()
+    return b"".join([struct.pack("!I", len(cabecera)), cabecera, *(a.tobytes() for a in arrays)])
+
+
+def decodificar(datos: bytes):
+    """Inverso de `codificar` (las tuplas llegan como listas; los arrays, de sólo lectura)."""
+    largo = struct.unpack_from("!I", datos)[0]
+    cuerpo = memoryview(datos)[4 + largo:]
+    desplazamiento = 0
+
+    def desde_json(x):
+        nonlocal desplazamiento
+        if isinstance(x, dict):
+            if "__nd__" in x:
+                dtype, shape = np.dtype(x["dtype"]), tuple(x["shape"])
+                n = int(np.prod(shape, dtype=np.int64))
+                a = np.frombuffer(cuerpo, dtype=dtype, count=n, offset=desplazamiento).reshape(shape)
+                desplazamiento += n * dtype.itemsize
+                return a
+            return {k: desde_json(v) for k, v in x.items()}
+        if isinstance(x, list):
+            return [desde_json(v) for v in x]
+        return x
+
+    return desde_json(json.loads(bytes(memoryview(datos)[4:4 + largo])))
+
+
+def _exigir_clave(clave: bytes) -> bytes:
+    if not clave:
+        raise ValueError("Falta la clave de los fragmentos (ADIVINADOR_FRAGMENTOS_CLAVE)")
+    return clave
+
+
+# ---------------------------------------------------------------------
+#  Lado del nodo: un fragmento de columnas
+# ---------------------------------------------------------------------
+class Fragmento:
+    """Matrices de ig_vectorizado con sólo los personajes de un fragmento (y el prior global)."""
+
+    def __init__(self, matrices: dict):
+        self.m = matrices
+        self.n = len(matrices["personajes"])
+        self.uno = matrices["log1"] > matrices["log0"]  # dato 0/1 de cada personaje (ALPHA > 0)
+
+    @classmethod
+    def desde_dataframe(cls, df: pd.DataFrame, total: int) -> "Fragmento":
+        """Entrena las redes con las filas del fragmento; `total`: personajes de todos los fragmentos."""
+        from servicios import naive_bayes
+
+        if df.empty:
+            raise ValueError("Fragmento sin personajes")
+        m = igv.construir_matrices(naive_bayes.entrenar_modelos(df, naive_bayes.RUTAS_CONFIG))
+        # Un registro por personaje: prior uniforme sobre el total, no sobre el fragmento
+        m["prior_log"] = m["prior_log"] + (np.log(len(m["personajes"])) - np.log(total))
+        return cls(m)
+
+    def descripcion(self) -> dict:
+        return {"attrs": list(self.m["attrs"]), "redes": list(self.m["redes"]),
+                "red": self.m["red"].tolist(), "personajes": self.n}
+
+    def _consistentes(self, evidencia) -> np.ndarray:
+        mascara = np.ones(self.n, dtype=bool)
+        for i, v in evidencia:
+            mascara &= self.uno[i] == bool(v)
+        return mascara
+
+    def contar(self, evidencia) -> int:
+        return int(self._consistentes(evidencia).sum())
+
+    def _estado(self, evidencia, estricto: bool, z_red: Optional[np.ndarray] = None):
+        """(log1, log0, nombres, sumas, usados, log_post, acumulado) sobre las columnas del turno."""
+        m = self.m
+        log1, log0, prior_log, nombres = m["log1"], m["log0"], m["prior_log"], m["personajes"]
+        if estricto and evidencia:
+            cols = np.flatnonzero(self._consistentes(evidencia))
+            log1, log0, prior_log = log1[:, cols], log0[:, cols], prior_log[:, cols]
+            nombres = [nombres[c] for c in cols]
+        sumas = prior_log.copy()
+        usados = np.zeros(prior_log.shape[0], dtype=np.int64)
+        for i, v in evidencia:
+            r = m["red"][i]
+            sumas[r] += log1[i] if v == 1 else log0[i]
+            usados[r] += 1
+        log_post = acumulado = None
+        if z_red is not None:
+            log_post = np.maximum(sumas - z_red[:, None], LOG_EPS)
+            acumulado = np.maximum(1, usados).astype(np.float64) @ log_post
+        return log1, log0, nombres, sumas, usados, log_post, acumulado
+
+    def _bloques(self, candidatos: np.ndarray, n_p: int):
+        bloque = max(1, igv.MAX_CELDAS_BLOQUE // max(1, n_p))
+        for ini in range(0, len(candidatos), bloque):
+            yield ini, candidatos[ini:ini + bloque]
+
+    def _combinados(self, log1, log0, sumas, usados, log_post, acumulado, idx, z_cand, ini):
+        """Log-posterior combinado (sin normalizar) tras responder v a cada candidato de `idx`."""
+        r = self.m["red"][idx]
+        pesos = np.maximum(1, usados).astype(np.float64)
+        base = acumulado - pesos[r][:, None] * log_post[r]
+        peso_nuevo = np.maximum(1, usados[r] + 1).astype(np.float64)[:, None]
+        for v, tabla in ((0, log0), (1, log1)):
+            lp = np.maximum(sumas[r] + tabla[idx] - z_cand[v, ini:ini + len(idx), None], LOG_EPS)
+            yield v, base + peso_nuevo * lp
+
+    def ronda1(self, evidencia, candidatos, estricto: bool) -> dict:
+        log1, log0, _, sumas, _, _, _ = self._estado(evidencia, estricto)
+        z_cand = np.empty((2, len(candidatos)))
+        for ini, idx in self._bloques(candidatos, sumas.shape[1]):
+            r = self.m["red"][idx]
+            for v, tabla in ((0, log0), (1, log1)):
+                z_cand[v, ini:ini + len(idx)] = lse(sumas[r] + tabla[idx])
+        return {"z_red": lse(sumas), "z_cand": z_cand}
+
+    def ronda2(self, evidencia, candidatos, estricto: bool, z_red, z_cand, k: int) -> dict:
+        log1, log0, nombres, sumas, usados, log_post, acumulado = self._estado(evidencia, estricto, z_red)
+        top = []
+        if len(nombres):
+            idx, valores = igv.top_k(acumulado, k)
+            top = [(nombres[i], float(a)) for i, a in zip(idx, valores)]
+        z_comb = np.empty((2, len(candidatos)))
+        for ini, idx in self._bloques(candidatos, len(nombres)):
+            for v, x in self._combinados(log1, log0, sumas, usados, log_post, acumulado, idx, z_cand, ini):
+                z_comb[v, ini:ini + len(idx)] = lse(x)
+        return {"z_acum": float(lse(acumulado)), "top": top, "z_comb": z_comb}
+
+    def ronda3(self, evidencia, candidatos, estricto: bool, z_red, z_cand, z_acum: float, z_comb) -> dict:
+        log1, log0, _, sumas, usados, log_post, acumulado = self._estado(evidencia, estricto, z_red)
+        probs = np.exp(acumulado - z_acum)
+        p1 = np.empty(len(candidatos))
+        h = np.empty((2, len(candidatos)))
+        for ini, idx in self._bloques(candidatos, len(probs)):
+            p1[ini:ini + len(idx)] = np.exp(log1[idx]) @ probs
+            for v, x in self._combinados(log1, log0, sumas, usados, log_post, acumulado, idx, z_cand, ini):
+                h[v, ini:ini + len(idx)] = igv.entropia_filas(np.exp(x - z_comb[v, ini:ini + len(idx), None]))
+        return {"h": float(igv.entropia_filas(probs)), "p1": p1, "h_cand": h}
+
+
+class Nodo:
+    """Fragmentos de un nodo por versión: la actual y la anterior (peticiones en vuelo)."""
+
+    def __init__(self, cargador: Callable[[], Fragmento]):
+        self.cargador = cargador
+        self._fragmentos: "OrderedDict[int, Fragmento]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cargar(self, version: int) -> dict:
+        fragmento = self.cargador()
+        with self._lock:
+            self._fragmentos[version] = fragmento
+            while len(self._fragmentos) > 2:
+                self._fragmentos.popitem(last=False)
+        registro.info("fragmento_cargado", version=version, personajes=fragmento.n)
+        return fragmento.descripcion()
+
+    def atender(self, op: str, version: int, argumentos: dict):
+        if op == "cargar":
+            return self.cargar(version)
+        if op not in OPERACIONES:
+            raise ValueError(f"Operación desconocida: {op!r}")
+        fragmento = self._fragmentos.get(version)
+        if fragmento is None:
+            raise LookupError(f"Versión {version} no cargada en este nodo")
+        return getattr(fragmento, op)(**argumentos)
+
+
+def _atender_conexion(nodo: Nodo, conn) -> None:
+    with conn:
+        while True:
+            try:
+                datos = conn.recv_bytes()
+            except (EOFError, OSError):
+                return
+            op = None
+            try:
+                op, version, argumentos = decodificar(datos)
+                conn.send_bytes(codificar(("ok", nodo.atender(op, version, argumentos))))
+            except Exception as e:
+                registro.error("error_nodo_fragmento", op=op, error=str(e))
+                conn.send_bytes(codificar(("error", f"{type(e).__name__}: {e}")))
+
+
+def servir(nodo: Nodo, direccion: Tuple[str, int], clave: bytes) -> None:
+    """Atiende al coordinador (un hilo por conexión) hasta que se mate el proceso."""
+    with Listener(direccion, authkey=_exigir_clave(clave)) as oyente:
+        registro.info("nodo_fragmento_escuchando", direccion=f"{direccion[0]}:{direccion[1]}")
+        while True:
+            try:
+                conn = oyente.accept()
+            except Exception as e:  # clave incorrecta, conexión cortada...
+                registro.aviso("conexion_fragmento_rechazada", error=str(e))
+                continue
+            threading.Thread(target=_atender_conexion, args=(nodo, conn), daemon=True).start()
+
+
+def cargar_de_sql(fragmento: int, de: int) -> Fragmento:
+    """Personajes con id % de == fragmento, leídos de la tabla `personajes`."""
+    import db_sql
+
+    df = db_sql.cargar_personajes()
+    parte = df[df["id"] % de == fragmento].drop(columns=["id"])
+    return Fragmento.desde_dataframe(parte, total=len(df))
+
+
+# ---------------------------------------------------------------------
+#  Lado del coordinador
+# ---------------------------------------------------------------------
+class Coordinador:
+    """Conexiones con los nodos (reutilizadas entre peticiones) y combinación de rondas."""
+
+    def __init__(self, direcciones: Sequence[Tuple[str, int]], clave: bytes):
+        if not direcciones:
+            raise ValueError("No hay nodos de fragmentos configurados (ADIVINADOR_FRAGMENTOS)")
+        self.direcciones = list(direcciones)
+        self.clave = _exigir_clave(clave)
+        self._libres = [queue.SimpleQueue() for _ in self.direcciones]
+
+    def _conexion(self, i: int):
+        try:
+            return self._libres[i].get_nowait()
+        except queue.Empty:
+            return Client(self.direcciones[i], authkey=self.clave)
+
+    def difundir(self, op: str, version: int, argumentos: Optional[dict] = None) -> list:
+        """Manda `op` a todos los nodos antes de esperar a ninguno; respuestas en orden de nodo."""
+        conns = []
+        try:
+            with metricas.cronometro(metricas.RONDA_FRAGMENTOS, op=op):
+                for i in range(len(self.direcciones)):
+                    conns.append(self._conexion(i))
+                    conns[-1].send_bytes(codificar((op, version, argumentos or {})))
+                salidas = [decodificar(c.recv_bytes()) for c in conns]
+        except (OSError, EOFError) as e:
+            for c in conns:
+                c.close()
+            raise ConnectionError(f"Nodo de fragmentos no disponible: {e}") from e
+        for i, c in enumerate(conns):
+            self._libres[i].put(c)
+        errores = [f"{self.direcciones[i][0]}:{self.direcciones[i][1]}: {r}"
+                   for i, (estado, r) in enumerate(salidas) if estado != "ok"]
+        if errores:
+            raise RuntimeError("; ".join(errores))
+        return [r for _, r in salidas]
+
+    def cargar(self, version: int) -> dict:
+        """Cada nodo recarga su fragmento como `version`; devuelve la descripción común."""
+        descripciones = self.difundir("cargar", version)
+        base = descripciones[0]
+        for d in descripciones[1:]:
+            if d["attrs"] != base["attrs"] or d["red"] != base["red"]:
+                raise RuntimeError("Los fragmentos no tienen los mismos atributos")
+        return {**base, "personajes": sum(d["personajes"] for d in descripciones),
+                "por_nodo": [d["personajes"] for d in descripciones]}
+
+    def contar(self, version: int, evidencia) -> int:
+        return sum(self.difundir("contar", version, {"evidencia": evidencia}))
+
+    def consultar(self, version: int, evidencia, candidatos: np.ndarray, k: int,
+                  estricto: bool = False) -> Tuple[List[Tuple[str, float]], Optional[dict]]:
+        """
+        (top-k, ganancias) del turno. ganancias = {candidatos, ganancia, H_si_0,
+        H_si_1, p1} alineadas con `candidatos` (índices de atributo), o None si no hay.
+        """
+        base = {"evidencia": evidencia, "candidatos": candidatos, "estricto": estricto}
+        r1 = self.difundir("ronda1", version, base)
+        z_red = lse(np.stack([r["z_red"] for r in r1]), 0)
+        z_cand = lse(np.stack([r["z_cand"] for r in r1]), 0)
+
+        r2 = self.difundir("ronda2", version, {**base, "z_red": z_red, "z_cand": z_cand, "k": k})
+        z_acum = float(lse(np.asarray([r["z_acum"] for r in r2])))
+        unidos = sorted((t for r in r2 for t in r["top"]), key=lambda t: -t[1])[:k]
+        top = [(nombre, float(np.exp(a - z_acum))) for nombre, a in unidos]
+        if len(candidatos) == 0:
+            return top, None
+
+        z_comb = lse(np.stack([r["z_comb"] for r in r2]), 0)
+        r3 = self.difundir("ronda3", version, {**base, "z_red": z_red, "z_cand": z_cand,
+                                               "z_acum": z_acum, "z_comb": z_comb})
+        h_cur = sum(r["h"] for r in r3)
+        p1 = np.clip(np.sum([r["p1"] for r in r3], axis=0), 0.0, 1.0)
+        h0, h1 = np.sum([r["h_cand"] for r in r3], axis=0)
+        gain = h_cur - (p1 * h1 + (1.0 - p1) * h0)
+        return top, {"candidatos": candidatos, "ganancia": gain, "H_si_0": h0, "H_si_1": h1, "p1": p1}
+
+
+class EstadoFragmentos:
+    """Instantánea del motor fragmentado: versión cargada en los nodos y descripción común."""
+
+    def __init__(self, version: int, descripcion: dict, revision: Optional[int] = None):
+        self.version = version
+        self.revision = revision
+        self.attrs: List[str] = descripcion["attrs"]
+        self.indice: Dict[str, int] = {a: i for i, a in enumerate(self.attrs)}
+        self.personajes = descripcion["personajes"]
+        self.por_nodo = descripcion["por_nodo"]
+
+
+class Consistentes:
+    """Filtro del modo estricto del motor fragmentado: cada nodo filtra sus columnas."""
+
+    def __init__(self, total: int):
+        self.total = total
+
+
+_COORDINADOR: Optional[Coordinador] = None
+_lock = threading.Lock()
+
+
+def coordinador() -> Coordinador:
+    global _COORDINADOR
+    with _lock:
+        if _COORDINADOR is None:
+            _COORDINADOR = Coordinador(config.FRAGMENTOS_NODOS, config.FRAGMENTOS_CLAVE.encode())
+        return _COORDINADOR
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Nodo de inferencia con un fragmento de `personajes`")
+    ap.add_argument("--fragmento", type=int, required=True, help="este nodo sirve id %% de == fragmento")
+    ap.add_argument("--de", type=int, required=True, help="número total de fragmentos")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--puerto", type=int, default=7100)
+    args = ap.parse_args()
+    if not 0 <= args.fragmento < args.de:
+        ap.error("--fragmento debe estar entre 0 y --de - 1")
+    if not config.FRAGMENTOS_CLAVE:
+        ap.error("define ADIVINADOR_FRAGMENTOS_CLAVE (la misma en el coordinador y en los nodos)")
+
+    def cargador() -> Fragmento:
+        return cargar_de_sql(args.fragmento, args.de)
+
+    servir(Nodo(cargador), (args.host, args.puerto), config.FRAGMENTOS_CLAVE.encode())
+
+
+if __name__ == "__main__":
+    main()
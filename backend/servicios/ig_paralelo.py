@@ -0,0 +1,267 @@
+# servicios/ig_paralelo.py
+"""
+Evaluación de ganancia de información y de inferencia por lotes repartida
+en un pool persistente de procesos.
+
+Las matrices del modelo (ver servicios/ig_vectorizado) se publican una vez
+en memoria compartida; cada tarea sólo lleva el nombre del segmento, las
+respuestas codificadas como pares (índice, valor) y un rango de candidatos
+o de partidas. Los procesos se adjuntan al segmento la primera vez que lo
+ven y lo reutilizan, así que no se serializa ningún array por tarea.
+
+Los resultados se concatenan en el orden de envío y el mejor candidato se
+elige con `mejor_candidato`, por lo que la respuesta es la misma con 1 o N
+procesos.
+"""
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from servicios import ig_vectorizado as igv
+
+_MATRICES = ("log1", "log0", "red", "prior_log")
+
+
+# ---------------------------------------------------------------------
+#  Lado del proceso auxiliar
+# ---------------------------------------------------------------------
+# nombre_segmento -> (SharedMemory, {nombre_matriz: ndarray})
+_ADJUNTOS: Dict[str, Tuple[SharedMemory, Dict[str, np.ndarray]]] = {}
+
+
+def _abrir_segmento(nombre: str) -> SharedMemory:
+    """Se adjunta sin registrar el segmento: su ciclo de vida lo gestiona el servidor."""
+    try:
+        return SharedMemory(name=nombre, track=False)  # Python >= 3.13
+    except TypeError:
+        registrar = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return SharedMemory(name=nombre)
+        finally:
+            resource_tracker.register = registrar
+
+
+def _adjuntar(descriptor: tuple) -> Dict[str, np.ndarray]:
+    nombre, disposicion = descriptor
+    if nombre in _ADJUNTOS:
+        return _ADJUNTOS[nombre][1]
+
+    # Un segmento nuevo implica un modelo nuevo: soltamos los anteriores
+    for viejo, (shm_viejo, _) in list(_ADJUNTOS.items()):
+        shm_viejo.close()
+        del _ADJUNTOS[viejo]
+
+    shm = _abrir_segmento(nombre)
+    arrays = {
+        clave: np.ndarray(forma, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for clave, dtype, forma, offset in disposicion
+    }
+    for a in arrays.values():
+        a.flags.writeable = False
+    _ADJUNTOS[nombre] = (shm, arrays)
+    return arrays
+
+
+def _tarea_ganancias(descriptor: tuple, evidencia: tuple, candidatos: tuple) -> tuple:
+    m = _adjuntar(descriptor)
+    estado = igv.estado_posterior(m["log1"], m["log0"], m["red"], m["prior_log"], evidencia)
+    gain, h0, h1, p1 = igv.ganancias(m["log1"], m["log0"], m["red"], estado, candidatos)
+    return gain.tolist(), h0.tolist(), h1.tolist(), p1.tolist()
+
+
+def _tarea_lote(descriptor: tuple, evidencias: tuple, k: int) -> list:
+    m = _adjuntar(descriptor)
+    salida = []
+    for evidencia in evidencias:
+        estado = igv.estado_posterior(m["log1"], m["log0"], m["red"], m["prior_log"], evidencia)
+        idx, probs = igv.top_k(estado["probs"], k)
+        salida.append((idx.tolist(), probs.tolist()))
+    return salida
+
+
+# ---------------------------------------------------------------------
+#  Lado del servidor
+# ---------------------------------------------------------------------
+class PoolIG:
+    """Pool persistente de procesos + segmento de memoria compartida por versión de modelo."""
+
+    def __init__(self, procesos: int):
+        self.procesos = max(1, int(procesos))
+        self._ejecutor = ProcessPoolExecutor(max_workers=self.procesos, mp_context=get_context("spawn"))
+        self._lock = threading.Lock()
+        self._clave: Optional[int] = None
+        self._descriptor: Optional[tuple] = None
+        # Guardamos también el segmento anterior: puede haber tareas en vuelo
+        self._segmentos: List[SharedMemory] = []
+
+    # ---- publicación de matrices ----
+    def publicar(self, clave: int, matrices: dict) -> tuple:
+        """Copia las matrices a un segmento nuevo si `clave` (versión) ha cambiado."""
+        with self._lock:
+            if self._clave == clave and self._descriptor is not None:
+                return self._descriptor
+
+            arrays = [np.ascontiguousarray(matrices[k]) for k in _MATRICES]
+            total = sum(a.nbytes for a in arrays)
+            shm = SharedMemory(create=True, size=max(1, total))
+            disposicion = []
+            offset = 0
+            for clave_m, a in zip(_MATRICES, arrays):
+                destino = np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf, offset=offset)
+                destino[...] = a
+                disposicion.append((clave_m, a.dtype.str, a.shape, offset))
+                offset += a.nbytes
+
+            self._segmentos.append(shm)
+            while len(self._segmentos) > 2:
+                viejo = self._segmentos.pop(0)
+                viejo.close()
+                viejo.unlink()
+
+            self._clave = clave
+            self._descriptor = (shm.name, tuple(disposicion))
+            return self._descriptor
+
+    # ---- trabajo ----
+    def ganancias(self, descriptor: tuple, evidencia: tuple, candidatos: Sequence[int]):
+        candidatos = list(candidatos)
+        trozos = _repartir(candidatos, self.procesos)
+        futuros = [
+            self._ejecutor.submit(_tarea_ganancias, descriptor, evidencia, tuple(t))
+            for t in trozos
+        ]
+        gain, h0, h1, p1 = [], [], [], []
+        for f in futuros:  # orden de envío -> fusión determinista
+            g, a, b, c = f.result()
+            gain += g; h0 += a; h1 += b; p1 += c
+        return np.asarray(gain), np.asarray(h0), np.asarray(h1), np.asarray(p1)
+
+    def lote(self, descriptor: tuple, evidencias: Sequence[tuple], k: int) -> list:
+        trozos = _repartir(list(evidencias), self.procesos)
+        futuros = [self._ejecutor.submit(_tarea_lote, descriptor, tuple(t), k) for t in trozos]
+        salida = []
+        for f in futuros:
+            salida += f.result()
+        return salida
+
+    def cerrar(self) -> None:
+        self._ejecutor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for shm in self._segmentos:
+                shm.close()
+                shm.unlink()
+            self._segmentos.clear()
+            self._descriptor = None
+            self._clave = None
+
+
+def _repartir(items: list, partes: int) -> List[list]:
+    """Trozos contiguos y equilibrados (conserva el orden original)."""
+    partes = max(1, min(partes, len(items)))
+    base, resto = divmod(len(items), partes)
+    trozos, ini = [], 0
+    for i in range(partes):
+        fin = ini + base + (1 if i < resto else 0)
+        trozos.append(items[ini:fin])
+        ini = fin
+    return [t for t in trozos if t]
+
+
+# ---------------------------------------------------------------------
+#  Pool global (modo "procesos")
+# ---------------------------------------------------------------------
+_POOL: Optional[PoolIG] = None
+_POOL_LOCK = threading.Lock()
+
+
+def obtener_pool(procesos: int) -> PoolIG:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = PoolIG(procesos)
+        return _POOL
+
+
+def cerrar_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.cerrar()
+            _POOL = None
+
+
+atexit.register(cerrar_pool)
+
+
+# ---------------------------------------------------------------------
+#  API del módulo: misma firma en modo local y en modo procesos
+# ---------------------------------------------------------------------
+def evaluar_candidatos(
+    matrices: dict,
+    version: int,
+    respuestas: Dict[str, Optional[int]],
+    candidatos: Sequence[str],
+    *,
+    ejecutor: str = "local",
+    procesos: int = 1,
+    estado: Optional[dict] = None,
+):
+    """
+    Ganancia de información de cada atributo candidato.
+    `estado`: posterior de `respuestas` ya calculado (igv.estado_posterior);
+    en modo local se reutiliza, en el pool cada proceso calcula el suyo.
+    Devuelve (candidatos_ordenados, ganancia, H_si_0, H_si_1, p1).
+    """
+    indice = matrices["indice"]
+    idx = sorted(indice[a] for a in candidatos if a in indice)
+    evidencia = igv.codificar_respuestas(indice, respuestas)
+
+    if ejecutor == "procesos" and len(idx) > 1:
+        pool = obtener_pool(procesos)
+        descriptor = pool.publicar(version, matrices)
+        gain, h0, h1, p1 = pool.ganancias(descriptor, evidencia, idx)
+    else:
+        if estado is None:
+            estado = igv.estado_posterior(
+                matrices["log1"], matrices["log0"], matrices["red"], matrices["prior_log"], evidencia
+            )
+        gain, h0, h1, p1 = igv.ganancias(matrices["log1"], matrices["log0"], matrices["red"], estado, idx)
+
+    attrs = [matrices["attrs"][i] for i in idx]
+    return attrs, gain, h0, h1, p1
+
+
+def inferir_lote(
+    matrices: dict,
+    version: int,
+    lista_respuestas: Sequence[Dict[str, Optional[int]]],
+    k: int = 5,
+    *,
+    ejecutor: str = "local",
+    procesos: int = 1,
+) -> List[List[Tuple[str, float]]]:
+    """Top-k de personajes para cada conjunto de respuestas (mismo orden que la entrada)."""
+    indice = matrices["indice"]
+    evidencias = [igv.codificar_respuestas(indice, r) for r in lista_respuestas]
+
+    if ejecutor == "procesos" and len(evidencias) > 1:
+        pool = obtener_pool(procesos)
+        descriptor = pool.publicar(version, matrices)
+        crudos = pool.lote(descriptor, evidencias, k)
+    else:
+        crudos = []
+        for ev in evidencias:
+            estado = igv.estado_posterior(
+                matrices["log1"], matrices["log0"], matrices["red"], matrices["prior_log"], ev
+            )
+            i, p = igv.top_k(estado["probs"], k)
+            crudos.append((i.tolist(), p.tolist()))
+
+    personajes = matrices["personajes"]
+    return [[(personajes[i], float(p)) for i, p in zip(ids, ps)] for ids, ps in crudos]
@@ -0,0 +1,139 @@
+# servicios/inferencia_laplace.py
+"""
+Motor pgmpy con suavizado de Laplace (antes vivía en rutas/pregunta_siguiente).
+
+Cada red es una estrella atributos -> personaje cuya CPD de `personaje` se
+estima por conteo + 1. Las redes se construyen una vez (`entrenar_redes`) y
+se consultan con VariableElimination; el posterior es el producto
+normalizado de las redes.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import json, math
+from servicios import registro
+
+# pandas y pgmpy son caros de importar: se cargan dentro de las funciones que los usan
+if TYPE_CHECKING:
+    import pandas as pd
+    from pgmpy.inference import VariableElimination
+
+# Configs de redes (asegúrate de que existen)
+CONFIG_FILES = [
+    "./adivinador_backend/bayes_tematica/config_poderes.json",
+    "./adivinador_backend/bayes_tematica/config_afiliaciones_heroes.json",
+    "./adivinador_backend/bayes_tematica/config_afiliaciones_villanos.json",
+    "./adivinador_backend/bayes_tematica/config_especie.json",
+    "./adivinador_backend/bayes_tematica/config_origen.json",
+    "./adivinador_backend/bayes_tematica/config_armas.json",
+    "./adivinador_backend/bayes_tematica/config_genero_ocupacion.json",
+]
+
+# ----------------------
+# Utilidades de red bayesiana
+# ----------------------
+def cargar_red_desde_config(config_path: str, df: pd.DataFrame) -> Tuple[VariableElimination, List[str], List[str]]:
+    import pandas as pd
+    from pgmpy.models import DiscreteBayesianNetwork
+    from pgmpy.factors.discrete import TabularCPD
+    from pgmpy.inference import VariableElimination
+
+    with open(config_path) as f:
+        config = json.load(f)
+
+    atributos = [a for a in config["atributos"] if a in df.columns]
+    df2 = df.dropna(subset=["personaje"]).copy()
+    # binario 0/1
+    df2[atributos] = df2[atributos].fillna(0).astype(int)
+
+    personajes = df2["personaje"].unique().tolist()
+    # mapeo a índices
+    df2["personaje"] = df2["personaje"].map({p: i for i, p in enumerate(personajes)})
+
+    # Grafo estrella: atributos -> personaje
+    modelo = DiscreteBayesianNetwork([(a, "personaje") for a in atributos])
+    cpds = []
+
+    # Priors de atributos (Bernoulli con p = media)
+    for a in atributos:
+        p = float(df2[a].mean())
+        cpds.append(TabularCPD(variable=a, variable_card=2, values=[[1 - p], [p]]))
+
+    # CPD de personaje condicionado a todos los atributos (conteo + smoothing)
+    group = df2.groupby(atributos + ["personaje"]).size().unstack(fill_value=0)
+    # Rellenar todas combinaciones de atributos
+    index = pd.MultiIndex.from_product([sorted(df2[a].unique()) for a in atributos], names=atributos)
+    group = group.reindex(index, fill_value=0)
+    matriz = group.T.values.astype(float)
+
+    # suavizado simple (Laplace)
+    matriz = matriz + 1.0
+    for i in range(matriz.shape[1]):
+        total = matriz[:, i].sum()
+        matriz[:, i] = matriz[:, i] / total
+
+    cpd_personaje = TabularCPD(
+        variable="personaje",
+        variable_card=len(personajes),
+        values=matriz.tolist(),
+        evidence=atributos,
+        evidence_card=[2 for _ in atributos]
+    )
+    cpds.append(cpd_personaje)
+    modelo.add_cpds(*cpds)
+    assert modelo.check_model()
+    return VariableElimination(modelo), personajes, atributos
+
+def combinar_resultados(resultados: List[Dict[str, float]]) -> Dict[str, float]:
+    # Producto normalizado de varias redes
+    combinada = {}
+    for r in resultados:
+        for k, v in r.items():
+            combinada[k] = combinada.get(k, 1.0) * float(v)
+    total = sum(combinada.values()) or 1.0
+    return {k: v / total for k, v in combinada.items()}
+
+def entrenar_redes(df: pd.DataFrame) -> List[Tuple[VariableElimination, List[str], List[str]]]:
+    """Construye todas las redes de CONFIG_FILES; las que fallan se ignoran."""
+    import pgmpy  # noqa: F401  (sin pgmpy no hay red que valga: que falle aquí, no red a red)
+
+    redes = []
+    for path in CONFIG_FILES:
+        try:
+            redes.append(cargar_red_desde_config(path, df))
+        except Exception as e:
+            # Si falla alguna red, la ignoramos (robustez)
+            registro.aviso("red_ignorada", red=path, error=str(e))
+    return redes
+
+def posterior_desde_redes(redes, evidencia: Dict[str, Optional[int]]) -> Dict[str, float]:
+    """Combina varias redes temáticas para obtener P(personaje | evidencia)."""
+    resultados = []
+    for infer, personajes, attrs in redes:
+        evidencia_valida = {k: v for k, v in evidencia.items() if v is not None and k in attrs}
+        if evidencia_valida:
+            q = infer.query(["personaje"], evidence=evidencia_valida, show_progress=False)
+            res = {personajes[i]: float(prob) for i, prob in enumerate(q.values)}
+        else:
+            # distribución uniforme si no hay evidencia para esa red
+            res = {p: 1.0 / len(personajes) for p in personajes}
+        resultados.append(res)
+    return combinar_resultados(resultados)
+
+# ----------------------
+# Entropía / Information Gain
+# ----------------------
+def entropy(dist: Dict[str, float]) -> float:
+    return -sum(p * math.log(p + 1e-12, 2) for p in dist.values())
+
+def mezclar_con_evidencia(base_ev: Dict[str, Optional[int]], atributo: str, valor: int) -> Dict[str, Optional[int]]:
+    ev = dict(base_ev)
+    ev[atributo] = valor
+    return ev
+
+def estimar_p_attr1(posterior: Dict[str,float], df: pd.DataFrame, atributo: str) -> float:
+    # Asumimos atributo ~ determinista por personaje (0/1), estimamos P(attr=1) = sum_p P(p)*attr(p)
+    if atributo not in df.columns:
+        return 0.5
+    # tomamos el valor modal por personaje (si hay duplicados)
+    vals = df[["personaje", atributo]].drop_duplicates().set_index("personaje")[atributo].to_dict()
+    return sum(posterior.get(p, 0.0) * float(vals.get(p, 0.0)) for p in posterior.keys())
@@ -1,24 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
 from typing import Dict, List, Tuple, Optional, Iterable
 import json
 import pandas as pd
 import numpy as np
 
 # ➜ usa tu helper de BD
-from db_sql import cargar_personajes
+from servicios import datos_personajes
+from servicios import registro
 
 # pgmpy
 from pgmpy.models import DiscreteBayesianNetwork
 from pgmpy.factors.discrete import TabularCPD
 from pgmpy.inference import VariableElimination
 
-router = APIRouter()
-
-
-class RespuestasUsuario(BaseModel):
-    respuestas: Dict[str, Optional[int]]  # 0/1 o None
-
 
 def _cargar_red(config_path: str, df: pd.DataFrame) -> Tuple[VariableElimination, List[str]]:
     """
@@ -107,57 +100,53 @@ def _combinar_resultados(resultados: List[Dict[str, float]]) -> Dict[str, float]
     return {k: v / total for k, v in acumulado.items()}
 
 
-def inferir_personaje_desde_redes(
-    observaciones: Dict[str, Optional[int]],
-    *,
-    umbral: float = 0.5,
-    excluir: Optional[Iterable[str]] = None,
-) -> Dict:
-    """
-    ➜ Función *pura* que usa las distintas redes temáticas y devuelve:
-       {
-         "resultado": [(nombre, prob), ...]  # ordenado desc,
-         "umbral": bool,                     # si top1 >= umbral
-         "candidato": str | None             # nombre top1 (no excluido)
-       }
+# Redes temáticas
+REDES = [
+    "poderes",
+    "afiliaciones_heroes",
+    "afiliaciones_villanos",
+    "especie",
+    "origen",
+    "armas",
+    "genero_ocupacion",
+]
 
-    - `excluir`: lista/conjunto de nombres a descartar del ranking (p.ej. top rechazados).
-    """
-    print("⚡ INFERENCIA ACTIVADA:", observaciones)
 
-    # Carga datos desde tu BD
-    df = cargar_personajes()
+def entrenar_redes(df: pd.DataFrame) -> List[Tuple[str, VariableElimination, List[str]]]:
+    """
+    Construye una vez todas las redes temáticas: [(red, inferenciador, personajes), ...].
+    df viene de `cargar_personajes` (columna 'nombre'); las redes que fallan se ignoran.
+    """
     # tu esquema: columna 'nombre' es el display; mapeamos a 'personaje' para la red
     df = df.copy()
     df["personaje"] = df["nombre"]
     if "id" in df.columns:
         df = df.drop(columns=["id"])
 
-    # Redes temáticas
-    redes = [
-        "poderes",
-        "afiliaciones_heroes",
-        "afiliaciones_villanos",
-        "especie",
-        "origen",
-        "armas",
-        "genero_ocupacion",
-    ]
-
-    resultados: List[Dict[str, float]] = []
-
-    for red in redes:
+    redes = []
+    for red in REDES:
         try:
             # ⚠️ Ajusta el path a donde tengas tus JSONs
             infer, personajes = _cargar_red(
                 f"./adivinador_backend/bayes_tematica/config_{red}.json", df
             )
+            redes.append((red, infer, personajes))
+        except Exception as e:
+            registro.error("error_en_red", red=red, error=str(e))
+    return redes
+
 
+def posterior_desde_redes(redes, observaciones: Dict[str, Optional[int]]) -> Dict[str, float]:
+    """Producto normalizado de las redes ya construidas (sin exclusiones ni umbral)."""
+    resultados: List[Dict[str, float]] = []
+
+    for red, infer, personajes in redes:
+        try:
             # filtra evidencia válida para esta red
             evidencia_valida = {k: v for k, v in observaciones.items() if k in infer.variables and v is not None}
 
             if evidencia_valida:
-                q = infer.query(["personaje"], evidence=evidencia_valida)
+                q = infer.query(["personaje"], evidence=evidencia_valida, show_progress=False)
                 dist = {personajes[i]: float(prob) for i, prob in enumerate(q.values)}
                 resultados.append(dist)
             else:
@@ -165,10 +154,33 @@ def inferir_personaje_desde_redes(
                 uniform = 1.0 / len(personajes) if personajes else 1.0
                 resultados.append({p: uniform for p in personajes})
         except Exception as e:
-            print(f"❌ Error en red {red}: {e}")
+            registro.error("error_en_red", red=red, error=str(e))
+
+    return _combinar_resultados(resultados)
+
+
+def inferir_personaje_desde_redes(
+    observaciones: Dict[str, Optional[int]],
+    *,
+    umbral: float = 0.5,
+    excluir: Optional[Iterable[str]] = None,
+) -> Dict:
+    """
+    ➜ Función *pura* que usa las distintas redes temáticas y devuelve:
+       {
+         "resultado": [(nombre, prob), ...]  # ordenado desc,
+         "umbral": bool,                     # si top1 >= umbral
+         "candidato": str | None             # nombre top1 (no excluido)
+       }
+
+    - `excluir`: lista/conjunto de nombres a descartar del ranking (p.ej. top rechazados).
+    """
+    # Carga datos desde tu BD y construye las redes temáticas
+    df = datos_personajes.dataset()
+    redes = entrenar_redes(df)
 
     # combina distribuciones
-    final = _combinar_resultados(resultados)
+    final = posterior_desde_redes(redes, observaciones)
 
     # aplica exclusiones si las hubiera
     excluir_set = set(excluir or [])
@@ -180,7 +192,7 @@ def inferir_personaje_desde_redes(
             final = {k: v / s for k, v in final.items()}
 
     ordenado: List[Tuple[str, float]] = sorted(final.items(), key=lambda x: x[1], reverse=True)
-    print("🔍 TOP 3:", ordenado[:3])
+    registro.muestreado("inferir_pgmpy", respondidas=len(observaciones), top3=ordenado[:3])
 
     top1 = ordenado[0] if ordenado else None
     umbral_alcanzado = bool(top1 and top1[1] >= umbral)
@@ -192,15 +204,3 @@ def inferir_personaje_desde_redes(
         "candidato": candidato,
     }
 
-
-@router.post("/inferir")
-def inferir_endpoint(datos: RespuestasUsuario):
-    """
-    Endpoint HTTP que usa la función pura.
-    """
-    try:
-        payload = inferir_personaje_desde_redes(datos.respuestas)
-        return payload
-    except Exception as e:
-        print("❌ ERROR GENERAL en inferencia:", e)
-        raise HTTPException(status_code=500, detail="Error en inferencia múltiple")
@@ -0,0 +1,270 @@
+# servicios/jerarquia.py
+"""
+Índice jerárquico de personajes para el posterior de catálogos enormes.
+
+Árbol binario sobre los personajes: cada nodo parte a sus miembros por el
+atributo más equilibrado entre ellos (vector binario P(attr=1|p) > 1/2)
+hasta quedarse con `hoja` personajes o con vectores idénticos. Cada nodo
+guarda estadísticos agregados de sus miembros: mínimo y máximo de
+log P(attr=v | p) y del prior por red, logsumexp del prior por red y suma
+de P(attr=1 | p).
+
+El posterior de ig_vectorizado.estado_posterior es softmax(acumulado), con
+acumulado_p = sum_r w_r * max(S_rp - log Z_r, log EPS). Sumando la constante
+sum_r w_r * log Z_r queda sum_r w_r * max(S_rp, log Z_r + log EPS): las
+normalizaciones sólo importan donde actúa el recorte. Con las cotas de cada
+nodo se acota esa puntuación para todos sus miembros sin tocarlos, y la
+normalización de cada red con las de los nodos de la frontera.
+
+Se parte de la raíz y se expanden (hijos o, en las hojas, cálculo exacto de
+sus personajes) sólo los nodos con masa y holgura apreciables; los demás se
+quedan como un bloque con la masa repartida por igual entre sus miembros.
+La cota de la variación total frente al cálculo plano es
+sum_p q_p * expm1(holgura_p / 2), con q la aproximación.
+"""
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from servicios import ig_vectorizado as igv
+from servicios.ig_vectorizado import EPS
+
+LOG_EPS = float(np.log(EPS))  # recorte de `_log_normalizado`
+HOJA = 32
+SALTO = 4  # niveles del árbol binario que se bajan de una vez al expandir un nodo
+MINIMO_IG = 256  # columnas + bloques para que la ganancia de información distinga algo
+
+
+def _lse(x: np.ndarray, axis: int) -> np.ndarray:
+    """logsumexp por eje (-inf si todo es -inf o el eje está vacío)."""
+    if x.shape[axis] == 0:
+        return np.full(np.delete(x.shape, axis), -np.inf)
+    m = np.max(x, axis=axis, keepdims=True)
+    m_fin = np.where(np.isfinite(m), m, 0.0)
+    return np.squeeze(m_fin, axis=axis) + np.log(np.sum(np.exp(x - m_fin), axis=axis))
+
+
+def _concatenar_rangos(inicios: np.ndarray, largos: np.ndarray) -> np.ndarray:
+    """concatenate([arange(i, i + n) for i, n in zip(inicios, largos)]) sin bucle."""
+    desplazamiento = np.repeat(inicios - np.concatenate([[0], np.cumsum(largos)[:-1]]), largos)
+    return np.arange(int(np.sum(largos))) + desplazamiento
+
+
+class Jerarquia:
+    """Árbol de personajes con cotas por nodo sobre unas matrices apiladas (inmutable)."""
+
+    def __init__(self, matrices: dict, hoja: int = HOJA):
+        self.log1, self.log0 = matrices["log1"], matrices["log0"]
+        self.red, self.prior_log = matrices["red"], matrices["prior_log"]
+        self.n_redes = self.prior_log.shape[0]
+        self.orden = np.arange(self.log1.shape[1])
+        self._partir(max(1, hoja))
+        self._estadisticos()
+        self._saltos()
+
+    # -----------------------------------------------------------------
+    #  Construcción
+    # -----------------------------------------------------------------
+    def _partir(self, hoja: int):
+        binario = np.ascontiguousarray((self.log1 > self.log0).T)  # (P, A)
+        ini, fin, hijos = [0], [len(self.orden)], [(-1, -1)]
+        pila = [0]
+        while pila:
+            n = pila.pop()
+            a, b = ini[n], fin[n]
+            if b - a <= hoja:
+                continue
+            miembros = self.orden[a:b]
+            x = binario[miembros]
+            unos = x.sum(axis=0)
+            equilibrio = np.minimum(unos, len(miembros) - unos)
+            attr = int(np.argmax(equilibrio))
+            if equilibrio[attr] == 0:
+                continue  # vectores idénticos: hoja aunque sea grande
+            si = x[:, attr]
+            corte = a + int(np.count_nonzero(~si))
+            self.orden[a:b] = np.concatenate([miembros[~si], miembros[si]])
+            hijos[n] = (len(ini), len(ini) + 1)
+            for c0, c1 in ((a, corte), (corte, b)):
+                ini.append(c0)
+                fin.append(c1)
+                hijos.append((-1, -1))
+                pila.append(len(ini) - 1)
+        self.ini = np.asarray(ini, dtype=np.int64)
+        self.fin = np.asarray(fin, dtype=np.int64)
+        self.hijos = np.asarray(hijos, dtype=np.int64)
+        self.n = self.fin - self.ini
+
+    def _estadisticos(self):
+        """Estadísticos de las hojas con reduceat (rangos contiguos de `orden`) y de abajo arriba."""
+        n_nodos = len(self.ini)
+        hojas = np.flatnonzero(self.hijos[:, 0] < 0)
+        hojas = hojas[np.argsort(self.ini[hojas])]
+        arranques = self.ini[hojas]
+
+        def por_nodo(tabla: np.ndarray, reducir):
+            salida = np.empty((n_nodos, tabla.shape[0]))
+            salida[hojas] = reducir.reduceat(tabla[:, self.orden], arranques, axis=1).T
+            return salida
+
+        self.lo1, self.hi1 = por_nodo(self.log1, np.minimum), por_nodo(self.log1, np.maximum)
+        self.lo0, self.hi0 = por_nodo(self.log0, np.minimum), por_nodo(self.log0, np.maximum)
+        self.prior_lo, self.prior_hi = por_nodo(self.prior_log, np.minimum), por_nodo(self.prior_log, np.maximum)
+        self.suma1 = por_nodo(np.exp(self.log1), np.add)
+        m = np.max(self.prior_log)
+        self.lse_prior = por_nodo(np.exp(self.prior_log - m), np.add)
+        self.lse_prior[hojas] = np.log(self.lse_prior[hojas]) + m
+        # Los hijos siempre tienen índice mayor que su padre
+        for n in np.flatnonzero(self.hijos[:, 0] >= 0)[::-1]:
+            i, d = self.hijos[n]
+            for lo, hi in ((self.lo1, self.hi1), (self.lo0, self.hi0), (self.prior_lo, self.prior_hi)):
+                lo[n] = np.minimum(lo[i], lo[d])
+                hi[n] = np.maximum(hi[i], hi[d])
+            self.suma1[n] = self.suma1[i] + self.suma1[d]
+            self.lse_prior[n] = np.logaddexp(self.lse_prior[i], self.lse_prior[d])
+
+    def _saltos(self):
+        """
+        Hijos "anchos" en CSR: descendientes SALTO niveles más abajo (u hojas
+        antes). Cada vuelta de `posterior` baja así varios niveles a la vez.
+        """
+        ptr, desc = [0], []
+        for n in range(len(self.ini)):
+            nivel = [n] if self.hijos[n, 0] >= 0 else []
+            for _ in range(SALTO):
+                siguiente = []
+                for d in nivel:
+                    if self.hijos[d, 0] >= 0:
+                        siguiente.extend(self.hijos[d].tolist())
+                    else:
+                        desc.append(d)
+                nivel = siguiente
+            desc.extend(nivel)
+            ptr.append(len(desc))
+        self.ptr = np.asarray(ptr, dtype=np.int64)
+        self.desc = np.asarray(desc, dtype=np.int64)
+
+    @property
+    def nodos(self) -> int:
+        return len(self.ini)
+
+    # -----------------------------------------------------------------
+    #  Posterior acotado
+    # -----------------------------------------------------------------
+    def posterior(self, evidencia: Iterable[Tuple[int, int]], tolerancia: float, minimo: int = 0) -> Dict:
+        """
+        Posterior combinado de `evidencia` (pares (índice, valor) de
+        codificar_respuestas) con variación total frente al cálculo plano
+        acotada por `error` (<= `tolerancia` salvo que haya que expandirlo todo).
+        Se sigue expandiendo mientras haya menos de `minimo` columnas + bloques.
+
+        Devuelve {"columnas": personajes calculados uno a uno, "probs": su
+        probabilidad, "bloques": nodos sin expandir, "masa": probabilidad de
+        cada bloque (repartida por igual entre sus miembros), "error",
+        "visitados": nodos evaluados}.
+        """
+        pares = list(evidencia)
+        idx = np.asarray([i for i, _ in pares], dtype=np.int64)
+        uno = np.asarray([v == 1 for _, v in pares], dtype=bool)
+        # (evidencia x redes): reparte cada respuesta en la suma de su red
+        en_red = (self.red[idx][:, None] == np.arange(self.n_redes)[None, :]).astype(np.float64)
+        w = np.maximum(1, en_red.sum(axis=0))
+
+        def puntuar(sumas, log_z):
+            # sum_r w_r * max(S_r, log Z_r + log EPS) por fila de `sumas` (.., R)
+            return np.sum(w * np.maximum(sumas, log_z + LOG_EPS), axis=-1)
+
+        def cotas(nodos):
+            sel = np.ix_(nodos, idx)
+            return (np.where(uno, self.lo1[sel], self.lo0[sel]) @ en_red,
+                    np.where(uno, self.hi1[sel], self.hi0[sel]) @ en_red)
+
+        frontera = np.zeros(1, dtype=np.int64)
+        t_lo, t_hi = cotas(frontera)  # sumas de la evidencia por red (cotas), por nodo de la frontera
+        cols = np.empty(0, dtype=np.int64)
+        s_x = np.empty((0, self.n_redes))  # sumas exactas por red de `cols`
+        visitados = 1
+        while True:
+            # Normalización de cada red: exacta en lo expandido, acotada en la frontera
+            lz_x = _lse(s_x, axis=0)
+            lz_lo = np.logaddexp(lz_x, _lse(self.lse_prior[frontera] + t_lo, axis=0))
+            lz_hi = np.logaddexp(lz_x, _lse(self.lse_prior[frontera] + t_hi, axis=0))
+
+            b_lo = puntuar(self.prior_lo[frontera] + t_lo, lz_lo)
+            b_hi = puntuar(self.prior_hi[frontera] + t_hi, lz_hi)
+            x_lo, x_hi = puntuar(s_x, lz_lo), puntuar(s_x, lz_hi)
+            log_q = np.concatenate([np.log(self.n[frontera]) + 0.5 * (b_lo + b_hi), 0.5 * (x_lo + x_hi)])
+            q = np.exp(log_q - _lse(log_q, axis=0))
+            riesgo = q * np.expm1(0.5 * np.concatenate([b_hi - b_lo, x_hi - x_lo]))
+            r_bloques, error_x = riesgo[:len(frontera)], float(np.sum(riesgo[len(frontera):]))
+
+            orden = np.argsort(r_bloques, kind="stable")
+            quedan = np.zeros(len(frontera), dtype=bool)
+            quedan[orden] = np.cumsum(r_bloques[orden]) <= max(0.0, tolerancia - error_x)
+            if error_x > tolerancia:
+                # La incertidumbre de las normalizaciones sólo baja expandiendo
+                quedan &= r_bloques == 0.0
+            if len(frontera) + len(cols) < minimo:
+                quedan[:] = False
+            if quedan.all():
+                break
+            expandir = frontera[~quedan]
+            es_hoja = self.hijos[expandir, 0] < 0
+            if es_hoja.any():
+                nuevos = self.orden[self._rangos(expandir[es_hoja])]
+                tabla = np.where(uno[:, None], self.log1[np.ix_(idx, nuevos)], self.log0[np.ix_(idx, nuevos)])
+                cols = np.concatenate([cols, nuevos])
+                s_x = np.concatenate([s_x, self.prior_log[:, nuevos].T + tabla.T @ en_red])
+            internos = expandir[~es_hoja]
+            hijos = self.desc[_concatenar_rangos(self.ptr[internos], self.ptr[internos + 1] - self.ptr[internos])]
+            visitados += len(hijos)
+            h_lo, h_hi = cotas(hijos)
+            frontera = np.concatenate([frontera[quedan], hijos])
+            t_lo = np.concatenate([t_lo[quedan], h_lo])
+            t_hi = np.concatenate([t_hi[quedan], h_hi])
+
+        orden = np.argsort(cols)
+        return {
+            "columnas": cols[orden],
+            "probs": q[len(frontera):][orden],
+            "bloques": frontera,
+            "masa": q[:len(frontera)],
+            "error": min(1.0, float(np.sum(riesgo))),
+            "visitados": visitados,
+        }
+
+    def densificar(self, resultado: Dict) -> np.ndarray:
+        """Probabilidad de cada personaje (bloques repartidos entre sus miembros)."""
+        probs = np.empty(len(self.orden))
+        bloques = resultado["bloques"]
+        probs[self.orden[self._rangos(bloques)]] = np.repeat(resultado["masa"] / self.n[bloques], self.n[bloques])
+        probs[resultado["columnas"]] = resultado["probs"]
+        return probs
+
+    def _rangos(self, nodos: np.ndarray) -> np.ndarray:
+        """Posiciones de `orden` de los miembros de `nodos` (concatenadas)."""
+        return _concatenar_rangos(self.ini[nodos], self.n[nodos])
+
+    def reducidas(self, matrices: dict, resultado: Dict, evidencia) -> Tuple[dict, dict]:
+        """
+        Matrices y estado para la ganancia de información a nivel de bloque:
+        columnas = personajes expandidos + un pseudo-personaje por bloque con
+        la media de P(attr=1) y el prior medio de sus miembros, con el
+        log de su tamaño sumado al acumulado (pesa lo que sus miembros).
+        """
+        cols, bloques = resultado["columnas"], resultado["bloques"]
+        n_b = self.n[bloques].astype(np.float64)
+        p1 = np.clip(self.suma1[bloques] / n_b[:, None], EPS, 1.0 - EPS).T
+        reducidas = {
+            **matrices,
+            "personajes": [matrices["personajes"][c] for c in cols] + [None] * len(bloques),
+            "prior_log": np.ascontiguousarray(np.concatenate(
+                [matrices["prior_log"][:, cols], (self.lse_prior[bloques] - np.log(n_b)[:, None]).T], axis=1)),
+            "log1": np.ascontiguousarray(np.concatenate([matrices["log1"][:, cols], np.log(p1)], axis=1)),
+            "log0": np.ascontiguousarray(np.concatenate([matrices["log0"][:, cols], np.log1p(-p1)], axis=1)),
+        }
+        estado = igv.estado_posterior(reducidas["log1"], reducidas["log0"], reducidas["red"],
+                                      reducidas["prior_log"], evidencia)
+        estado["acumulado"] = estado["acumulado"] + np.concatenate([np.zeros(len(cols)), np.log(n_b)])
+        estado["probs"] = igv._softmax_filas(estado["acumulado"])
+        return reducidas, estado
@@ -0,0 +1,261 @@
+# servicios/metricas.py
+"""
+Métricas en memoria con exportación en formato de texto de Prometheus (0.0.4).
+
+Implementación mínima y sin dependencias: contadores, indicadores (gauges) e
+histogramas con etiquetas. Todas las operaciones son seguras entre hilos.
+
+Uso:
+    with cronometro(POSTERIOR, endpoint="/inferir"):
+        ...
+    CACHE.inc(cache="matrices", resultado="acierto")
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+# Cubos pensados para latencias de 100 µs a 30 s
+CUBOS_LATENCIA: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_REGISTRO: List["_Metrica"] = []
+_registro_lock = threading.Lock()
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres: Iterable[str], valores: Iterable[str], extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        with _registro_lock:
+            _REGISTRO.append(self)
+
+    def _clave(self, valores: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(valores.get(n, "")) for n in self.etiquetas)
+
+    def _lineas(self) -> List[str]:
+        raise NotImplementedError
+
+    def exportar(self) -> str:
+        cabecera = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        return "\n".join(cabecera + self._lineas())
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, cantidad: float = 1.0, **etiquetas: str) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def valor(self, **etiquetas: str) -> float:
+        return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def _lineas(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._valores.items())
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, k)} {_numero(v)}" for k, v in items]
+
+
+class Indicador(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, valor: float, **etiquetas: str) -> None:
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = float(valor)
+
+    def inc(self, cantidad: float = 1.0, **etiquetas: str) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def dec(self, cantidad: float = 1.0, **etiquetas: str) -> None:
+        self.inc(-cantidad, **etiquetas)
+
+    def valor(self, **etiquetas: str) -> float:
+        return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def _lineas(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._valores.items())
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, k)} {_numero(v)}" for k, v in items]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+                 cubos: Tuple[float, ...] = CUBOS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubos = tuple(sorted(cubos))
+        # clave -> [conteos por cubo..., suma, total]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, valor: float, **etiquetas: str) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = [0.0] * (len(self.cubos) + 2)
+                self._series[clave] = serie
+            for i, limite in enumerate(self.cubos):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def total(self, **etiquetas: str) -> int:
+        serie = self._series.get(self._clave(etiquetas))
+        return int(serie[-1]) if serie else 0
+
+    def _lineas(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lineas = []
+        for clave, serie in items:
+            acumulado = 0.0
+            for limite, n in zip(self.cubos, serie):
+                acumulado += n
+                et = _formatear_etiquetas(self.etiquetas, clave, f'le="{_numero(limite)}"')
+                lineas.append(f"{self.nombre}_bucket{et} {_numero(acumulado)}")
+            et = _formatear_etiquetas(self.etiquetas, clave, 'le="+Inf"')
+            lineas.append(f"{self.nombre}_bucket{et} {_numero(serie[-1])}")
+            et = _formatear_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{et} {_numero(serie[-2])}")
+            lineas.append(f"{self.nombre}_count{et} {_numero(serie[-1])}")
+        return lineas
+
+
+@contextmanager
+def cronometro(histograma: Histograma, **etiquetas: str):
+    """Mide la duración del bloque y la registra en el histograma (también si falla)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observe(time.perf_counter() - t0, **etiquetas)
+
+
+def exportar() -> str:
+    """Todas las métricas registradas en formato texto de Prometheus."""
+    with _registro_lock:
+        metricas = list(_REGISTRO)
+    return "\n".join(m.exportar() for m in metricas) + "\n"
+
+
+# =========================
+#  📊 MÉTRICAS DEL PIPELINE
+# =========================
+CARGA_BD = Histograma(
+    "adivinador_carga_bd_segundos", "Lectura de la tabla personajes desde SQL")
+ENTRENAMIENTO = Histograma(
+    "adivinador_entrenamiento_segundos", "Construcción/entrenamiento de una red temática", ("red",))
+POSTERIOR = Histograma(
+    "adivinador_posterior_segundos", "Cálculo del posterior P(personaje | respuestas)", ("endpoint",))
+BUCLE_IG = Histograma(
+    "adivinador_bucle_ig_segundos", "Evaluación de la ganancia de información de todos los candidatos", ("ejecutor",))
+MONGO_CONSULTA = Histograma(
+    "adivinador_mongo_consulta_segundos", "Lecturas en Mongo", ("operacion",))
+MONGO_GUARDADO = Histograma(
+    "adivinador_mongo_guardado_segundos", "Escrituras en Mongo", ("operacion",))
+PETICION = Histograma(
+    "adivinador_peticion_segundos", "Latencia total por ruta HTTP", ("ruta", "metodo", "estado"))
+TURNO_WS = Histograma(
+    "adivinador_turno_ws_segundos", "Turno completo por WebSocket (mensaje recibido -> estado enviado)")
+REFRESCO = Histograma(
+    "adivinador_refresco_segundos", "Refresco incremental de personajes (delta + modelos)")
+CANDIDATOS_ESTRICTOS = Histograma(
+    "adivinador_candidatos_estrictos", "Personajes consistentes con las respuestas por turno (modo estricto)",
+    cubos=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 10000, 100000))
+IG_COMPLETADO = Histograma(
+    "adivinador_ig_completado_ratio", "Fracción de candidatos evaluados antes del plazo (pregunta siguiente)",
+    cubos=(0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0))
+CARGA_CATALOGO = Histograma(
+    "adivinador_carga_catalogo_segundos", "Carga perezosa de un catálogo (tabla + entrenamiento)", ("catalogo",))
+RECONSTRUCCION = Histograma(
+    "adivinador_reconstruccion_segundos", "Reentreno en segundo plano de un motor (hasta publicar la instantánea)",
+    ("motor",))
+RONDA_FRAGMENTOS = Histograma(
+    "adivinador_ronda_fragmentos_segundos", "Ronda scatter-gather con los nodos de fragmentos (envío -> todas las respuestas)",
+    ("op",))
+POOL_ESPERA = Histograma(
+    "adivinador_pool_espera_segundos", "Espera hasta obtener una conexión del pool (Mongo)", ("almacen",))
+ESPERA_ADMISION = Histograma(
+    "adivinador_admision_espera_segundos", "Espera en la cola del pool de inferencia hasta empezar a calcular",
+    ("endpoint",))
+COMPUTO_ADMISION = Histograma(
+    "adivinador_admision_computo_segundos", "Cálculo en el pool de inferencia (sin la espera en cola)", ("endpoint",))
+ERROR_JERARQUIA = Histograma(
+    "adivinador_jerarquia_error", "Cota de la variación total del posterior jerárquico frente al plano",
+    cubos=(0, 1e-5, 1e-4, 1e-3, 0.005, 0.01, 0.05, 0.1, 1.0))
+EXPANSION_JERARQUIA = Histograma(
+    "adivinador_jerarquia_expansion_ratio", "Columnas del posterior jerárquico (personajes + bloques) / personajes",
+    cubos=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+CACHE = Contador(
+    "adivinador_cache_total", "Aciertos/fallos de las cachés en memoria", ("cache", "resultado"))
+CAMBIOS_APLICADOS = Contador(
+    "adivinador_cambios_aplicados_total", "Personajes nuevos/modificados aplicados por refresco incremental")
+REENTRENOS = Contador(
+    "adivinador_modelos_entrenados_total", "Redes temáticas entrenadas desde el arranque")
+VERSION_MODELOS = Indicador(
+    "adivinador_version_modelos", "Versión de la instantánea de modelos activa (cambia al reentrenar o aplicar cambios)")
+PETICIONES_EN_CURSO = Indicador(
+    "adivinador_peticiones_en_curso", "Peticiones HTTP en curso")
+SESIONES_WS = Indicador(
+    "adivinador_sesiones_ws", "Partidas abiertas por WebSocket")
+MEMORIA_CATALOGO = Indicador(
+    "adivinador_catalogo_bytes", "Memoria estimada de cada catálogo cargado (0 = no cargado)", ("catalogo",))
+CATALOGOS_CARGADOS = Indicador(
+    "adivinador_catalogos_cargados", "Catálogos adicionales cargados en memoria")
+DESALOJOS_CATALOGO = Contador(
+    "adivinador_catalogos_desalojados_total", "Catálogos descargados por el presupuesto de memoria", ("catalogo",))
+POOL_EN_USO = Indicador(
+    "adivinador_pool_en_uso", "Conexiones prestadas ahora mismo por cada pool", ("almacen",))
+POOL_ABIERTAS = Indicador(
+    "adivinador_pool_abiertas", "Conexiones abiertas por cada pool (prestadas + libres)", ("almacen",))
+POOL_CAPACIDAD = Indicador(
+    "adivinador_pool_capacidad", "Máximo de conexiones de cada pool", ("almacen",))
+POOL_FALLOS = Contador(
+    "adivinador_pool_fallos_total", "Conexiones que no se pudieron obtener del pool (espera agotada, error)",
+    ("almacen",))
+RECHAZOS_ADMISION = Contador(
+    "adivinador_admision_rechazos_total", "Peticiones rechazadas por el control de admisión (429/503)",
+    ("endpoint", "motivo"))
+COLA_ADMISION = Indicador(
+    "adivinador_admision_en_cola", "Peticiones admitidas esperando un hilo del pool de inferencia")
+HILOS_ADMISION = Indicador(
+    "adivinador_admision_en_curso", "Hilos del pool de inferencia calculando ahora mismo")
@@ -0,0 +1,547 @@
+# servicios/motores.py
+"""
+Interfaz común de los motores de inferencia.
+
+Hay tres implementaciones de la misma pregunta ("¿quién es?") que antes se
+registraban cada una en su router:
+
+- "naive_bayes":   servicios/naive_bayes (caché en memoria, combinación
+                   ponderada por evidencia, IG vectorizada). Por defecto.
+- "pgmpy":         servicios/inferencia_multiple (pgmpy, sin suavizado).
+- "pgmpy_laplace": servicios/inferencia_laplace (pgmpy + Laplace).
+- "fragmentado":   el mismo Naive Bayes con los personajes repartidos entre
+                   nodos (servicios/fragmentos), para catálogos muy grandes.
+
+Todas exponen entrenar / posterior / siguiente_pregunta / turno. El motor
+que sirve /inferir, /pregunta_siguiente y /turno se elige con ADIVINADOR_MOTOR
+(config.MOTOR_INFERENCIA); benchmarks/harness_motores.py los compara.
+
+El estado entrenado de cada motor es una instantánea inmutable con `version`
+que se sustituye entera al reentrenar (nunca se modifica en su sitio). Una
+petición fija la suya con `with motor.fijar() as version:` y todas las
+llamadas al motor dentro del bloque la usan aunque entretanto se publique
+otra. `reconstruccion.pedir()` reentrena en un hilo aparte.
+"""
+from __future__ import annotations
+import contextvars
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from servicios import metricas, registro
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+Respuestas = Dict[str, Optional[int]]
+
+_VERSIONES = itertools.count(1)
+# Instantánea fijada por cada motor (id(motor) -> instantánea) en el contexto actual
+_FIJADAS: contextvars.ContextVar[dict] = contextvars.ContextVar("instantaneas_fijadas", default={})
+
+
+def nueva_version() -> int:
+    """Versión de una instantánea: única en el proceso para todos los motores y catálogos."""
+    return next(_VERSIONES)
+
+
+class MotorInferencia:
+    """Contrato de un motor: entrenar con el DataFrame de `personajes` y responder."""
+
+    nombre = ""
+
+    def __init__(self):
+        self._estado = None  # instantánea publicada: se sustituye, nunca se modifica
+        self._lock_entreno = threading.Lock()
+        self.reconstruccion = Reconstruccion(self)
+
+    @property
+    def entrenado(self) -> bool:
+        return self._estado is not None
+
+    def entrenar(self, df: pd.DataFrame, revision: Optional[int] = None) -> None:
+        """
+        df tal como lo devuelve db_sql.cargar_personajes (columnas nombre/id + binarias).
+        Construye la instantánea completa antes de publicarla.
+        """
+        raise NotImplementedError
+
+    def _datos(self, recargar: bool = False) -> Tuple[pd.DataFrame, Optional[int]]:
+        """(dataset, revisión) con los que entrenar; con `recargar`, leídos de nuevo de SQL."""
+        from servicios import datos_personajes
+
+        return datos_personajes.recargar() if recargar else datos_personajes.instantanea()
+
+    def instantanea(self):
+        """Instantánea publicada (entrena la primera vez); tiene al menos `version`."""
+        estado = self._estado
+        if estado is None:
+            with self._lock_entreno:
+                if self._estado is None:
+                    self.entrenar(*self._datos())
+            estado = self._estado
+        return estado
+
+    def _fijada(self):
+        """La instantánea fijada con `fijar()` en este contexto o, si no hay, la actual."""
+        estado = _FIJADAS.get().get(id(self))
+        return estado if estado is not None else self.instantanea()
+
+    @contextmanager
+    def fijar(self):
+        """Usa la misma instantánea durante todo el bloque; devuelve su versión."""
+        fijadas = _FIJADAS.get()
+        if id(self) in fijadas:
+            yield fijadas[id(self)].version
+            return
+        estado = self.instantanea()
+        token = _FIJADAS.set({**fijadas, id(self): estado})
+        try:
+            yield estado.version
+        finally:
+            _FIJADAS.reset(token)
+
+    def reconstruir(self) -> None:
+        """Reentrena con los datos del almacén, no con la copia en memoria (síncrono; lo llama `reconstruccion`)."""
+        self.entrenar(*self._datos(recargar=True))
+
+    def posterior(self, respuestas: Respuestas, personajes=None) -> Tuple[List[str], np.ndarray]:
+        """
+        (personajes, probs) con probs normalizadas y alineadas con personajes.
+        `personajes`: filtro del modo estricto (servicios/bitmaps.Candidatos) o None.
+        """
+        raise NotImplementedError
+
+    def siguiente_pregunta(self, respuestas: Respuestas, excluidas: Iterable[str] = (),
+                           personajes=None, plazo_ms: Optional[float] = None,
+                           masa: float = 1.0) -> Optional[dict]:
+        """
+        {atributo, ganancia, p1, H_si_0, H_si_1} o None si no quedan preguntas.
+        Con `plazo_ms` devuelve lo mejor encontrado a tiempo y añade `busqueda`.
+        """
+        raise NotImplementedError
+
+    def turno(self, respuestas: Respuestas, excluidas: Iterable[str] = (), personajes=None,
+              plazo_ms: Optional[float] = None, masa: float = 1.0) -> Tuple[List[str], np.ndarray, Optional[dict]]:
+        """
+        (personajes, probs, siguiente_pregunta) de un turno con la misma
+        instantánea. Por defecto son dos llamadas; los motores que pueden
+        reutilizan el posterior para la ganancia de información.
+        """
+        with self.fijar():
+            personajes_, probs = self.posterior(respuestas, personajes)
+            mejor = self.siguiente_pregunta(respuestas, excluidas, personajes, plazo_ms=plazo_ms, masa=masa)
+        return personajes_, probs, mejor
+
+    def inferir_lote(self, lista_respuestas: List[Respuestas], k: int = 5) -> List[List[Tuple[str, float]]]:
+        """Top-k para cada conjunto de respuestas (por defecto, un posterior tras otro)."""
+        salida = []
+        with self.fijar():
+            for respuestas in lista_respuestas:
+                personajes, probs = self.posterior(respuestas)
+                orden = np.argsort(-probs, kind="stable")[:k]
+                salida.append([(personajes[i], float(probs[i])) for i in orden])
+        return salida
+
+    def restriccion(self, respuestas: Respuestas):
+        """Filtro del modo estricto sobre los personajes de este motor (ver servicios/bitmaps)."""
+        from servicios import bitmaps
+
+        return bitmaps.restriccion(respuestas)
+
+    def aplicar_cambios(self, df: pd.DataFrame, revision: Optional[int] = None) -> None:
+        """
+        Filas nuevas/modificadas de `personajes` (ver servicios/datos_personajes).
+        Por defecto pide una reconstrucción en segundo plano con el dataset ya
+        actualizado; mientras tanto se sigue respondiendo con la instantánea actual.
+        """
+        self.reconstruccion.pedir()
+
+    def asegurar_entrenado(self) -> None:
+        self.instantanea()
+
+
+class Reconstruccion:
+    """
+    Reentreno de un motor en segundo plano: como mucho un hilo a la vez; lo
+    que se pida mientras tanto se agrupa en una sola vuelta más al terminar.
+    """
+
+    def __init__(self, motor: MotorInferencia):
+        self.motor = motor
+        self.ultima: Optional[dict] = None  # {version, segundos, error}
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._pendiente = False
+
+    @property
+    def en_curso(self) -> bool:
+        return self._hilo is not None
+
+    def pedir(self) -> bool:
+        """Programa una reconstrucción; False si ya había otra esperando turno."""
+        with self._lock:
+            if self._hilo is not None:
+                nueva, self._pendiente = not self._pendiente, True
+                return nueva
+            self._hilo = threading.Thread(target=self._bucle, name=f"reconstruccion-{self.motor.nombre}",
+                                          daemon=True)
+            self._hilo.start()
+            return True
+
+    def _bucle(self) -> None:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                self.motor.reconstruir()
+                version, error = self.motor.instantanea().version, None
+            except Exception as e:
+                version, error = None, str(e)
+            dt = time.perf_counter() - t0
+            metricas.RECONSTRUCCION.observe(dt, motor=self.motor.nombre)
+            self.ultima = {"version": version, "segundos": round(dt, 4), "error": error}
+            if error:
+                registro.error("error_reconstruyendo_modelo", motor=self.motor.nombre, error=error)
+            else:
+                registro.info("modelo_reconstruido", motor=self.motor.nombre, version=version,
+                              segundos=round(dt, 4))
+            with self._lock:
+                if not self._pendiente:
+                    self._hilo = None
+                    return
+                self._pendiente = False
+
+
+# ---------------------------------------------------------------------
+#  Naive Bayes con caché (motor por defecto)
+# ---------------------------------------------------------------------
+class MotorNaiveBayes(MotorInferencia):
+    """Las instantáneas viven en servicios/naive_bayes (estado del módulo)."""
+
+    nombre = "naive_bayes"
+
+    @property
+    def entrenado(self) -> bool:
+        from servicios import naive_bayes
+
+        return naive_bayes.actual() is not None
+
+    def instantanea(self):
+        from servicios import naive_bayes
+
+        return naive_bayes.activa()
+
+    def entrenar(self, df: pd.DataFrame, revision: Optional[int] = None) -> None:
+        from servicios import naive_bayes
+
+        naive_bayes.entrenar(_con_personaje(df), revision)
+
+    def aplicar_cambios(self, df: pd.DataFrame, revision: Optional[int] = None) -> None:
+        from servicios import naive_bayes
+
+        naive_bayes.aplicar_cambios(df, revision)
+
+    def posterior(self, respuestas: Respuestas, personajes=None) -> Tuple[List[str], np.ndarray]:
+        from servicios import naive_bayes
+
+        return naive_bayes.posterior(respuestas, personajes, self._fijada())
+
+    def siguiente_pregunta(self, respuestas: Respuestas, excluidas: Iterable[str] = (),
+                           personajes=None, plazo_ms: Optional[float] = None,
+                           masa: float = 1.0) -> Optional[dict]:
+        from servicios import naive_bayes
+
+        return naive_bayes.siguiente_pregunta(respuestas, excluidas, personajes, plazo_ms, masa,
+                                              self._fijada())
+
+    def turno(self, respuestas: Respuestas, excluidas: Iterable[str] = (), personajes=None,
+              plazo_ms: Optional[float] = None, masa: float = 1.0) -> Tuple[List[str], np.ndarray, Optional[dict]]:
+        from servicios import naive_bayes
+
+        return naive_bayes.turno(respuestas, excluidas, personajes, plazo_ms, masa, self._fijada())
+
+    def inferir_lote(self, lista_respuestas: List[Respuestas], k: int = 5) -> List[List[Tuple[str, float]]]:
+        from servicios import naive_bayes
+
+        return naive_bayes.inferir_lote(lista_respuestas, k, self._fijada())
+
+
+# ---------------------------------------------------------------------
+#  Motores pgmpy: redes construidas una vez, IG por re-consulta
+# ---------------------------------------------------------------------
+class _EstadoPgmpy:
+    """Redes pgmpy + tabla de datos de un entrenamiento (instantánea de los motores pgmpy)."""
+
+    def __init__(self, redes, atributos: List[str], tabla: Dict[str, Dict[str, int]],
+                 revision: Optional[int] = None):
+        self.redes = redes
+        self.atributos = atributos
+        self.tabla = tabla  # attr -> {personaje: 0/1}
+        self.revision = revision
+        self.version = nueva_version()
+
+
+class _MotorPgmpyBase(MotorInferencia):
+    """
+    Parte común de los motores pgmpy. La ganancia de información se calcula
+    como en la antigua rutas/pregunta_siguiente: dos consultas por candidato y
+    P(attr=1) = sum_p P(p) * attr(p) con la tabla de datos.
+    """
+
+    @property
+    def entrenado(self) -> bool:
+        return self._estado is not None
+
+    def _construir(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def _consultar(self, redes, respuestas: Respuestas) -> Dict[str, float]:
+        raise NotImplementedError
+
+    def entrenar(self, df: pd.DataFrame, revision: Optional[int] = None) -> None:
+        df = _con_personaje(df)
+        redes, atributos = self._construir(df)
+        tabla = {
+            a: df[["personaje", a]].drop_duplicates("personaje").set_index("personaje")[a]
+                 .fillna(0).astype(int).to_dict()
+            for a in atributos
+        }
+        self._estado = _EstadoPgmpy(redes, atributos, tabla, revision)
+
+    def _consultar_en(self, estado: _EstadoPgmpy, respuestas: Respuestas,
+                      permitidos: Optional[set]) -> Dict[str, float]:
+        """Como `_consultar`, renormalizado sobre `permitidos` (modo estricto) si se indica."""
+        return _renormalizar(self._consultar(estado.redes, respuestas), permitidos)
+
+    def posterior(self, respuestas: Respuestas, personajes=None) -> Tuple[List[str], np.ndarray]:
+        estado = self._fijada()
+        dist = self._consultar(estado.redes, respuestas)
+        if personajes is not None:
+            restringida = self._consultar_en(estado, respuestas, set(personajes.nombres()))
+            dist = {p: restringida.get(p, 0.0) for p in dist}
+        nombres = list(dist.keys())
+        return nombres, np.asarray([dist[p] for p in nombres], dtype=float)
+
+    def siguiente_pregunta(self, respuestas: Respuestas, excluidas: Iterable[str] = (),
+                           personajes=None, plazo_ms: Optional[float] = None,
+                           masa: float = 1.0) -> Optional[dict]:
+        """Con `plazo_ms` recorre los candidatos de más a menos H(P(attr=1)) hasta el plazo (`masa` no aplica)."""
+        estado = self._fijada()
+        permitidos = set(personajes.nombres()) if personajes is not None else None
+        return self._mejor_pregunta(estado, respuestas, excluidas, permitidos, plazo_ms)
+
+    def turno(self, respuestas: Respuestas, excluidas: Iterable[str] = (), personajes=None,
+              plazo_ms: Optional[float] = None, masa: float = 1.0) -> Tuple[List[str], np.ndarray, Optional[dict]]:
+        """Una consulta para el posterior (renormalizado en modo estricto) que también usa la ganancia."""
+        estado = self._fijada()
+        dist = self._consultar(estado.redes, respuestas)
+        permitidos = set(personajes.nombres()) if personajes is not None else None
+        post = _renormalizar(dist, permitidos)
+        nombres = list(dist.keys())
+        probs = np.asarray([post.get(p, 0.0) for p in nombres], dtype=float)
+        return nombres, probs, self._mejor_pregunta(estado, respuestas, excluidas, permitidos, plazo_ms, post)
+
+    def _mejor_pregunta(self, estado: _EstadoPgmpy, respuestas: Respuestas, excluidas: Iterable[str],
+                        permitidos: Optional[set], plazo_ms: Optional[float],
+                        post: Optional[Dict[str, float]] = None) -> Optional[dict]:
+        t0 = time.perf_counter()
+        excl = set(excluidas or []) | {k for k, v in (respuestas or {}).items() if v is not None}
+        candidatos = [a for a in estado.atributos if a not in excl]
+        if not candidatos:
+            return None
+
+        if post is None:
+            post = self._consultar_en(estado, respuestas, permitidos)
+        h_cur = _entropia(post.values())
+        p1s = {a: min(1.0, max(0.0, sum(p * float(estado.tabla.get(a, {}).get(n, 0)) for n, p in post.items())))
+               for a in candidatos}
+        if plazo_ms:
+            candidatos.sort(key=lambda a: -_entropia((p1s[a], 1.0 - p1s[a])))
+        mejor = None
+        evaluados = 0
+        for a in candidatos:
+            if plazo_ms and mejor is not None and (time.perf_counter() - t0) * 1000.0 >= plazo_ms:
+                break
+            p1 = p1s[a]
+            h1 = _entropia(self._consultar_en(estado, {**respuestas, a: 1}, permitidos).values())
+            h0 = _entropia(self._consultar_en(estado, {**respuestas, a: 0}, permitidos).values())
+            gain = h_cur - (p1 * h1 + (1.0 - p1) * h0)
+            evaluados += 1
+            if mejor is None or gain > mejor["ganancia"]:
+                mejor = {"atributo": a, "ganancia": float(gain), "p1": float(p1),
+                         "H_si_0": float(h0), "H_si_1": float(h1)}
+        if plazo_ms and mejor is not None:
+            mejor["busqueda"] = {"evaluados": evaluados, "candidatos": len(candidatos),
+                                 "completo": evaluados == len(candidatos), "personajes": len(post),
+                                 "masa": 1.0, "ms": round((time.perf_counter() - t0) * 1000.0, 3)}
+        return mejor
+
+
+class MotorPgmpy(_MotorPgmpyBase):
+    nombre = "pgmpy"
+
+    def _construir(self, df):
+        from servicios import inferencia_multiple
+
+        redes = inferencia_multiple.entrenar_redes(df)
+        attrs = [v for _, infer, _ in redes for v in infer.variables if v != "personaje"]
+        return redes, list(dict.fromkeys(attrs))
+
+    def _consultar(self, redes, respuestas):
+        from servicios import inferencia_multiple
+
+        return inferencia_multiple.posterior_desde_redes(redes, respuestas)
+
+
+class MotorPgmpyLaplace(_MotorPgmpyBase):
+    nombre = "pgmpy_laplace"
+
+    def _construir(self, df):
+        from servicios import inferencia_laplace
+
+        redes = inferencia_laplace.entrenar_redes(df)
+        attrs = [a for _, _, atributos in redes for a in atributos]
+        return redes, list(dict.fromkeys(attrs))
+
+    def _consultar(self, redes, respuestas):
+        from servicios import inferencia_laplace
+
+        return inferencia_laplace.posterior_desde_redes(redes, respuestas)
+
+
+# ---------------------------------------------------------------------
+#  Naive Bayes repartido entre nodos
+# ---------------------------------------------------------------------
+class MotorFragmentado(MotorInferencia):
+    """
+    Coordinador de servicios/fragmentos: cada nodo entrena y guarda sus
+    personajes; aquí sólo se combinan las rondas. El posterior devuelve los
+    config.FRAGMENTOS_TOP personajes más probables (con su probabilidad
+    exacta), no el vector entero. `plazo_ms` y `masa` no aplican.
+    """
+
+    nombre = "fragmentado"
+
+    def _datos(self, recargar: bool = False):
+        return None, None  # los nodos leen su fragmento de SQL
+
+    def entrenar(self, df: pd.DataFrame, revision: Optional[int] = None) -> None:
+        from servicios import fragmentos
+
+        version = nueva_version()
+        descripcion = fragmentos.coordinador().cargar(version)
+        self._estado = fragmentos.EstadoFragmentos(version, descripcion, revision)
+        registro.info("fragmentos_cargados", version=version, personajes=descripcion["personajes"],
+                      por_nodo=descripcion["por_nodo"])
+
+    def _consultar(self, respuestas: Respuestas, personajes, candidatos: List[str]):
+        from servicios import fragmentos, ig_vectorizado as igv
+
+        estado = self._fijada()
+        idx = np.asarray(sorted(estado.indice[a] for a in candidatos), dtype=np.int64)
+        return fragmentos.coordinador().consultar(
+            estado.version, igv.codificar_respuestas(estado.indice, respuestas or {}), idx,
+            max(1, config.FRAGMENTOS_TOP), estricto=personajes is not None)
+
+    def _candidatos(self, respuestas: Respuestas, excluidas: Iterable[str]) -> List[str]:
+        excl = set(excluidas or []) | {k for k, v in (respuestas or {}).items() if v is not None}
+        return [a for a in self._fijada().attrs if a not in excl]
+
+    def restriccion(self, respuestas: Respuestas):
+        from servicios import fragmentos, ig_vectorizado as igv
+
+        estado = self._fijada()
+        evidencia = igv.codificar_respuestas(estado.indice, respuestas or {})
+        total = fragmentos.coordinador().contar(estado.version, evidencia) if evidencia else estado.personajes
+        informe = {"candidatos": total, "inconsistente": total == 0}
+        metricas.CANDIDATOS_ESTRICTOS.observe(total)
+        if total == 0 or total == estado.personajes:
+            return None, informe
+        return fragmentos.Consistentes(total), informe
+
+    def posterior(self, respuestas: Respuestas, personajes=None) -> Tuple[List[str], np.ndarray]:
+        top, _ = self._consultar(respuestas, personajes, [])
+        return [n for n, _ in top], np.asarray([p for _, p in top], dtype=float)
+
+    def siguiente_pregunta(self, respuestas: Respuestas, excluidas: Iterable[str] = (),
+                           personajes=None, plazo_ms: Optional[float] = None,
+                           masa: float = 1.0) -> Optional[dict]:
+        return self.turno(respuestas, excluidas, personajes, plazo_ms, masa)[2]
+
+    def turno(self, respuestas: Respuestas, excluidas: Iterable[str] = (), personajes=None,
+              plazo_ms: Optional[float] = None, masa: float = 1.0) -> Tuple[List[str], np.ndarray, Optional[dict]]:
+        from servicios import ig_vectorizado as igv
+
+        with self.fijar():
+            estado = self._fijada()
+            top, g = self._consultar(respuestas, personajes, self._candidatos(respuestas, excluidas))
+        nombres, probs = [n for n, _ in top], np.asarray([p for _, p in top], dtype=float)
+        pos = igv.mejor_candidato(g["candidatos"], g["ganancia"]) if g is not None else None
+        if pos is None:
+            return nombres, probs, None
+        return nombres, probs, {
+            "atributo": estado.attrs[int(g["candidatos"][pos])],
+            "ganancia": float(g["ganancia"][pos]),
+            "p1": float(g["p1"][pos]),
+            "H_si_0": float(g["H_si_0"][pos]),
+            "H_si_1": float(g["H_si_1"][pos]),
+        }
+
+
+# ---------------------------------------------------------------------
+#  Helpers
+# ---------------------------------------------------------------------
+def _con_personaje(df: pd.DataFrame) -> pd.DataFrame:
+    """Añade 'personaje' (= nombre) y quita 'id', como esperan todos los motores."""
+    if "personaje" not in df.columns:
+        df = df.copy()
+        df["personaje"] = df["nombre"]
+    if "id" in df.columns:
+        df = df.drop(columns=["id"])
+    return df
+
+
+def _renormalizar(dist: Dict[str, float], permitidos: Optional[set]) -> Dict[str, float]:
+    """`dist` restringida a `permitidos` y renormalizada (igual si no hay filtro)."""
+    if permitidos is None:
+        return dist
+    dist = {p: v for p, v in dist.items() if p in permitidos}
+    total = sum(dist.values())
+    return {p: v / total for p, v in dist.items()} if total > 0 else dist
+
+
+def _entropia(probs: Iterable[float]) -> float:
+    return -sum(p * math.log(p + 1e-12, 2) for p in probs)
+
+
+# ---------------------------------------------------------------------
+#  Registro de motores
+# ---------------------------------------------------------------------
+MOTORES = {
+    MotorNaiveBayes.nombre: MotorNaiveBayes,
+    MotorPgmpy.nombre: MotorPgmpy,
+    MotorPgmpyLaplace.nombre: MotorPgmpyLaplace,
+    MotorFragmentado.nombre: MotorFragmentado,
+}
+_INSTANCIAS: Dict[str, MotorInferencia] = {}
+_lock = threading.Lock()
+
+
+def obtener_motor(nombre: str) -> MotorInferencia:
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor de inferencia desconocido: {nombre!r} (disponibles: {sorted(MOTORES)})")
+    with _lock:
+        if nombre not in _INSTANCIAS:
+            _INSTANCIAS[nombre] = MOTORES[nombre]()
+        return _INSTANCIAS[nombre]
+
+
+def motor_activo() -> MotorInferencia:
+    """Motor configurado para este despliegue (ADIVINADOR_MOTOR)."""
+    return obtener_motor(config.MOTOR_INFERENCIA)
@@ -0,0 +1,670 @@
+# servicios/naive_bayes.py
+"""
+Motor Naive Bayes temático con caché en memoria.
+
+Una red por fichero de bayes_tematica: P(personaje) y P(attr | personaje)
+con suavizado de Laplace. El posterior combina las redes en log-espacio con
+peso = max(1, evidencia usada en la red). La ganancia de información se
+calcula vectorizada sobre los modelos apilados (servicios/ig_vectorizado);
+los "grupos" de una config (atributos excluyentes como la especie) se
+preguntan como una sola pregunta con varias respuestas.
+
+Los modelos entrenados forman una `Instantanea` inmutable. Entrenar o aplicar
+cambios construye una nueva y la publica de golpe (`publicar`); cada petición
+usa la instantánea que leyó al empezar, así que nunca ve redes a medias.
+"""
+from __future__ import annotations
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Tuple, Optional
+import json
+import numpy as np
+import os
+import threading
+import time
+from servicios import datos_personajes  # copia en memoria de `personajes`
+import config
+from servicios import ig_paralelo
+from servicios import ig_vectorizado as igv
+from servicios.ig_vectorizado import construir_matrices, mejor_candidato
+from servicios import jerarquia, metricas, registro
+from servicios.motores import nueva_version
+
+if TYPE_CHECKING:  # pandas sólo hace falta al entrenar (lo trae cargar_personajes)
+    import pandas as pd
+
+
+# ---------------------------------------------------------------------
+#  Configuración / Paths de redes temáticas
+# ---------------------------------------------------------------------
+RUTAS_CONFIG = {
+    "poderes":               "./adivinador_backend/bayes_tematica/config_poderes.json",
+    "afiliaciones_heroes":   "./adivinador_backend/bayes_tematica/config_afiliaciones_heroes.json",
+    "afiliaciones_villanos": "./adivinador_backend/bayes_tematica/config_afiliaciones_villanos.json",
+    "especie":               "./adivinador_backend/bayes_tematica/config_especie.json",
+    "origen":                "./adivinador_backend/bayes_tematica/config_origen.json",
+    "armas":                 "./adivinador_backend/bayes_tematica/config_armas.json",
+    "genero_ocupacion":      "./adivinador_backend/bayes_tematica/config_genero_ocupacion.json",
+}
+
+ALPHA = 1.0   # suavizado de Laplace
+EPS   = 1e-9  # para evitar log(0)
+
+# ---------------------------------------------------------------------
+#  Instantáneas de modelos
+# ---------------------------------------------------------------------
+class Instantanea:
+    """
+    Modelos entrenados, inmutables una vez construidos.
+
+    Las tablas viven en las matrices apiladas (servicios/ig_vectorizado) y
+    `modelos[red]` expone vistas de sólo lectura de sus filas:
+        { "personajes": [str, ...], "prior_log": (nP,),
+          "attr_logs": { attr: {0: (nP,), 1: (nP,)} }, "attrs": [str, ...] }
+    P(attr | personaje) no depende de la red (todas se entrenan con las mismas
+    filas), así que un atributo repetido en varias redes comparte fila.
+    """
+
+    def __init__(self, matrices: dict, attrs_por_red: Dict[str, List[str]], revision: Optional[int] = None):
+        for k in ("log1", "log0", "prior_log"):
+            matrices[k].flags.writeable = False
+        self.matrices = matrices
+        self.personajes: List[str] = matrices["personajes"]
+        self.modelos: Mapping[str, dict] = MappingProxyType(_vistas(matrices, attrs_por_red))
+        self.version = nueva_version()  # única en el proceso (clave del pool de IG)
+        self.revision = revision         # de datos_personajes; None = desconocida
+        self.creada = time.time()
+        self._mapa_bitmaps: Tuple[tuple, Optional[np.ndarray]] = ((), None)  # posición en bitmaps -> columna
+        self._jerarquia: Optional[jerarquia.Jerarquia] = None  # se construye al primer uso
+
+    @classmethod
+    def desde_modelos(cls, modelos: Dict[str, dict], revision: Optional[int] = None) -> "Instantanea":
+        return cls(construir_matrices(modelos), {r: list(m["attrs"]) for r, m in modelos.items()}, revision)
+
+    @property
+    def attrs_por_red(self) -> Dict[str, List[str]]:
+        return {r: m["attrs"] for r, m in self.modelos.items()}
+
+    @property
+    def bytes(self) -> int:
+        return int(sum(self.matrices[k].nbytes for k in ("log1", "log0", "prior_log")))
+
+
+def _vistas(matrices: dict, attrs_por_red: Dict[str, List[str]]) -> Dict[str, dict]:
+    log1, log0, indice = matrices["log1"], matrices["log0"], matrices["indice"]
+    return {
+        nombre_red: {
+            "personajes": matrices["personajes"],
+            "prior_log": matrices["prior_log"][r],
+            "attr_logs": {a: {1: log1[indice[a]], 0: log0[indice[a]]} for a in attrs_por_red[nombre_red]},
+            "attrs": attrs_por_red[nombre_red],
+        }
+        for r, nombre_red in enumerate(matrices["redes"])
+    }
+
+
+_ACTIVA: Optional[Instantanea] = None
+_lock = threading.Lock()          # publicación
+_lock_entreno = threading.Lock()  # un solo entrenamiento bajo demanda a la vez
+_lock_jerarquia = threading.Lock()
+
+
+def actual() -> Optional[Instantanea]:
+    """Instantánea publicada (None si aún no se ha entrenado)."""
+    return _ACTIVA
+
+
+def publicar(snap: Instantanea) -> bool:
+    """
+    Sustituye la instantánea activa. No retrocede: si `snap` se construyó con
+    una revisión anterior a la activa (p.ej. una reconstrucción lenta que
+    adelanta un refresco incremental), se descarta y devuelve False.
+    """
+    global _ACTIVA
+    with _lock:
+        activa_ = _ACTIVA
+        if (activa_ is not None and snap.revision is not None and activa_.revision is not None
+                and snap.revision < activa_.revision):
+            registro.aviso("instantanea_descartada", version=snap.version, revision=snap.revision,
+                           revision_activa=activa_.revision)
+            return False
+        _ACTIVA = snap
+    metricas.VERSION_MODELOS.set(snap.version)
+    registro.info("instantanea_publicada", version=snap.version, revision=snap.revision,
+                  redes=len(snap.modelos), personajes=len(snap.personajes))
+    return True
+
+
+# ---------------------------------------------------------------------
+#  Helpers de entrenamiento/carga
+# ---------------------------------------------------------------------
+def _cargar_config(ruta: str) -> List[str]:
+    with open(ruta, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    return list(cfg.get("atributos", []))
+
+def _cargar_grupos(ruta: str) -> List[dict]:
+    """Grupos de atributos excluyentes de la config: [{nombre, texto, atributos}]."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    return [{"nombre": g["nombre"], "texto": g.get("texto"), "atributos": list(g.get("atributos", []))}
+            for g in cfg.get("grupos", [])]
+
+def _binaria(df: pd.DataFrame, cols: List[str]) -> np.ndarray:
+    """Columnas `cols` de `df` como matriz 0/1 (huecos a 0, como fillna(0).astype(int)); las que falten, a 0."""
+    return np.trunc(np.nan_to_num(df.reindex(columns=cols, fill_value=0).to_numpy(dtype=np.float64), nan=0.0))
+
+def _tablas(df: pd.DataFrame) -> dict:
+    """
+    Una pasada sobre `df` (nombre/personaje + columnas 0/1): cuenta filas por
+    personaje y unos por (personaje, atributo) y deriva con Laplace el prior y
+    log P(attr=v | personaje) de todas las columnas a la vez. Las filas de
+    "log1"/"log0" son atributos (columnas de `df`), las columnas personajes en
+    orden de primera aparición.
+    """
+    nombres = df["personaje"] if "personaje" in df.columns else df["nombre"]
+    codigos, personajes = nombres.astype(str).factorize()
+    cols = [c for c in df.columns if c not in ("personaje", "nombre", "id")]
+    x = _binaria(df, cols)
+    n_p = np.bincount(codigos, minlength=len(personajes)).astype(np.float64)
+    if len(codigos) == len(personajes):
+        unos = x  # una fila por personaje, ya en orden de aparición
+    else:
+        orden = np.argsort(codigos, kind="stable")
+        unos = np.add.reduceat(x[orden], np.flatnonzero(np.r_[True, np.diff(codigos[orden]) != 0]), axis=0)
+
+    prior = (n_p + ALPHA) / (n_p.sum() + ALPHA * len(personajes))
+    p1 = (unos.T + ALPHA) / (n_p + 2.0 * ALPHA)
+    return {
+        "personajes": list(personajes),
+        "columna": {c: i for i, c in enumerate(cols)},
+        "prior_log": np.log(np.clip(prior, EPS, None)),
+        "log1": np.log(np.clip(p1, EPS, None)),
+        "log0": np.log(np.clip(1.0 - p1, EPS, None)),
+    }
+
+def _entrenar_red(tablas: dict, attrs: List[str]) -> dict:
+    """
+    Naive Bayes binario P(personaje) y P(attr|personaje) con Laplace para
+    `attrs`, sacado de las tablas comunes de `_tablas` (sin copiar).
+    """
+    attrs = [a for a in attrs if a in tablas["columna"]]
+    if not attrs:
+        raise ValueError("Sin atributos válidos para esta red")
+    log1, log0, columna = tablas["log1"], tablas["log0"], tablas["columna"]
+    return {
+        "personajes": tablas["personajes"],
+        "prior_log": tablas["prior_log"],
+        "attr_logs": {a: {1: log1[columna[a]], 0: log0[columna[a]]} for a in attrs},
+        "attrs": attrs,
+    }
+
+def _entrenar_redes(tablas: dict, rutas_config: Dict[str, str], omitir: Iterable[str] = (), **etiquetas):
+    """Entrena cada red de `rutas_config` (menos `omitir`); genera (nombre_red, modelo)."""
+    omitir = set(omitir)
+    for nombre_red, ruta in rutas_config.items():
+        if nombre_red in omitir:
+            continue
+        if not os.path.exists(ruta):
+            registro.aviso("config_no_encontrada", red=nombre_red, ruta=ruta, **etiquetas)
+            continue
+        try:
+            with metricas.cronometro(metricas.ENTRENAMIENTO, red=nombre_red):
+                modelo = _entrenar_red(tablas, _cargar_config(ruta))
+                modelo["grupos"] = _cargar_grupos(ruta)
+            metricas.REENTRENOS.inc()
+            registro.info("red_entrenada", red=nombre_red, atributos=len(modelo["attrs"]),
+                          personajes=len(modelo["personajes"]), **etiquetas)
+            yield nombre_red, modelo
+        except Exception as e:
+            registro.error("error_entrenando_red", red=nombre_red, error=str(e), **etiquetas)
+
+def entrenar_modelos(df: pd.DataFrame, rutas_config: Dict[str, str], **etiquetas) -> Dict[str, dict]:
+    """
+    Entrena las redes de `rutas_config` sin tocar el estado del módulo (lo usan
+    también los catálogos adicionales, ver servicios/catalogos). Las columnas
+    siguen el orden de las filas de `df`. Las redes comparten el prior y las
+    tablas de `_tablas`, que se calculan una sola vez.
+    """
+    return dict(_entrenar_redes(_tablas(df), rutas_config, **etiquetas))
+
+
+def construir(df: pd.DataFrame, revision: Optional[int] = None) -> Instantanea:
+    """Entrena todas las redes de RUTAS_CONFIG y las congela en una instantánea (sin publicarla)."""
+    modelos = entrenar_modelos(df, RUTAS_CONFIG)
+    if not modelos:
+        raise RuntimeError("No se pudo entrenar ninguna red")
+    return Instantanea.desde_modelos(modelos, revision)
+
+
+def activa() -> Instantanea:
+    """Instantánea activa; entrena bajo demanda si el calentamiento aún no lo hizo."""
+    snap = _ACTIVA
+    if snap is not None:
+        metricas.CACHE.inc(cache="modelos", resultado="acierto")
+        return snap
+    metricas.CACHE.inc(cache="modelos", resultado="fallo")
+    with _lock_entreno:
+        if _ACTIVA is None:
+            cargar_y_entrenar()
+    return _ACTIVA
+
+
+def cargar_y_entrenar() -> Instantanea:
+    """Entrena con la copia en memoria de `personajes` y publica el resultado."""
+    df, revision = datos_personajes.instantanea()
+    if "id" in df.columns:
+        df = df.drop(columns=["id"])
+    snap = construir(df, revision=revision)
+    publicar(snap)
+    return snap
+
+
+# ---------------------------------------------------------------------
+#  Helpers de inferencia/combinar
+# ---------------------------------------------------------------------
+def _posterior_por_red(modelo: dict, evidencia: Dict[str, int | None]) -> Tuple[np.ndarray, int]:
+    """
+    Devuelve (log_posterior_normalizado, evidencia_utilizada)
+    Usa solo attrs presentes en evidencia (0/1) y existentes en el modelo.
+    """
+    suma = modelo["prior_log"].copy()
+    usados = 0
+    for a, v in evidencia.items():
+        if v is None:
+            continue
+        if a not in modelo["attrs"]:
+            continue
+        if v not in (0, 1):
+            continue
+        suma += modelo["attr_logs"][a][v]
+        usados += 1
+
+    # normaliza (softmax estable)
+    m = float(np.max(suma))
+    exps = np.exp(suma - m)
+    probs = exps / np.sum(exps)
+    log_post = np.log(np.clip(probs, EPS, None))
+    return log_post, usados
+
+def _combinar_redes(resultados: List[Tuple[np.ndarray, int]]) -> np.ndarray:
+    """
+    Combina posteriors con peso = max(1, evidencia_en_red).
+    Trabaja en log-espacio y devuelve probs normalizadas.
+    """
+    if not resultados:
+        raise ValueError("No hay resultados de redes")
+    acumulado = None
+    for logp, usados in resultados:
+        peso = max(1, usados)
+        term = peso * logp
+        acumulado = term if acumulado is None else acumulado + term
+
+    m = float(np.max(acumulado))
+    exps = np.exp(acumulado - m)
+    probs = exps / np.sum(exps)
+    return probs
+
+def _posterior_actual(respuestas: Dict[str, int | None], snap: Instantanea) -> Tuple[List[str], np.ndarray]:
+    """
+    Usa los modelos de `snap` para obtener P(personaje | respuestas) actual.
+    Devuelve (lista_personajes, vector_probs).
+    """
+    resultados_red = []
+    for nombre_red, modelo in snap.modelos.items():
+        try:
+            logp, usados = _posterior_por_red(modelo, respuestas)
+            resultados_red.append((logp, usados))
+        except Exception as e:
+            registro.error("error_en_red", red=nombre_red, error=str(e))
+    if not resultados_red:
+        raise RuntimeError("No se pudo calcular ninguna red para el estado actual.")
+    probs = _combinar_redes(resultados_red)
+    return snap.personajes, probs
+
+def _entropia(probs: np.ndarray) -> float:
+    p = np.clip(probs, EPS, None)
+    return float(-np.sum(p * (np.log(p) / np.log(2.0))))
+
+def _p_attr_1(attr: str, personajes: List[str], p_personaje: np.ndarray,
+              snap: Optional[Instantanea] = None) -> Optional[float]:
+    """
+    Estima P(attr=1) = sum_p P(p)*P(attr=1|p) usando la primera red que contenga el attr.
+    """
+    for modelo in (snap or activa()).modelos.values():
+        if attr in modelo["attrs"]:
+            p1 = np.exp(modelo["attr_logs"][attr][1])  # vector por personaje
+            return float(np.sum(p_personaje * p1))
+    return None
+
+
+def _columnas(filtro, snap: Instantanea) -> np.ndarray:
+    """Columnas de `snap` de un filtro de servicios/bitmaps (ordenadas)."""
+    indice = filtro.indice
+    clave = (id(indice), indice.generacion, indice.n)
+    clave_mapa, mapa = snap._mapa_bitmaps
+    if mapa is None or clave_mapa != clave:
+        columna = {p: i for i, p in enumerate(snap.personajes)}
+        mapa = np.asarray([columna.get(n, -1) for n in indice.nombres[: indice.n]], dtype=np.int64)
+        snap._mapa_bitmaps = (clave, mapa)  # caché derivada: se sustituye entera
+    cols = mapa[filtro.posiciones()]
+    return np.sort(cols[cols >= 0])
+
+
+def _jerarquia(snap: Instantanea) -> Optional[jerarquia.Jerarquia]:
+    """Índice jerárquico de `snap` si está habilitado y el catálogo es grande (se construye una vez)."""
+    if config.JERARQUIA_TOLERANCIA <= 0 or len(snap.personajes) < config.JERARQUIA_MIN_PERSONAJES:
+        return None
+    if snap._jerarquia is None:
+        with _lock_jerarquia:
+            if snap._jerarquia is None:
+                t0 = time.perf_counter()
+                snap._jerarquia = jerarquia.Jerarquia(snap.matrices, config.JERARQUIA_HOJA)
+                registro.info("jerarquia_construida", version=snap.version, nodos=snap._jerarquia.nodos,
+                              segundos=round(time.perf_counter() - t0, 3))
+    return snap._jerarquia
+
+
+def _posterior_jerarquico(respuestas: Dict[str, int | None], snap: Instantanea):
+    """(índice, resultado de Jerarquia.posterior, evidencia) o None si no se usa la jerarquía."""
+    indice = _jerarquia(snap)
+    if indice is None:
+        return None
+    evidencia = igv.codificar_respuestas(snap.matrices["indice"], respuestas or {})
+    res = indice.posterior(evidencia, config.JERARQUIA_TOLERANCIA, jerarquia.MINIMO_IG)
+    metricas.ERROR_JERARQUIA.observe(res["error"])
+    metricas.EXPANSION_JERARQUIA.observe((len(res["columnas"]) + len(res["bloques"])) / len(snap.personajes))
+    return indice, res, evidencia
+
+
+def _restringidas(filtro, snap: Instantanea) -> Optional[Tuple[np.ndarray, dict]]:
+    """(columnas, matrices restringidas) o None si el filtro no deja a nadie del modelo."""
+    cols = _columnas(filtro, snap)
+    if len(cols) == 0:
+        return None
+    return cols, igv.restringir(snap.matrices, cols)
+
+
+# ---------------------------------------------------------------------
+#  API del motor
+# ---------------------------------------------------------------------
+def entrenar(df: pd.DataFrame, revision: Optional[int] = None) -> Instantanea:
+    """Entrena de nuevo con `df` y publica la instantánea (las peticiones en curso siguen con la anterior)."""
+    snap = construir(df, revision=revision)
+    publicar(snap)
+    return snap
+
+
+def aplicar_cambios(df: pd.DataFrame, revision: Optional[int] = None) -> dict:
+    """
+    Publica una instantánea con filas nuevas/modificadas de `personajes` sin reentrenar.
+
+    Como `nombre` es único, cada personaje tiene una sola fila y
+    P(attr=1 | p) = (x + ALPHA) / (1 + 2 ALPHA): basta con reescribir las
+    columnas de los personajes cambiados en una copia de las matrices. Los
+    personajes nuevos se añaden al final con prior uniforme.
+    """
+    base = _ACTIVA
+    if base is None or df.empty:
+        return {"actualizados": 0, "nuevos": 0}
+
+    nombres = (df["personaje"] if "personaje" in df.columns else df["nombre"]).astype(str)
+    df = df[~nombres.duplicated(keep="last").to_numpy()]
+
+    m = base.matrices
+    personajes = base.personajes
+    indice = {p: i for i, p in enumerate(personajes)}
+    nombres = nombres[~nombres.duplicated(keep="last")].tolist()
+    nuevos = [p for p in nombres if p not in indice]
+    if nuevos:
+        personajes = personajes + nuevos
+        indice.update((p, i) for i, p in enumerate(personajes) if p not in indice)
+        n, previos = len(personajes), len(base.personajes)
+        log1 = np.zeros((len(m["attrs"]), n))
+        log0 = np.zeros((len(m["attrs"]), n))
+        log1[:, :previos], log0[:, :previos] = m["log1"], m["log0"]
+        prior_log = np.full((len(m["redes"]), n), np.log(max((1.0 + ALPHA) / (n * (1.0 + ALPHA)), EPS)))
+    else:
+        log1, log0, prior_log = m["log1"].copy(), m["log0"].copy(), m["prior_log"]
+
+    pos = np.asarray([indice[p] for p in nombres], dtype=np.int64)
+    p1 = (_binaria(df, m["attrs"]).T + ALPHA) / (1.0 + 2.0 * ALPHA)
+    log1[:, pos] = np.log(np.clip(p1, EPS, None))
+    log0[:, pos] = np.log(np.clip(1.0 - p1, EPS, None))
+
+    matrices = {**m, "personajes": personajes, "log1": log1, "log0": log0, "prior_log": prior_log}
+    snap = Instantanea(matrices, base.attrs_por_red, revision)
+    publicar(snap)
+    return {"actualizados": len(nombres) - len(nuevos), "nuevos": len(nuevos), "version": snap.version}
+
+
+def _respuestas_grupo(respuestas: Dict[str, int | None], snap: Instantanea) -> Dict[str, int | None]:
+    """
+    Completa las respuestas de grupo como las aplica /ws/partida y como las
+    puntúa ig_vectorizado.ganancia_grupo: con config.IG_GRUPOS, un miembro a 1
+    (la opción elegida) pone a 0 los demás miembros sin responder del grupo.
+    Un grupo contestado por su nombre a 0 ({"especie": 0}) es "ninguna opción":
+    todos sus miembros sin responder a 0. Con null (no sé) sólo queda
+    contestado (ver `_separar_grupos`).
+    """
+    grupos = snap.matrices.get("grupos") or {}
+    if not respuestas or not grupos:
+        return respuestas
+    salida = None
+    for nombre, g in grupos.items():
+        if not (respuestas.get(nombre) == 0
+                or (config.IG_GRUPOS and any(respuestas.get(a) == 1 for a in g["atributos"]))):
+            continue
+        salida = salida or dict(respuestas)
+        for a in g["atributos"]:
+            if salida.get(a) is None:
+                salida[a] = 0
+    return salida or respuestas
+
+
+def posterior(respuestas: Dict[str, int | None], personajes=None,
+              snap: Optional[Instantanea] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Con `personajes` (filtro del modo estricto, servicios/bitmaps) el posterior
+    se calcula sólo sobre esos candidatos; el resto queda con probabilidad 0.
+    Sin filtro y con config.JERARQUIA_TOLERANCIA > 0 en catálogos grandes se
+    usa servicios/jerarquia: los bloques sin expandir reparten su masa a
+    partes iguales y el error (variación total) queda bajo la tolerancia.
+    `snap`: instantánea con la que responder (por defecto, la activa).
+    """
+    snap = snap or activa()
+    respuestas = _respuestas_grupo(respuestas, snap)
+    restringido = _restringidas(personajes, snap) if personajes is not None else None
+    if restringido is None:
+        jer = _posterior_jerarquico(respuestas, snap) if personajes is None else None
+        if jer is not None:
+            indice, res, _ = jer
+            return snap.personajes, indice.densificar(res)
+        return _posterior_actual(respuestas, snap)
+    cols, m = restringido
+    evidencia = igv.codificar_respuestas(m["indice"], respuestas or {})
+    estado = igv.estado_posterior(m["log1"], m["log0"], m["red"], m["prior_log"], evidencia)
+    probs = np.zeros(len(snap.personajes))
+    probs[cols] = estado["probs"]
+    return snap.personajes, probs
+
+
+def candidatos_pendientes(respuestas: Dict[str, int | None], excluidas: Iterable[str] = (),
+                          snap: Optional[Instantanea] = None) -> List[str]:
+    """Todos los attrs de todas las redes menos los excluidos/ya respondidos."""
+    excl = set(excluidas or [])
+    excl.update(k for k, v in (respuestas or {}).items() if v is not None)
+    candidatos: Dict[str, None] = {}
+    for modelo in (snap or activa()).modelos.values():
+        candidatos.update((a, None) for a in modelo["attrs"] if a not in excl)
+    return list(candidatos)
+
+
+def _separar_grupos(matrices: dict, respuestas: Dict[str, int | None], candidatos: List[str],
+                    excluidas: Iterable[str]) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Reparte los candidatos entre atributos sueltos y grupos categóricos
+    (servicios/ig_vectorizado.ganancia_grupo): {grupo: miembros pendientes}.
+    Los miembros de un grupo no se preguntan sueltos; si uno ya es 1, o el
+    grupo está excluido o contestado por su nombre, no se pregunta ninguno de
+    los demás.
+    """
+    grupos = matrices.get("grupos") or {}
+    if not config.IG_GRUPOS or not grupos:
+        return candidatos, {}
+    pendientes = set(candidatos)
+    excl = set(excluidas or [])
+    sueltos, salida = set(candidatos), {}
+    for nombre, g in grupos.items():
+        sueltos.difference_update(g["atributos"])
+        if nombre in excl or nombre in (respuestas or {}) or any((respuestas or {}).get(a) == 1
+                                                                   for a in g["atributos"]):
+            continue
+        miembros = [a for a in g["atributos"] if a in pendientes]
+        if len(miembros) > 1:
+            salida[nombre] = miembros
+        else:
+            sueltos.update(miembros)  # con un solo miembro es la pregunta sí/no de siempre
+    return [a for a in candidatos if a in sueltos], salida
+
+
+def _ganancias_grupos(matrices: dict, estado: dict, grupos: Dict[str, List[str]]) -> Optional[dict]:
+    """Mejor pregunta categórica de `grupos` (o None), con P y entropía de cada respuesta."""
+    mejor = None
+    indice = matrices["indice"]
+    for nombre, miembros in grupos.items():
+        gain, p_resp, h_resp = igv.ganancia_grupo(matrices["log1"], matrices["log0"], matrices["red"],
+                                                  estado, [indice[a] for a in miembros])
+        if mejor is None or gain > mejor["ganancia"]:
+            mejor = {
+                "atributo": nombre,
+                "tipo": "grupo",
+                "texto": matrices["grupos"][nombre]["texto"],
+                "ganancia": gain,
+                # Respuestas: un miembro (a 1 y el resto a 0) o null = ninguno (todos a 0)
+                "opciones": [{"atributo": a, "p": float(p), "H": float(h)}
+                             for a, p, h in zip([*miembros, None], p_resp, h_resp)],
+            }
+    return mejor
+
+
+def _mejor_pregunta(respuestas: Dict[str, int | None], candidatos: List[str], matrices: dict,
+                    version: int, restringido: bool, plazo_ms: Optional[float], masa: float,
+                    estado: Optional[dict] = None, excluidas: Iterable[str] = ()) -> Optional[dict]:
+    """Mejor candidato por ganancia de información sobre `matrices` (reutiliza `estado` si se da)."""
+    candidatos, grupos = _separar_grupos(matrices, respuestas, candidatos, excluidas)
+    mejor_grupo = None
+    if grupos:
+        # Pocos grupos: se evalúan siempre enteros y en el hilo de la petición
+        if estado is None:
+            estado = igv.estado_posterior(matrices["log1"], matrices["log0"], matrices["red"],
+                                          matrices["prior_log"],
+                                          igv.codificar_respuestas(matrices["indice"], respuestas or {}))
+        with metricas.cronometro(metricas.BUCLE_IG, ejecutor="grupos"):
+            mejor_grupo = _ganancias_grupos(matrices, estado, grupos)
+    if not candidatos:
+        return mejor_grupo
+    # Ganancia de todos los candidatos de una vez (local o en el pool de procesos).
+    # Las matrices restringidas cambian en cada turno: no compensa publicarlas
+    # en memoria compartida, se evalúan en el hilo de la petición.
+    ejecutor = "local" if restringido else config.IG_EJECUTOR
+    busqueda = None
+    if plazo_ms:
+        # El recorrido por bloques con plazo es secuencial: siempre en el hilo de la petición
+        ejecutor = "plazo"
+        with metricas.cronometro(metricas.BUCLE_IG, ejecutor=ejecutor):
+            attrs, gains, H0s, H1s, p1s, busqueda = igv.evaluar_con_plazo(
+                matrices, respuestas or {}, candidatos, plazo_ms / 1000.0, masa, estado=estado)
+        metricas.IG_COMPLETADO.observe(busqueda["evaluados"] / max(1, busqueda["candidatos"]))
+    else:
+        with metricas.cronometro(metricas.BUCLE_IG, ejecutor=ejecutor):
+            attrs, gains, H0s, H1s, p1s = ig_paralelo.evaluar_candidatos(
+                matrices, version, respuestas or {}, candidatos,
+                ejecutor=ejecutor, procesos=config.IG_PROCESOS, estado=estado,
+            )
+    pos = mejor_candidato([matrices["indice"][a] for a in attrs], gains)
+    if pos is None or (mejor_grupo is not None and mejor_grupo["ganancia"] > float(gains[pos])):
+        return mejor_grupo
+    mejor = {
+        "atributo": attrs[pos],
+        "ganancia": float(gains[pos]),
+        "p1": float(p1s[pos]),  # P(attr=1) bajo el estado actual (útil para UI)
+        "H_si_0": float(H0s[pos]),
+        "H_si_1": float(H1s[pos]),
+    }
+    if busqueda is not None:
+        mejor["busqueda"] = busqueda
+    return mejor
+
+
+def siguiente_pregunta(respuestas: Dict[str, int | None], excluidas: Iterable[str] = (),
+                       personajes=None, plazo_ms: Optional[float] = None, masa: float = 1.0,
+                       snap: Optional[Instantanea] = None) -> Optional[dict]:
+    """
+    Atributo que maximiza la ganancia de información (o None si no queda ninguno).
+    Devuelve { atributo, ganancia, p1, H_si_0, H_si_1 }, o para un grupo
+    categórico (config.IG_GRUPOS) { atributo: grupo, tipo: "grupo", texto,
+    ganancia, opciones: [{atributo | None, p, H}] }.
+    Con `personajes` (modo estricto) la ganancia se mide sólo entre esos candidatos.
+    Con `plazo_ms` la búsqueda es "anytime" (ver ig_vectorizado.evaluar_con_plazo)
+    y se añade `busqueda` con lo que dio tiempo a evaluar.
+    """
+    snap = snap or activa()
+    respuestas = _respuestas_grupo(respuestas, snap)
+    candidatos = candidatos_pendientes(respuestas, excluidas, snap)
+    if not candidatos:
+        return None
+    restringido = _restringidas(personajes, snap) if personajes is not None else None
+    matrices, estado = (restringido[1] if restringido else snap.matrices), None
+    jer = _posterior_jerarquico(respuestas, snap) if personajes is None else None
+    if jer is not None:
+        indice, res, evidencia = jer
+        matrices, estado = indice.reducidas(snap.matrices, res, evidencia)
+    return _mejor_pregunta(respuestas, candidatos, matrices, snap.version,
+                           restringido is not None or jer is not None, plazo_ms, masa, estado, excluidas)
+
+
+def turno(respuestas: Dict[str, int | None], excluidas: Iterable[str] = (), personajes=None,
+          plazo_ms: Optional[float] = None, masa: float = 1.0,
+          snap: Optional[Instantanea] = None) -> Tuple[List[str], np.ndarray, Optional[dict]]:
+    """
+    `posterior` y `siguiente_pregunta` de un turno con un solo cálculo del
+    posterior: el estado que da las probabilidades es el mismo del que parte
+    la ganancia de información. Devuelve (personajes, probs, mejor | None).
+    Con la jerarquía activa (ver `posterior`) la ganancia se mide sobre los
+    personajes expandidos y un pseudo-personaje medio por bloque.
+    """
+    snap = snap or activa()
+    respuestas = _respuestas_grupo(respuestas, snap)
+    restringido = _restringidas(personajes, snap) if personajes is not None else None
+    cols, matrices = restringido if restringido else (None, snap.matrices)
+    jer = _posterior_jerarquico(respuestas, snap) if personajes is None else None
+    if jer is not None:
+        # Posterior acotado y ganancia a nivel de bloque (servicios/jerarquia)
+        indice, res, evidencia = jer
+        probs = indice.densificar(res)
+        matrices, estado = indice.reducidas(snap.matrices, res, evidencia)
+    else:
+        estado = igv.estado_posterior(matrices["log1"], matrices["log0"], matrices["red"], matrices["prior_log"],
+                                      igv.codificar_respuestas(matrices["indice"], respuestas or {}))
+        if cols is None:
+            probs = estado["probs"]
+        else:
+            probs = np.zeros(len(snap.personajes))
+            probs[cols] = estado["probs"]
+
+    candidatos = candidatos_pendientes(respuestas, excluidas, snap)
+    mejor = None
+    if candidatos:
+        mejor = _mejor_pregunta(respuestas, candidatos, matrices, snap.version, cols is not None or jer is not None,
+                                plazo_ms, masa, estado, excluidas)
+    return snap.personajes, probs, mejor
+
+
+def inferir_lote(lista_respuestas: List[Dict[str, int | None]], k: int = 5,
+                 snap: Optional[Instantanea] = None) -> List[List[Tuple[str, float]]]:
+    """Top-k para cada conjunto de respuestas (en modo "procesos" se reparten entre el pool)."""
+    snap = snap or activa()
+    return ig_paralelo.inferir_lote(
+        snap.matrices, snap.version, lista_respuestas, max(1, k),
+        ejecutor=config.IG_EJECUTOR, procesos=config.IG_PROCESOS,
+    )
@@ -0,0 +1,289 @@
+# servicios/nombres.py
+"""
+Índice en memoria de los nombres de personaje.
+
+/personajes/existe consultaba MySQL en cada comprobación y el alta de
+fallos no avisaba de casi-duplicados ("Spider-Man" frente a "Spiderman").
+Aquí se guardan los nombres de la copia en memoria (datos_personajes):
+
+- `existe(nombre)`: comparación exacta, como la columna `nombre` de la tabla.
+- `clave(nombre)`: sin tildes, sin mayúsculas y sin signos ("Spider-Man",
+  "spiderman" y "Spíder Man" comparten clave).
+- Un trie sobre las claves para autocompletar por prefijo.
+- Búsqueda con erratas (Damerau-Levenshtein restringida sobre las claves,
+  cota según la longitud): un índice de bigramas (bincount) y un histograma
+  de letras por clave descartan casi todas las claves con NumPy y la
+  distancia sólo se calcula para las que quedan.
+  (Recorrer el trie con la tabla de distancias no poda los primeros niveles
+  y costaba milisegundos con 20.000 nombres.)
+
+Los nombres nunca se borran de la tabla, así que el índice sólo crece:
+las altas de /fallo/upsert_personaje se anotan al momento (`anotar`) y los
+cambios de otros procesos entran al avanzar la revisión del dataset.
+"""
+from __future__ import annotations
+import os
+import threading
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from servicios import datos_personajes, metricas
+
+_FIN = ""  # en un nodo del trie: nombres cuya clave termina ahí
+_CUBOS = 32
+
+
+def clave(nombre: str) -> str:
+    """Forma normalizada para comparar nombres: sin tildes, minúsculas, sólo letras y dígitos."""
+    sin_tildes = unicodedata.normalize("NFKD", nombre)
+    return "".join(c for c in sin_tildes.casefold() if c.isalnum() and not unicodedata.combining(c))
+
+
+def _bigramas(k: str) -> List[str]:
+    k = f"^{k}$"
+    return [k[i:i + 2] for i in range(len(k) - 1)]
+
+
+def _histograma(k: str) -> np.ndarray:
+    """Letras de la clave contadas en _CUBOS cubos (juntar letras sólo rebaja la cota)."""
+    codigos = np.frombuffer(k.encode("utf-32-le"), dtype=np.uint32) % _CUBOS
+    return np.minimum(np.bincount(codigos, minlength=_CUBOS), 255).astype(np.uint8)
+
+
+def _distancia(a: str, b: str, cota: int) -> int:
+    """Damerau-Levenshtein restringida entre a y b; cota + 1 si pasa de la cota."""
+    comun = len(os.path.commonprefix([a, b]))
+    a, b = a[comun:], b[comun:]
+    tope = cota + 1
+    antes, previa = None, [min(j, tope) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        fila = [tope] * (len(b) + 1)
+        fila[0] = min(i, tope)
+        # Sólo la banda |i - j| <= cota puede quedar dentro de la cota
+        for j in range(max(1, i - cota), min(len(b), i + cota) + 1):
+            v = min(fila[j - 1] + 1, previa[j] + 1, previa[j - 1] + (a[i - 1] != b[j - 1]))
+            if antes is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, antes[j - 2] + 1)
+            fila[j] = min(v, tope)
+        if min(fila) > cota:
+            return tope
+        antes, previa = previa, fila
+    return previa[-1]
+
+
+def _codigos(k: str) -> np.ndarray:
+    return np.frombuffer(k.encode("utf-32-le"), dtype=np.uint32)
+
+
+def _distancias(a: str, letras: np.ndarray, longitudes: np.ndarray, cota: int) -> np.ndarray:
+    """
+    _distancia de a a muchas claves a la vez (NumPy sobre las claves, mismo
+    recorrido en banda). letras: códigos de cada clave, rellenas con 0.
+    """
+    objetivo = _codigos(a)
+    # El prefijo común a todas no cambia ninguna distancia ("personaje_1234" frente a "personaje_1243")
+    n = min(len(objetivo), letras.shape[1])
+    comun = int(np.cumprod(letras[:, :n] == objetivo[:n], axis=1).sum(axis=1).min()) if n else 0
+    objetivo, letras, longitudes = objetivo[comun:], letras[:, comun:], longitudes - comun
+    tope = cota + 1
+    m, ancho = letras.shape
+    antes, previa = None, np.tile(np.minimum(np.arange(ancho + 1), tope), (m, 1))
+    for i in range(1, len(objetivo) + 1):
+        fila = np.full((m, ancho + 1), tope, dtype=previa.dtype)
+        fila[:, 0] = min(i, tope)
+        for j in range(max(1, i - cota), min(ancho, i + cota) + 1):
+            v = np.minimum(np.minimum(fila[:, j - 1], previa[:, j]) + 1,
+                           previa[:, j - 1] + (letras[:, j - 1] != objetivo[i - 1]))
+            if antes is not None and j > 1:
+                cruce = (letras[:, j - 2] == objetivo[i - 1]) & (letras[:, j - 1] == objetivo[i - 2])
+                v = np.where(cruce, np.minimum(v, antes[:, j - 2] + 1), v)
+            fila[:, j] = np.minimum(v, tope)
+        antes, previa = previa, fila
+    return previa[np.arange(m), longitudes]
+
+
+def _cota(texto: str) -> int:
+    """Distancia de edición admitida según la longitud de la clave buscada."""
+    return 0 if len(texto) < 3 else 1 if len(texto) < 7 else 2
+
+
+class IndiceNombres:
+    def __init__(self, nombres: Iterable[str] = (), revision=None):
+        self.revision = revision
+        self._lock = threading.Lock()
+        self._exactos: Set[str] = set()
+        self._por_clave: Dict[str, List[str]] = {}
+        self._trie: dict = {}
+        # Para la búsqueda con erratas: claves distintas, su longitud y bigrama -> ids de clave
+        self._claves: List[str] = []
+        self._longitudes = array("i")
+        self._letras = bytearray()  # _CUBOS contadores por clave (ver _histograma)
+        self._codigos = array("I")   # códigos de todas las claves seguidas
+        self._inicios = array("q")   # dónde empieza cada clave en _codigos
+        self._bigramas: Dict[str, array] = {}
+        for n in nombres:
+            self.agregar(n)
+
+    def __len__(self) -> int:
+        return len(self._exactos)
+
+    def agregar(self, nombre: str) -> bool:
+        """Añade un nombre; False si ya estaba."""
+        nombre = nombre.strip()
+        if not nombre:
+            return False
+        with self._lock:
+            if nombre in self._exactos:
+                return False
+            k = clave(nombre)
+            nodo = self._trie
+            for c in k:
+                nodo = nodo.setdefault(c, {})
+            # Se reemplazan las listas (no se modifican) para que las lecturas sin lock vean una u otra
+            nodo[_FIN] = nodo.get(_FIN, []) + [nombre]
+            if k not in self._por_clave:
+                for b in _bigramas(k):
+                    self._bigramas.setdefault(b, array("i")).append(len(self._claves))
+                self._longitudes.append(len(k))
+                self._letras.extend(_histograma(k).tobytes())
+                self._inicios.append(len(self._codigos))
+                self._codigos.frombytes(_codigos(k).tobytes())
+                self._claves.append(k)
+            self._por_clave[k] = nodo[_FIN]
+            self._exactos.add(nombre)
+            return True
+
+    def existe(self, nombre: str) -> bool:
+        return nombre.strip() in self._exactos
+
+    def equivalentes(self, nombre: str) -> List[str]:
+        """Nombres con la misma clave normalizada (incluido el propio si existe)."""
+        return list(self._por_clave.get(clave(nombre), []))
+
+    def prefijo(self, texto: str, k: int = 10) -> List[str]:
+        """Hasta k nombres cuya clave empieza por la del texto, por orden alfabético de clave."""
+        nodo = self._trie
+        for c in clave(texto):
+            nodo = nodo.get(c)
+            if nodo is None:
+                return []
+        salida: List[str] = []
+        pila = [nodo]
+        while pila and len(salida) < k:  # preorden: "thor" antes que "thorodinson"
+            n = pila.pop()
+            salida.extend(n.get(_FIN, ()))
+            pila.extend(v for c, v in sorted(n.items(), reverse=True) if c != _FIN)
+        return salida[:k]
+
+    def _matriz(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(códigos de las claves ids rellenos con 0, longitudes), con el lock tomado."""
+        longitudes = np.frombuffer(self._longitudes, dtype=np.int32)[ids].astype(np.int64)
+        ancho = int(longitudes.max())
+        pos = np.frombuffer(self._inicios, dtype=np.int64)[ids, None] + np.arange(ancho)
+        codigos = np.frombuffer(self._codigos, dtype=np.uint32)
+        dentro = np.arange(ancho) < longitudes[:, None]
+        return np.where(dentro, codigos[np.where(dentro, pos, 0)], 0), longitudes
+
+    def aproximados(self, texto: str, distancia_max: Optional[int] = None,
+                    k: int = 10) -> List[Tuple[str, int]]:
+        """
+        [(nombre, distancia)] con distancia de edición entre claves <= distancia_max
+        (inserción, borrado, sustitución y trasposición de dos letras seguidas).
+        """
+        objetivo = clave(texto)
+        cota = _cota(objetivo) if distancia_max is None else distancia_max
+        # Filtro por bigramas: cada edición rompe como mucho 3 bigramas de "^clave$",
+        # así que un candidato comparte al menos len+1-3*cota (contando repetidos de más)
+        minimo = len(objetivo) + 1 - 3 * cota
+        with self._lock:
+            total = len(self._claves)
+            if minimo > 0:
+                listas = [np.frombuffer(self._bigramas[b], dtype=np.int32)
+                          for b in _bigramas(objetivo) if b in self._bigramas]
+                cuenta = np.bincount(np.concatenate(listas), minlength=total) if listas else np.zeros(total, np.int64)
+                ids = np.flatnonzero(cuenta >= minimo)
+            else:
+                ids = np.arange(total)
+            longitudes = np.frombuffer(self._longitudes, dtype=np.int32)[ids]
+            ids = ids[np.abs(longitudes - len(objetivo)) <= cota]
+            # Cota inferior por letras: cada edición cambia como mucho una letra de más y una de menos
+            dif = (np.frombuffer(self._letras, dtype=np.uint8).reshape(-1, _CUBOS)[ids].astype(np.int16)
+                   - _histograma(objetivo).astype(np.int16))
+            ids = ids[np.maximum(np.clip(dif, 0, None).sum(1), np.clip(-dif, 0, None).sum(1)) <= cota]
+            claves = [self._claves[i] for i in ids]
+            # Pocas supervivientes (lo normal): bucle en Python; muchas (nombres casi iguales): NumPy
+            letras = self._matriz(ids) if len(ids) > 64 else None
+        if letras is not None:
+            distancias = _distancias(objetivo, *letras, cota).tolist()
+        else:
+            distancias = [_distancia(objetivo, k_, cota) for k_ in claves]
+        encontrados: List[Tuple[str, int]] = []
+        for k_, d in zip(claves, distancias):
+            if d <= cota:
+                encontrados.extend((x, d) for x in self._por_clave[k_])
+        encontrados.sort(key=lambda x: (x[1], len(x[0]), x[0]))
+        return encontrados[:k]
+
+    def sugerencias(self, texto: str, k: int = 10) -> List[dict]:
+        """Equivalentes, luego por prefijo y luego aproximados, sin repetir."""
+        vistos: Set[str] = set()
+        salida: List[dict] = []
+
+        def poner(nombre: str, tipo: str, distancia: Optional[int] = None) -> None:
+            if nombre not in vistos and len(salida) < k:
+                vistos.add(nombre)
+                salida.append({"nombre": nombre, "tipo": tipo} if distancia is None
+                              else {"nombre": nombre, "tipo": tipo, "distancia": distancia})
+
+        for n in self.equivalentes(texto):
+            poner(n, "exacto" if n == texto.strip() else "equivalente")
+        for n in self.prefijo(texto, k):
+            poner(n, "prefijo")
+        if len(salida) < k:
+            for n, d in self.aproximados(texto, k=k):
+                poner(n, "aproximado", d)
+        return salida
+
+    def parecidos(self, nombre: str, k: int = 5) -> List[dict]:
+        """Otros nombres que probablemente sean el mismo personaje (misma clave o a distancia acotada)."""
+        nombre = nombre.strip()
+        salida = [{"nombre": n, "distancia": 0} for n in self.equivalentes(nombre) if n != nombre]
+        ya = {s["nombre"] for s in salida} | {nombre}
+        salida += [{"nombre": n, "distancia": d} for n, d in self.aproximados(nombre, k=k + 1) if n not in ya]
+        return salida[:k]
+
+
+# ---------------------------------------------------------------------
+#  Índice compartido (se completa al avanzar la revisión del dataset)
+# ---------------------------------------------------------------------
+_INDICE: Optional[IndiceNombres] = None
+_lock = threading.Lock()
+
+
+def indice() -> IndiceNombres:
+    global _INDICE
+    if datos_personajes.DATASET is None:
+        datos_personajes.dataset()
+    with _lock:
+        rev = (datos_personajes.REVISION, len(datos_personajes.DATASET))
+        if _INDICE is None:
+            metricas.CACHE.inc(cache="nombres", resultado="fallo")
+            _INDICE = IndiceNombres(datos_personajes.DATASET.index.astype(str), revision=rev)
+        elif _INDICE.revision != rev:
+            # Sólo se añaden los nombres nuevos: la tabla no borra personajes
+            metricas.CACHE.inc(cache="nombres", resultado="fallo")
+            for n in datos_personajes.DATASET.index.astype(str):
+                _INDICE.agregar(n)
+            _INDICE.revision = rev
+        else:
+            metricas.CACHE.inc(cache="nombres", resultado="acierto")
+        return _INDICE
+
+
+def anotar(nombre: str) -> None:
+    """Registra un alta recién hecha en la tabla (sin esperar al siguiente refresco)."""
+    if _INDICE is not None:
+        _INDICE.agregar(nombre)
@@ -0,0 +1,286 @@
+# servicios/partidas_compactas.py
+"""
+Formato compacto (opcional) de los documentos de `partidas`.
+
+Formato original (`Partida.dict()` + timestamp):
+
+    {respuestas: {atributo: 0|1|null, ...}, resultado: [[nombre, p], ...],
+     acertado, propuesto, personaje_real, motivo_fallo, timestamp}
+
+Formato compacto (fmt = 1):
+
+    {fmt: 1, ra: versión del registro de atributos,
+     r1 / r0 / rn: máscaras de bits (BinData) de los atributos respondidos 1 / 0 / "no sé",
+     top: BinData con los ids SQL del top (int32) seguidos de sus probabilidades (float32),
+     acertado, propuesto, personaje_real, motivo_fallo (sólo si no son null), timestamp}
+
+El bit i (i % 8 dentro del byte i // 8) es el atributo i de la colección
+`registro_atributos` ({_id: versión, atributos: [...]}). Cada versión añade
+atributos al final de la anterior, así que una posición no cambia nunca de
+significado y las máscaras se pueden filtrar en Mongo con $bitsAllSet.
+
+- Si algún nombre del top no está en `personajes` (partidas de otro
+  catálogo) se guarda `resultado` tal cual.
+- Si alguna respuesta no es 0/1/null la partida se guarda en el formato original.
+- Las probabilidades del top vuelven con 7 cifras significativas (float32).
+
+`decodificar` / `decodificar_todas` devuelven la forma original para los dos
+formatos; `migrar` reescribe las partidas antiguas.
+"""
+from typing import Dict, Iterable, List, Optional
+import struct
+import threading
+
+import bson
+import numpy as np
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+import db_sql
+from db import db
+from servicios import registro
+
+FORMATO = 1
+COL_REGISTRO = "registro_atributos"
+CAMPOS_OPCIONALES = ("acertado", "propuesto", "personaje_real", "motivo_fallo")
+# Lo que hay que proyectar para poder decodificar una partida compacta
+PROYECCION_COMPACTA = {"fmt": 1, "ra": 1, "r1": 1, "r0": 1, "rn": 1, "top": 1}
+_CAMPOS_ORIGINALES = {"respuestas", "resultado", *CAMPOS_OPCIONALES}
+_CAMPOS_COMPACTOS = {"fmt", "ra", "r1", "r0", "rn", "top", "resultado", *CAMPOS_OPCIONALES}
+
+_REGISTRO: Dict[int, List[str]] = {}  # versión -> atributos
+_POSICION: Dict[str, int] = {}        # atributo -> bit (última versión)
+_IDS: Dict[str, int] = {}             # nombre -> id SQL (los ids no cambian: sólo crece)
+_NOMBRES: Dict[int, str] = {}
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------
+#  Registro versionado de atributos
+# ---------------------------------------------------------------------
+def _cargar_registro() -> None:
+    """Lee todas las versiones del registro (con _lock tomado)."""
+    for doc in db[COL_REGISTRO].find({}):
+        _REGISTRO[int(doc["_id"])] = list(doc["atributos"])
+    if _REGISTRO:
+        _POSICION.update((a, i) for i, a in enumerate(_REGISTRO[max(_REGISTRO)]))
+
+
+def version_para(atributos: Iterable[str]) -> int:
+    """Última versión del registro, ampliándolo si falta alguno de `atributos`."""
+    atributos = list(dict.fromkeys(atributos))
+    with _lock:
+        if not _REGISTRO or any(a not in _POSICION for a in atributos):
+            _cargar_registro()  # otro proceso puede haberlo ampliado ya
+        intentos = 0
+        while True:
+            faltan = [a for a in atributos if a not in _POSICION]
+            if _REGISTRO and not faltan:
+                return max(_REGISTRO)
+            if intentos == 3:
+                raise RuntimeError("No se pudo ampliar el registro de atributos")
+            intentos += 1
+            version = max(_REGISTRO, default=0) + 1
+            base = _REGISTRO[version - 1] if _REGISTRO else list(db_sql.ATRIBUTOS_BINARIOS)
+            nuevos = base + [a for a in faltan if a not in base]
+            try:
+                db[COL_REGISTRO].insert_one({"_id": version, "atributos": nuevos})
+            except DuplicateKeyError:
+                _cargar_registro()  # otro proceso publicó esta versión antes
+                continue
+            _REGISTRO[version] = nuevos
+            _POSICION.update((a, i) for i, a in enumerate(nuevos))
+            registro.info("registro_atributos_ampliado", version=version, atributos=len(nuevos))
+
+
+def atributos_actuales() -> List[str]:
+    """Atributos de la última versión del registro (db_sql.ATRIBUTOS_BINARIOS si aún no hay ninguna)."""
+    with _lock:
+        if not _REGISTRO:
+            _cargar_registro()
+        return list(_REGISTRO[max(_REGISTRO)]) if _REGISTRO else list(db_sql.ATRIBUTOS_BINARIOS)
+
+
+def atributos_version(version: int) -> List[str]:
+    with _lock:
+        if version not in _REGISTRO:
+            _cargar_registro()
+        if version not in _REGISTRO:
+            raise LookupError(f"Versión {version} del registro de atributos desconocida")
+        return _REGISTRO[version]
+
+
+# ---------------------------------------------------------------------
+#  Máscaras y top
+# ---------------------------------------------------------------------
+# Una partida tiene pocas decenas de respuestas: con enteros de Python sale
+# más barato que con numpy (que sí compensa al contar muchas, `contar_respuestas`).
+def _mascara(posiciones: List[int]) -> bytes:
+    n = 0
+    for i in posiciones:
+        n |= 1 << i
+    return n.to_bytes((n.bit_length() + 7) // 8, "little")
+
+
+def _posiciones(mascara: Optional[bytes]) -> List[int]:
+    n = int.from_bytes(mascara or b"", "little")
+    salida = []
+    while n:
+        bajo = n & -n
+        salida.append(bajo.bit_length() - 1)
+        n ^= bajo
+    return salida
+
+
+def _ids(nombres: Iterable[str]) -> Dict[str, int]:
+    nombres = list(nombres)
+    faltan = [n for n in nombres if n not in _IDS]
+    if faltan:
+        nuevos = db_sql.ids_personajes(faltan)
+        _IDS.update(nuevos)
+        _NOMBRES.update((i, n) for n, i in nuevos.items())
+    return {n: _IDS[n] for n in nombres if n in _IDS}
+
+
+def _nombres(ids: Iterable[int]) -> Dict[int, str]:
+    faltan = [i for i in ids if i not in _NOMBRES]
+    if faltan:
+        nuevos = db_sql.nombres_personajes(faltan)
+        _NOMBRES.update(nuevos)
+        _IDS.update((n, i) for i, n in nuevos.items())
+    return _NOMBRES
+
+
+def _codificar_top(resultado: list) -> Optional[bytes]:
+    """ids int32 + probabilidades float32, o None si algo no se puede representar."""
+    try:
+        pares = [(str(n), float(p)) for n, p in resultado]
+    except (TypeError, ValueError):
+        return None
+    ids = _ids(n for n, _ in pares)
+    if any(n not in ids for n, _ in pares):
+        return None
+    k = len(pares)
+    return struct.pack(f"<{k}i{k}f", *(ids[n] for n, _ in pares), *(p for _, p in pares))
+
+
+def _ids_top(top: bytes) -> tuple:
+    return struct.unpack_from(f"<{len(top) // 8}i", top)
+
+
+def _decodificar_top(top: bytes) -> list:
+    k = len(top) // 8
+    valores = struct.unpack(f"<{k}i{k}f", top)
+    nombres = _nombres(valores[:k])
+    return [[nombres.get(i, f"#{i}"), float(f"{p:.7g}")] for i, p in zip(valores[:k], valores[k:])]
+
+
+# ---------------------------------------------------------------------
+#  API del módulo
+# ---------------------------------------------------------------------
+def es_compacta(doc: dict) -> bool:
+    return doc.get("fmt") == FORMATO
+
+
+def codificar(doc: dict) -> Optional[dict]:
+    """Documento compacto equivalente a `doc` (formato original) o None si no se puede."""
+    respuestas = doc.get("respuestas") or {}
+    if any(v not in (0, 1, None) for v in respuestas.values()):
+        return None
+    version = version_para(respuestas)
+    grupos: Dict[object, List[int]] = {1: [], 0: [], None: []}
+    for atributo, valor in respuestas.items():
+        grupos[None if valor is None else int(valor)].append(_POSICION[atributo])
+
+    salida = {k: v for k, v in doc.items() if k == "_id"}
+    salida.update(fmt=FORMATO, ra=version, r1=_mascara(grupos[1]), r0=_mascara(grupos[0]),
+                  rn=_mascara(grupos[None]))
+    top = _codificar_top(doc.get("resultado") or [])
+    if top is None:
+        salida["resultado"] = doc.get("resultado")
+    else:
+        salida["top"] = top
+    salida.update((c, doc[c]) for c in CAMPOS_OPCIONALES if doc.get(c) is not None)
+    salida.update((k, v) for k, v in doc.items() if k not in _CAMPOS_ORIGINALES and k not in salida)
+    return salida
+
+
+def decodificar(doc: dict) -> dict:
+    """Forma original de una partida (las que ya están en formato original se devuelven igual)."""
+    if not es_compacta(doc):
+        return doc
+    atributos = atributos_version(doc["ra"])
+    valores: Dict[int, Optional[int]] = {}
+    for campo, valor in (("r1", 1), ("r0", 0), ("rn", None)):
+        for i in _posiciones(doc.get(campo)):
+            valores[i] = valor
+    salida = {
+        "respuestas": {atributos[i]: valores[i] for i in sorted(valores)},
+        "resultado": _decodificar_top(doc["top"]) if "top" in doc else doc.get("resultado", []),
+        **{c: doc.get(c) for c in CAMPOS_OPCIONALES},
+    }
+    salida.update((k, v) for k, v in doc.items() if k not in _CAMPOS_COMPACTOS)
+    return salida
+
+
+def decodificar_todas(docs: Iterable[dict]) -> List[dict]:
+    """Como `decodificar`, resolviendo los ids de todos los top con una sola consulta."""
+    docs = list(docs)
+    ids = {i for d in docs if es_compacta(d) and "top" in d for i in _ids_top(d["top"])}
+    _nombres(ids)
+    return [decodificar(d) for d in docs]
+
+
+def contar_respuestas(docs: Iterable[dict]) -> Dict[str, Dict[str, int]]:
+    """
+    {atributo: {sin_responder, respondido_0, respondido_1}} de partidas
+    compactas, contando bits de todas las máscaras de una vez. Sin responder
+    es todo lo que no es 0 ni 1: "no sé" o no preguntado.
+    """
+    docs = [d for d in docs if es_compacta(d)]
+    if not docs:
+        return {}
+    atributos = atributos_version(max(d["ra"] for d in docs))
+    ancho = (len(atributos) + 7) // 8
+    salida: Dict[str, Dict[str, int]] = {}
+    respondidas = np.zeros(len(atributos), dtype=np.int64)
+    for campo, nombre in (("r0", "respondido_0"), ("r1", "respondido_1")):
+        crudo = b"".join((d.get(campo) or b"").ljust(ancho, b"\0") for d in docs)
+        bloque = np.frombuffer(crudo, dtype=np.uint8).reshape(len(docs), ancho)
+        cuentas = np.unpackbits(bloque, axis=1, bitorder="little").sum(axis=0, dtype=np.int64)[: len(atributos)]
+        respondidas += cuentas
+        for i in np.flatnonzero(cuentas):
+            salida.setdefault(atributos[i], {})[nombre] = int(cuentas[i])
+    sin_responder = len(docs) - respondidas
+    for i in np.flatnonzero(sin_responder):
+        salida.setdefault(atributos[i], {})["sin_responder"] = int(sin_responder[i])
+    return salida
+
+
+def migrar(lote: int = 500) -> dict:
+    """
+    Reescribe en formato compacto las partidas antiguas (idempotente: las ya
+    compactas no se tocan). Devuelve cuántas se migraron y los bytes BSON antes/después.
+    """
+    col = db["partidas"]
+    migradas = omitidas = antes = despues = 0
+    ops: List[ReplaceOne] = []
+    for doc in col.find({"respuestas": {"$ne": None}}):
+        nuevo = codificar(doc)
+        if nuevo is None:
+            omitidas += 1
+            continue
+        antes += len(bson.encode(doc))
+        despues += len(bson.encode(nuevo))
+        ops.append(ReplaceOne({"_id": doc["_id"]}, nuevo))
+        if len(ops) >= lote:
+            col.bulk_write(ops, ordered=False)
+            migradas += len(ops)
+            ops = []
+    if ops:
+        col.bulk_write(ops, ordered=False)
+        migradas += len(ops)
+    registro.info("partidas_migradas", migradas=migradas, omitidas=omitidas, bytes_antes=antes,
+                  bytes_despues=despues)
+    return {"migradas": migradas, "omitidas": omitidas, "bytes_antes": antes, "bytes_despues": despues,
+            "reduccion": round(1.0 - despues / antes, 4) if antes else 0.0}
@@ -0,0 +1,144 @@
+# servicios/perfilado.py
+"""
+Perfilado opcional por petición.
+
+Con ADIVINADOR_PERFILADO=1, una petición que lleve la cabecera
+`X-Perfilar: 1` o el parámetro `?perfilar=1` se ejecuta bajo cProfile y deja
+en `config.PERFILADO_DIR` dos ficheros:
+
+    <marca>_<ruta>.pstats   -> perfil (pstats; snakeviz / flameprof / gprof2dot)
+    <marca>_<ruta>.json     -> metadatos de la petición + top de funciones
+
+El directorio se rota por tamaño total y número de ficheros (se borran los
+perfiles más antiguos). Con el perfilado deshabilitado `perfilable` devuelve
+la función intacta y no se instala ningún middleware: coste cero.
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+
+import config
+from servicios import registro
+
+# Metadatos de la petición actual si ha pedido perfilado (None si no)
+_SOLICITUD: ContextVar[Optional[dict]] = ContextVar("perfilado_solicitud", default=None)
+_rotacion_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------
+#  Middleware ASGI: marca las peticiones que piden perfilado
+# ---------------------------------------------------------------------
+class MiddlewarePerfilado:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _pide_perfilado(scope):
+            await self.app(scope, receive, send)
+            return
+        meta = {
+            "ruta": scope.get("path"),
+            "metodo": scope.get("method"),
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "cliente": (scope.get("client") or ("", 0))[0],
+            "inicio": datetime.now(timezone.utc).isoformat(),
+        }
+        token = _SOLICITUD.set(meta)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _SOLICITUD.reset(token)
+
+
+def _pide_perfilado(scope) -> bool:
+    for nombre, valor in scope.get("headers") or []:
+        if nombre == b"x-perfilar" and valor.strip() in (b"1", b"true", b"si"):
+            return True
+    qs = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return qs.get("perfilar", [""])[0] in ("1", "true", "si")
+
+
+# ---------------------------------------------------------------------
+#  Decorador para handlers
+# ---------------------------------------------------------------------
+def perfilable(fn: Callable) -> Callable:
+    """Envuelve un handler síncrono; sólo perfila si la petición lo pidió."""
+    if not config.PERFILADO_HABILITADO:
+        return fn
+
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        meta = _SOLICITUD.get()
+        if meta is None:
+            return fn(*args, **kwargs)
+        perfil = cProfile.Profile()
+        t0 = time.perf_counter()
+        error = None
+        try:
+            return perfil.runcall(fn, *args, **kwargs)
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            duracion = time.perf_counter() - t0
+            try:
+                _guardar(perfil, {**meta, "handler": fn.__qualname__, "duracion_s": round(duracion, 6), "error": error})
+            except Exception as e:  # el perfilado nunca debe romper la petición
+                registro.error("perfilado_no_guardado", error=str(e))
+
+    return envoltura
+
+
+# ---------------------------------------------------------------------
+#  Almacenamiento con límite de tamaño y rotación
+# ---------------------------------------------------------------------
+def _guardar(perfil: cProfile.Profile, meta: dict) -> str:
+    directorio = config.PERFILADO_DIR
+    os.makedirs(directorio, exist_ok=True)
+    marca = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S_%f")
+    ruta = re.sub(r"[^A-Za-z0-9]+", "_", meta.get("ruta") or "").strip("_") or "raiz"
+    base = os.path.join(directorio, f"{marca}_{ruta}")
+
+    perfil.dump_stats(base + ".pstats")
+
+    resumen = io.StringIO()
+    pstats.Stats(perfil, stream=resumen).sort_stats("cumulative").print_stats(15)
+    meta = {**meta, "pstats": os.path.basename(base + ".pstats"), "top_acumulado": resumen.getvalue()}
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    _rotar(directorio)
+    registro.info("perfil_guardado", fichero=base + ".pstats", duracion_s=meta["duracion_s"])
+    return base + ".pstats"
+
+
+def _rotar(directorio: str) -> None:
+    """Borra los perfiles más antiguos hasta cumplir PERFILADO_MAX_MB y PERFILADO_MAX_PERFILES."""
+    with _rotacion_lock:
+        perfiles = []
+        for nombre in os.listdir(directorio):
+            if not nombre.endswith(".pstats"):
+                continue
+            base = os.path.join(directorio, nombre[: -len(".pstats")])
+            tam = sum(os.path.getsize(base + ext) for ext in (".pstats", ".json") if os.path.exists(base + ext))
+            perfiles.append((nombre, base, tam))
+        perfiles.sort()  # el nombre empieza por la marca de tiempo -> orden cronológico
+
+        limite = config.PERFILADO_MAX_MB * 1024 * 1024
+        total = sum(t for _, _, t in perfiles)
+        while perfiles and (total > limite or len(perfiles) > config.PERFILADO_MAX_PERFILES):
+            _, base, tam = perfiles.pop(0)
+            for ext in (".pstats", ".json"):
+                if os.path.exists(base + ext):
+                    os.remove(base + ext)
+            total -= tam
@@ -0,0 +1,52 @@
+# servicios/registro.py
+"""
+Registro estructurado (una línea JSON por evento) con muestreo.
+
+Los eventos del camino caliente (cada /inferir, cada /pregunta_siguiente)
+se emiten sólo con probabilidad `config.LOG_MUESTREO`; los errores y los
+eventos de arranque se emiten siempre.
+"""
+import json
+import logging
+import random
+
+import config
+
+logger = logging.getLogger("adivinador")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _emitir(nivel: int, evento: str, campos: dict, traza: bool = False) -> None:
+    linea = json.dumps({"evento": evento, **campos}, ensure_ascii=False, default=str)
+    logger.log(nivel, linea, exc_info=traza)
+
+
+def muestreado(evento: str, tasa: float | None = None, **campos) -> None:
+    """Evento del camino caliente: se emite con probabilidad `tasa` (por defecto la de config)."""
+    tasa = config.LOG_MUESTREO if tasa is None else tasa
+    if tasa <= 0.0 or (tasa < 1.0 and random.random() >= tasa):
+        return
+    _emitir(logging.INFO, evento, {"muestreo": tasa, **campos})
+
+
+def info(evento: str, **campos) -> None:
+    """Evento poco frecuente (arranque, entrenamiento): siempre se emite."""
+    _emitir(logging.INFO, evento, campos)
+
+
+def aviso(evento: str, **campos) -> None:
+    _emitir(logging.WARNING, evento, campos)
+
+
+def error(evento: str, **campos) -> None:
+    _emitir(logging.ERROR, evento, campos)
+
+
+def excepcion(evento: str, **campos) -> None:
+    """Como `error`, con la traza de la excepción en curso (llamar desde un `except`)."""
+    _emitir(logging.ERROR, evento, campos, traza=True)
@@ -0,0 +1,261 @@
+# servicios/similitud.py
+"""
+Índice de similitud entre personajes sobre la matriz binaria de atributos.
+
+Dos personajes con el mismo vector de atributos no se pueden distinguir con
+ninguna secuencia de preguntas; con un solo bit de diferencia basta una
+pregunta concreta. El índice empaqueta cada vector en palabras de 64 bits
+(54 atributos -> una palabra por personaje) y calcula distancias de Hamming
+con XOR + popcount:
+
+- `vecinos(vector, k)`: k más cercanos (un XOR por palabra y personaje).
+- `grupos(distancia_max)`: grupos indistinguibles (0) o casi (1). No es
+  todos-contra-todos: con 0 se agrupan códigos iguales (ordenación) y con 1
+  se busca, para cada bit, el código con ese bit cambiado (búsqueda binaria).
+  O(A · N log N), sin pares explícitos.
+- `separadores(nombres, pesos)`: atributos que mejor parten un conjunto de
+  candidatos (entropía del reparto ponderado).
+
+El índice se reconstruye sólo cuando cambia la revisión del dataset
+(servicios/datos_personajes); las altas y upserts se anotan al momento
+(`anotar`) para que el siguiente alta ya choque con ellas.
+"""
+from __future__ import annotations
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import db_sql
+from servicios import datos_personajes, metricas
+
+if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(x).sum(axis=-1, dtype=np.int64)
+else:
+    _TABLA_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        b = x.view(np.uint8).reshape(*x.shape[:-1], -1)
+        return _TABLA_BITS[b].sum(axis=-1, dtype=np.int64)
+
+
+def empaquetar(matriz: np.ndarray) -> np.ndarray:
+    """Matriz N x A de 0/1 -> N x W de uint64 (bit j del atributo j)."""
+    n, a = matriz.shape
+    w = max(1, -(-a // 64))
+    relleno = np.zeros((n, w * 64), dtype=np.uint8)
+    relleno[:, :a] = matriz != 0
+    return np.packbits(relleno, axis=1, bitorder="little").view("<u8").astype(np.uint64, copy=False)
+
+
+def _claves(palabras: np.ndarray) -> np.ndarray:
+    """
+    Una clave ordenable por fila: el propio uint64 si cabe en una palabra
+    (hasta 64 atributos, el caso normal) o una vista void de las W palabras.
+    """
+    if palabras.shape[1] == 1:
+        return palabras[:, 0].copy()
+    palabras = np.ascontiguousarray(palabras)
+    return palabras.view(np.dtype((np.void, palabras.shape[1] * 8))).ravel()
+
+
+def _palabras(claves: np.ndarray, w: int) -> np.ndarray:
+    """Inversa de `_claves`."""
+    if w == 1:
+        return claves.reshape(-1, 1).copy()
+    return np.ascontiguousarray(claves).view(np.uint64).reshape(len(claves), w)
+
+
+class IndiceSimilitud:
+    def __init__(self, nombres: Sequence[str], matriz: np.ndarray, atributos: Sequence[str], revision=None):
+        self.nombres = list(nombres)
+        self.posicion = {n: i for i, n in enumerate(self.nombres)}
+        self.atributos = list(atributos)
+        self.columna = {a: j for j, a in enumerate(self.atributos)}
+        self.matriz = np.ascontiguousarray(matriz, dtype=np.uint8)
+        self.bits = empaquetar(self.matriz)
+        self.revision = revision
+
+    # ---- consultas ----
+    def vector(self, atributos: Dict[str, Optional[int]]) -> np.ndarray:
+        """Dict atributo -> 0/1/None como fila empaquetada (None y ausentes = 0)."""
+        fila = np.zeros((1, len(self.atributos)), dtype=np.uint8)
+        for a, v in (atributos or {}).items():
+            j = self.columna.get(a)
+            if j is not None and v:
+                fila[0, j] = 1
+        return empaquetar(fila)[0]
+
+    def con_fila(self, nombre: str, atributos: Dict[str, Optional[int]]) -> "IndiceSimilitud":
+        """
+        Copia del índice con `nombre` añadido o actualizado: si ya está sólo
+        cambian los atributos dados (como db_sql.upsert_personaje); si es
+        nuevo, los que falten son 0.
+        """
+        i = self.posicion.get(nombre)
+        fila = np.zeros(len(self.atributos), dtype=np.uint8) if i is None else self.matriz[i].copy()
+        for a, v in (atributos or {}).items():
+            j = self.columna.get(a)
+            if j is not None:
+                fila[j] = 1 if v else 0
+        if i is None:
+            return IndiceSimilitud(self.nombres + [nombre], np.vstack([self.matriz, fila]), self.atributos,
+                                   self.revision)
+        matriz = self.matriz.copy()
+        matriz[i] = fila
+        return IndiceSimilitud(self.nombres, matriz, self.atributos, self.revision)
+
+    def distancias(self, palabras: np.ndarray) -> np.ndarray:
+        return _popcount(self.bits ^ palabras)
+
+    def vecinos(self, palabras: np.ndarray, k: int = 5, excluir: Iterable[str] = ()) -> List[Tuple[str, int]]:
+        d = self.distancias(palabras)
+        excl = [self.posicion[n] for n in excluir if n in self.posicion]
+        if excl:
+            d = d.copy()
+            d[excl] = np.iinfo(np.int64).max
+        k = min(k, len(d) - len(excl))
+        if k <= 0:
+            return []
+        cand = np.argpartition(d, k - 1)[:k]
+        cand = cand[np.lexsort((cand, d[cand]))]
+        return [(self.nombres[i], int(d[i])) for i in cand]
+
+    def colisiones(self, atributos: Dict[str, Optional[int]], distancia_max: int = 1,
+                   excluir: Iterable[str] = ()) -> List[Tuple[str, int]]:
+        """Personajes a distancia <= distancia_max del vector dado (más cercanos primero)."""
+        d = self.distancias(self.vector(atributos))
+        excl = {self.posicion[n] for n in excluir if n in self.posicion}
+        idx = [i for i in np.flatnonzero(d <= distancia_max) if i not in excl]
+        idx.sort(key=lambda i: (d[i], i))
+        return [(self.nombres[i], int(d[i])) for i in idx]
+
+    def grupos(self, distancia_max: int = 0) -> List[List[str]]:
+        """
+        Componentes de personajes a distancia <= distancia_max (0 o 1) entre sí,
+        de mayor a menor. Con 1 la relación es transitiva por componentes.
+        """
+        if distancia_max not in (0, 1):
+            raise ValueError("distancia_max debe ser 0 o 1")
+        n = len(self.nombres)
+        if n == 0:
+            return []
+        claves = _claves(self.bits)
+        unicas, grupo = np.unique(claves, return_inverse=True)
+        grupo = grupo.ravel()
+        padre = np.arange(len(unicas))
+
+        def raiz(x: int) -> int:
+            while padre[x] != x:
+                padre[x] = padre[padre[x]]
+                x = padre[x]
+            return x
+
+        if distancia_max == 1:
+            palabras_unicas = _palabras(unicas, self.bits.shape[1])
+            for j in range(len(self.atributos)):
+                w, b = divmod(j, 64)
+                vecinas = palabras_unicas.copy()
+                vecinas[:, w] ^= np.uint64(1) << np.uint64(b)
+                claves_v = _claves(vecinas)
+                pos = np.searchsorted(unicas, claves_v)
+                pos = np.minimum(pos, len(unicas) - 1)
+                hay = np.flatnonzero(unicas[pos] == claves_v)
+                for u, v in zip(hay, pos[hay]):
+                    ru, rv = raiz(int(u)), raiz(int(v))
+                    if ru != rv:
+                        padre[max(ru, rv)] = min(ru, rv)
+            # Compresión de caminos vectorizada hasta que cada código apunta a su raíz
+            while True:
+                siguiente = padre[padre]
+                if np.array_equal(siguiente, padre):
+                    break
+                padre = siguiente
+            comp = padre
+        else:
+            comp = np.arange(len(unicas))
+
+        etiqueta = comp[grupo]
+        # Sólo interesan los grupos con más de un personaje
+        miembros = np.flatnonzero(np.bincount(etiqueta, minlength=len(unicas))[etiqueta] > 1)
+        orden = miembros[np.argsort(etiqueta[miembros], kind="stable")]
+        cortes = np.flatnonzero(np.diff(etiqueta[orden])) + 1
+        salida = [[self.nombres[i] for i in trozo] for trozo in np.split(orden, cortes) if len(trozo)]
+        salida.sort(key=lambda g: (-len(g), g[0]))
+        return salida
+
+    def separadores(self, nombres: Sequence[str], pesos: Optional[Sequence[float]] = None,
+                    excluir: Iterable[str] = (), limite: int = 10) -> List[dict]:
+        """
+        Atributos que mejor separan a los candidatos: entropía (bits) del reparto
+        sí/no ponderado por `pesos` (p.ej. el posterior). Devuelve quién tiene 1.
+        """
+        filas = [self.posicion[n] for n in nombres if n in self.posicion]
+        if len(filas) < 2:
+            return []
+        w = np.ones(len(filas)) if pesos is None else np.asarray(
+            [p for n, p in zip(nombres, pesos) if n in self.posicion], dtype=float)
+        w = w / w.sum() if w.sum() > 0 else np.full(len(filas), 1.0 / len(filas))
+        sub = self.matriz[filas]                       # C x A
+        p1 = np.clip(w @ sub, 0.0, 1.0)                # masa con el atributo a 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            h = -(np.where(p1 > 0, p1 * np.log2(p1), 0.0) + np.where(p1 < 1, (1 - p1) * np.log2(1 - p1), 0.0))
+        excl = set(excluir)
+        orden = [j for j in np.argsort(-h, kind="stable") if h[j] > 0 and self.atributos[j] not in excl]
+        nombres_ok = [self.nombres[i] for i in filas]
+        return [
+            {
+                "atributo": self.atributos[j],
+                "entropia": round(float(h[j]), 6),
+                "p1": round(float(p1[j]), 6),
+                "con_1": [n for n, x in zip(nombres_ok, sub[:, j]) if x],
+            }
+            for j in orden[:limite]
+        ]
+
+
+# ---------------------------------------------------------------------
+#  Índice compartido (se reconstruye al cambiar la revisión del dataset)
+# ---------------------------------------------------------------------
+_INDICE: Optional[IndiceSimilitud] = None
+_lock = threading.Lock()
+
+
+def desde_dataframe(df, revision=None) -> IndiceSimilitud:
+    atributos = [a for a in db_sql.ATRIBUTOS_BINARIOS if a in df.columns]
+    matriz = df[atributos].fillna(0).to_numpy(dtype=np.uint8)
+    return IndiceSimilitud(df["nombre"].astype(str).tolist(), matriz, atributos, revision)
+
+
+def indice() -> IndiceSimilitud:
+    global _INDICE
+    actual, dataset = _INDICE, datos_personajes.DATASET
+    if actual is not None and dataset is not None and actual.revision == (datos_personajes.REVISION, len(dataset)):
+        metricas.CACHE.inc(cache="similitud", resultado="acierto")
+        return actual
+    # Como en servicios/bitmaps: la instantánea se toma fuera de _lock
+    # (datos_personajes.recargar descarta este índice con su lock tomado).
+    df, revision = datos_personajes.instantanea()
+    rev = (revision, len(df))
+    nuevo = desde_dataframe(df, revision=rev)
+    with _lock:
+        if _INDICE is None or _INDICE.revision is None or _INDICE.revision < rev:
+            metricas.CACHE.inc(cache="similitud", resultado="fallo")
+            _INDICE = nuevo
+        return _INDICE
+
+
+def anotar(nombre: str, atributos: Dict[str, Optional[int]]) -> None:
+    """Registra un alta/upsert recién hecho en el índice (sin esperar al siguiente refresco)."""
+    global _INDICE
+    with _lock:
+        if _INDICE is not None:
+            _INDICE = _INDICE.con_fila(nombre, atributos)
+
+
+def descartar() -> None:
+    """Olvida el índice (tras datos_personajes.recargar: la revisión puede no haber cambiado)."""
+    global _INDICE
+    with _lock:
+        _INDICE = None
@@ -0,0 +1,249 @@
+# servicios/simulador.py
+"""
+Autojuego por lotes sobre todo el catálogo (naive_bayes).
+
+Juega una partida por personaje, todas a la vez y turno a turno: en cada
+turno las partidas activas se reducen a sus estados distintos (las que han
+recibido las mismas respuestas están en el mismo estado; al principio, todas
+en uno), se calcula la siguiente pregunta de cada estado con la ganancia de
+información vectorizada sobre una matriz (estados x personajes) y cada
+partida contesta con los atributos reales de su objetivo. Una partida acaba
+cuando el top-1 alcanza el umbral, como /turno. Los grupos categóricos
+(config.IG_GRUPOS) se preguntan y contestan de una vez, igual que en el motor.
+
+Las cuentas son las de servicios/ig_vectorizado con una dimensión más, así
+que las partidas coinciden con las que se jugarían contra el motor.
+"""
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import config
+from servicios import ig_vectorizado as igv
+from servicios.ig_vectorizado import _log_normalizado, _softmax_filas, entropia_filas
+
+UMBRAL = 0.5  # igual que /inferir y /turno
+MAX_PREGUNTAS = 60
+LOTE = 64  # estados que se evalúan a la vez
+
+
+def verdad_desde_df(df, matrices: dict) -> np.ndarray:
+    """
+    Atributos reales (personajes x attrs, 0/1) alineados con `matrices`.
+    Con varias filas por personaje vale la mayoría.
+    """
+    if "personaje" not in df.columns:
+        df = df.assign(personaje=df["nombre"])
+    cols = [a for a in matrices["attrs"] if a in df.columns]
+    medias = df.groupby(df["personaje"].astype(str))[cols].mean()
+    medias = medias.reindex(index=matrices["personajes"], columns=matrices["attrs"]).fillna(0.0)
+    return (medias.to_numpy() >= 0.5).astype(np.int8)
+
+
+# ---------------------------------------------------------------------
+#  Posterior y ganancia por lotes de estados
+# ---------------------------------------------------------------------
+def _estado(m: dict, evidencia: np.ndarray) -> dict:
+    """
+    `igv.estado_posterior` de cada fila de `evidencia` (estados x attrs, con
+    -1 = sin respuesta); cada pieza lleva la dimensión de estados delante.
+    """
+    n_r = m["prior_log"].shape[0]
+    uno = (evidencia == 1).astype(np.float64)
+    cero = (evidencia == 0).astype(np.float64)
+    sumas = np.empty((len(evidencia), n_r, m["prior_log"].shape[1]))
+    usados = np.empty((len(evidencia), n_r), dtype=np.int64)
+    for r in range(n_r):
+        en_r = m["red"] == r
+        sumas[:, r] = m["prior_log"][r] + uno[:, en_r] @ m["log1"][en_r] + cero[:, en_r] @ m["log0"][en_r]
+        usados[:, r] = (evidencia[:, en_r] >= 0).sum(axis=1)
+    log_post = _log_normalizado(sumas)
+    pesos = np.maximum(1, usados).astype(np.float64)
+    acumulado = np.sum(pesos[:, :, None] * log_post, axis=1)
+    return {"sumas": sumas, "usados": usados, "log_post": log_post, "pesos": pesos,
+            "acumulado": acumulado, "probs": _softmax_filas(acumulado)}
+
+
+def _ganancias(m: dict, est: dict, candidatos: np.ndarray) -> np.ndarray:
+    """`igv.ganancias` de cada estado: (estados, candidatos)."""
+    log1, log0, red = m["log1"], m["log0"], m["red"]
+    probs = est["probs"]
+    n_e, n_p = probs.shape
+    h_cur = entropia_filas(probs)
+    gain = np.empty((n_e, len(candidatos)))
+    bloque = max(1, igv.MAX_CELDAS_BLOQUE // max(1, n_e * n_p))
+    filas = np.arange(n_e)[:, None]
+    for ini in range(0, len(candidatos), bloque):
+        idx = candidatos[ini:ini + bloque]
+        r = red[idx]
+        base = est["acumulado"][:, None, :] - est["pesos"][filas, r][:, :, None] * est["log_post"][:, r, :]
+        peso_nuevo = np.maximum(1, est["usados"][filas, r] + 1).astype(np.float64)[:, :, None]
+        p1 = np.clip(probs @ np.exp(log1[idx]).T, 0.0, 1.0)
+        h = {}
+        for v, tabla in ((1, log1), (0, log0)):
+            lp = _log_normalizado(est["sumas"][:, r, :] + tabla[idx][None, :, :])
+            h[v] = entropia_filas(_softmax_filas(base + peso_nuevo * lp))
+        gain[:, ini:ini + len(idx)] = h_cur[:, None] - (p1 * h[1] + (1.0 - p1) * h[0])
+    return gain
+
+
+def _ganancia_grupo(est: dict, grupo: dict) -> np.ndarray:
+    """`igv.ganancia_grupo` de cada estado: (estados,)."""
+    r = grupo["red"]
+    peso_nuevo = np.maximum(1, est["usados"][:, r] + len(grupo["indices"])).astype(np.float64)
+    base = est["acumulado"] - est["pesos"][:, r, None] * est["log_post"][:, r, :]
+    lp = _log_normalizado(est["sumas"][:, r, None, :] + grupo["logs"][None, :, :])  # (E, m + 1, P)
+    h_resp = entropia_filas(_softmax_filas(base[:, None, :] + peso_nuevo[:, None, None] * lp))
+    p_resp = np.clip(est["probs"] @ grupo["cond"].T, 0.0, 1.0)
+    return entropia_filas(est["probs"]) - np.sum(p_resp * h_resp, axis=1)
+
+
+def _grupos(m: dict) -> List[dict]:
+    """Grupos de las matrices con sus tablas por respuesta (no dependen del estado)."""
+    if not config.IG_GRUPOS:
+        return []
+    salida = []
+    for nombre, g in (m.get("grupos") or {}).items():
+        idx = g["indices"]
+        ninguno = np.sum(m["log0"][idx], axis=0)
+        logs = np.vstack([ninguno + m["log1"][idx] - m["log0"][idx], ninguno[None, :]])
+        cond = np.exp(logs - np.max(logs, axis=0))
+        cond /= np.sum(cond, axis=0)
+        salida.append({"nombre": nombre, "indices": idx, "red": int(m["red"][idx[0]]),
+                       "logs": logs, "cond": cond})
+    return salida
+
+
+def _decidir(m: dict, grupos: List[dict], sueltos: np.ndarray, evidencia: np.ndarray):
+    """
+    Para cada estado: (top-1, su probabilidad, acción). Acción = índice del
+    atributo a preguntar, n_attrs + k para el grupo k o -1 si no queda nada.
+    Como el motor: empates al menor índice de atributo y un grupo sólo gana
+    si supera estrictamente al mejor atributo suelto.
+    """
+    est = _estado(m, evidencia)
+    probs = est["probs"]
+    top = np.argmax(probs, axis=1)
+    p_top = probs[np.arange(len(probs)), top]
+
+    n_a = len(m["attrs"])
+    preguntado = evidencia >= 0
+    gain = np.full((len(evidencia), n_a), -np.inf)
+    pendientes = sueltos[~preguntado[:, sueltos].all(axis=0)]
+    if len(pendientes):
+        gain[:, pendientes] = np.where(preguntado[:, pendientes], -np.inf, _ganancias(m, est, pendientes))
+    accion = np.argmax(gain, axis=1)
+    mejor = gain[np.arange(len(gain)), accion]
+    for k, grupo in enumerate(grupos):
+        abiertos = ~preguntado[:, grupo["indices"]].any(axis=1)
+        if not abiertos.any():
+            continue
+        g_grupo = np.where(abiertos, _ganancia_grupo(est, grupo), -np.inf)
+        gana = g_grupo > mejor
+        accion[gana] = n_a + k
+        mejor[gana] = g_grupo[gana]
+    accion[~np.isfinite(mejor)] = -1
+    return top, p_top, accion
+
+
+# ---------------------------------------------------------------------
+#  Simulación
+# ---------------------------------------------------------------------
+def simular(matrices: dict, verdad: np.ndarray, objetivos: Optional[Sequence[int]] = None,
+            umbral: float = UMBRAL, max_preguntas: int = MAX_PREGUNTAS, lote: int = LOTE) -> dict:
+    """
+    Juega una partida por cada objetivo (por defecto, todo el catálogo) con
+    respuestas reales (`verdad`, ver `verdad_desde_df`). Una partida acaba al
+    alcanzar `umbral`, al llegar a `max_preguntas` o al quedarse sin preguntas.
+
+    Devuelve {"personajes": [{nombre, preguntas, acierto, propuesto, p}],
+    "resumen": {partidas, aciertos, fallos, media, p50, p90, max, estados,
+    turnos, segundos}}. Acierto = se alcanzó el umbral y el top-1 es el
+    objetivo; `estados` son los posteriors distintos evaluados para `turnos`.
+    """
+    t0 = time.perf_counter()
+    m = matrices
+    nombres = m["personajes"]
+    n_a = len(m["attrs"])
+    objetivos = np.arange(len(nombres)) if objetivos is None else np.asarray(objetivos, dtype=np.int64)
+    n_o = len(objetivos)
+    grupos = _grupos(m)
+    en_grupo = np.zeros(n_a, dtype=bool)
+    for grupo in grupos:
+        en_grupo[grupo["indices"]] = True
+    sueltos = np.flatnonzero(~en_grupo)
+
+    verdad_o = verdad[objetivos]
+    evidencia = np.full((n_o, n_a), -1, dtype=np.int8)
+    preguntas = np.zeros(n_o, dtype=np.int64)
+    propuesto = np.zeros(n_o, dtype=np.int64)
+    p_prop = np.zeros(n_o)
+    alcanzado = np.zeros(n_o, dtype=bool)
+    activas = np.arange(n_o)
+    n_estados = n_turnos = 0
+
+    for turno in range(max_preguntas + 1):
+        if not len(activas):
+            break
+        unicos, inversa = np.unique(evidencia[activas], axis=0, return_inverse=True)
+        inversa = inversa.ravel()
+        top = np.empty(len(unicos), dtype=np.int64)
+        p_top = np.empty(len(unicos))
+        accion = np.empty(len(unicos), dtype=np.int64)
+        for ini in range(0, len(unicos), max(1, lote)):
+            sl = slice(ini, ini + lote)
+            top[sl], p_top[sl], accion[sl] = _decidir(m, grupos, sueltos, unicos[sl])
+        n_estados += len(unicos)
+        n_turnos += len(activas)
+
+        acc = accion[inversa]
+        fin = (p_top[inversa] >= umbral) | (acc < 0) | (turno >= max_preguntas)
+        acaban = activas[fin]
+        propuesto[acaban] = top[inversa[fin]]
+        p_prop[acaban] = p_top[inversa[fin]]
+        alcanzado[acaban] = p_top[inversa[fin]] >= umbral
+
+        activas, acc = activas[~fin], acc[~fin]
+        preguntas[activas] += 1
+        binarias = acc < n_a
+        g, i = activas[binarias], acc[binarias]
+        evidencia[g, i] = verdad_o[g, i]
+        for k, grupo in enumerate(grupos):
+            g = activas[acc == n_a + k]
+            if not len(g):
+                continue
+            # Respuesta categórica: el primer miembro que el objetivo tiene a 1, o "ninguno"
+            reales = verdad_o[np.ix_(g, grupo["indices"])]
+            primero = np.argmax(reales, axis=1)
+            una = np.zeros_like(reales)
+            hay = reales.any(axis=1)
+            una[hay, primero[hay]] = 1
+            evidencia[np.ix_(g, grupo["indices"])] = una
+
+    personajes: List[Dict] = []
+    for j, o in enumerate(objetivos.tolist()):
+        personajes.append({
+            "nombre": nombres[o],
+            "preguntas": int(preguntas[j]),
+            "acierto": bool(alcanzado[j] and propuesto[j] == o),
+            "propuesto": nombres[propuesto[j]],
+            "p": round(float(p_prop[j]), 4),
+        })
+    aciertos = sum(r["acierto"] for r in personajes)
+    n = preguntas if n_o else np.zeros(1)
+    return {
+        "personajes": personajes,
+        "resumen": {
+            "partidas": n_o,
+            "aciertos": aciertos,
+            "fallos": n_o - aciertos,
+            "media": round(float(np.mean(n)), 3),
+            "p50": float(np.percentile(n, 50)),
+            "p90": float(np.percentile(n, 90)),
+            "max": int(np.max(n)),
+            "estados": n_estados,
+            "turnos": n_turnos,
+            "segundos": round(time.perf_counter() - t0, 3),
+        },
+    }
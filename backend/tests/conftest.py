@@ -0,0 +1,16 @@
+# tests/conftest.py
+"""
+Comprobaciones de los caminos optimizados frente a su referencia sobre
+catálogos sintéticos pequeños (benchmarks/sintetico; sin MySQL ni Mongo).
+
+Uso (desde backend/):
+    python -m pytest -q
+"""
+import os
+import sys
+
+os.environ.setdefault("ADIVINADOR_LOG_MUESTREO", "0")
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for ruta in (BACKEND, os.path.join(BACKEND, "benchmarks")):
+    if ruta not in sys.path:
+        sys.path.insert(0, ruta)
@@ -0,0 +1,71 @@
+# tests/test_bitmaps.py
+"""Filtro estricto con bitmaps frente a filtrar la tabla con pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import sintetico
+from servicios import bitmaps, naive_bayes
+
+N_PERSONAJES = 500  # más de 64: varias palabras por bitmap
+
+
+@pytest.fixture()
+def tabla():
+    return sintetico.dataframe_sintetico(N_PERSONAJES, seed=1).drop(columns=["id"])
+
+
+def _referencia(df, respuestas):
+    mascara = np.ones(len(df), dtype=bool)
+    for a, v in respuestas.items():
+        if a in df.columns and v in (0, 1):
+            mascara &= df[a].fillna(0).to_numpy() == v
+    return df["nombre"][mascara].tolist()
+
+
+def _casos(df, atributos, seed=0):
+    rng = np.random.default_rng(seed)
+    yield {}
+    for n in (1, 2, 4, 8):
+        fila = df.iloc[int(rng.integers(len(df)))]
+        yield {a: int(fila[a]) for a in rng.choice(atributos, size=n, replace=False)}
+    yield {a: int(rng.integers(2)) for a in rng.choice(atributos, size=6, replace=False)}  # suele quedar vacío
+    yield {atributos[0]: None, atributos[1]: 1, "no_existe": 1}
+
+
+def test_candidatos_iguales_a_pandas(tabla):
+    atributos = [c for c in tabla.columns if c != "nombre"]
+    indice = bitmaps.desde_dataframe(tabla, atributos=atributos)
+    for respuestas in _casos(tabla, atributos):
+        candidatos = indice.filtrar(respuestas)
+        esperado = _referencia(tabla, respuestas)
+        assert candidatos.nombres() == esperado
+        assert candidatos.total == len(esperado)
+
+
+def test_candidatos_tras_aplicar_cambios(tabla):
+    atributos = [c for c in tabla.columns if c != "nombre"]
+    indice = bitmaps.desde_dataframe(tabla, atributos=atributos)
+    rng = np.random.default_rng(7)
+    cambiadas = tabla.sample(40, random_state=7).copy()
+    cambiadas[atributos] = (rng.random((len(cambiadas), len(atributos))) < 0.5).astype(np.int8)
+    nuevas = sintetico.dataframe_sintetico(100, seed=8).drop(columns=["id"])
+    nuevas["nombre"] = [f"nuevo_{i}" for i in range(len(nuevas))]
+    delta = pd.concat([cambiadas, nuevas], ignore_index=True)
+
+    assert indice.aplicar_cambios(delta) == {"actualizados": 40, "nuevos": 100}
+    actual = pd.concat([tabla.set_index("nombre").drop(index=cambiadas["nombre"]).reset_index(), delta])
+    actual = actual.set_index("nombre").loc[indice.nombres].reset_index()  # orden del índice
+    for respuestas in _casos(actual, atributos, seed=1):
+        assert indice.filtrar(respuestas).nombres() == _referencia(actual, respuestas)
+
+
+def test_posterior_estricto_solo_en_candidatos(tabla):
+    atributos = [c for c in tabla.columns if c != "nombre"]
+    indice = bitmaps.desde_dataframe(tabla, atributos=atributos)
+    snap = naive_bayes.construir(tabla)
+    respuestas = {a: int(tabla.iloc[3][a]) for a in atributos[:4]}
+    filtro = indice.filtrar(respuestas)
+    personajes, probs = naive_bayes.posterior(respuestas, personajes=filtro, snap=snap)
+    assert sorted(np.asarray(personajes)[probs > 0].tolist()) == sorted(filtro.nombres())
+    assert probs.sum() == pytest.approx(1.0)
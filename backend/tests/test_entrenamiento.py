@@ -0,0 +1,60 @@
+# tests/test_entrenamiento.py
+"""Entrenamiento en una pasada (naive_bayes._tablas) frente al de antes, red a red y atributo a atributo."""
+import numpy as np
+import pytest
+
+import sintetico
+from servicios import naive_bayes
+from servicios.naive_bayes import ALPHA, EPS
+
+
+def _referencia(df, rutas_config):
+    """Entrenamiento anterior: fillna/astype de toda la tabla y un groupby por atributo y red."""
+    df = df.copy()
+    df["personaje"] = df["nombre"]
+    bin_cols = [c for c in df.columns if c not in ("personaje", "nombre", "id")]
+    df[bin_cols] = df[bin_cols].fillna(0).astype(int)
+    personajes = list(df["personaje"].astype(str).unique())
+    modelos = {}
+    for red, ruta in rutas_config.items():
+        attrs = [a for a in naive_bayes._cargar_config(ruta) if a in df.columns]
+        sub = df[["personaje"] + attrs]
+        n_p = sub["personaje"].value_counts().reindex(personajes, fill_value=0).astype(float)
+        prior = (n_p + ALPHA) / (float(n_p.sum()) + ALPHA * len(personajes))
+        attr_logs = {}
+        for a in attrs:
+            unos = sub.groupby("personaje")[a].sum().reindex(personajes, fill_value=0).astype(float)
+            p1 = (unos + ALPHA) / (n_p + 2.0 * ALPHA)
+            attr_logs[a] = {1: np.log(np.clip(p1.values, EPS, None)), 0: np.log(np.clip(1.0 - p1.values, EPS, None))}
+        modelos[red] = {"personajes": personajes, "prior_log": np.log(np.clip(prior.values, EPS, None)),
+                        "attr_logs": attr_logs, "attrs": attrs}
+    return modelos
+
+
+def _tabla(repetidas: int, huecos: bool):
+    df = sintetico.dataframe_sintetico(400, seed=2).drop(columns=["id"])
+    rng = np.random.default_rng(2)
+    if repetidas > 1:  # varias filas por personaje, intercaladas
+        df = df.loc[df.index.repeat(repetidas)].sample(frac=1.0, random_state=2).reset_index(drop=True)
+        cols = df.columns[1:]
+        df[cols] = (rng.random((len(df), len(cols))) < 0.3).astype(np.int8)
+    if huecos:
+        cols = df.columns[1:]
+        df[cols] = df[cols].astype(float).mask(rng.random((len(df), len(cols))) < 0.1)
+    return df
+
+
+@pytest.mark.parametrize("repetidas,huecos", [(1, False), (1, True), (3, False), (3, True)])
+def test_tablas_iguales_a_la_referencia(repetidas, huecos):
+    df = _tabla(repetidas, huecos)
+    modelos = naive_bayes.entrenar_modelos(df, naive_bayes.RUTAS_CONFIG)
+    ref = _referencia(df, naive_bayes.RUTAS_CONFIG)
+    assert list(modelos) == list(ref)
+    for red, esperado in ref.items():
+        m = modelos[red]
+        assert m["personajes"] == esperado["personajes"]
+        assert m["attrs"] == esperado["attrs"]
+        np.testing.assert_array_equal(m["prior_log"], esperado["prior_log"])
+        for a in esperado["attrs"]:
+            for v in (0, 1):
+                np.testing.assert_array_equal(m["attr_logs"][a][v], esperado["attr_logs"][a][v])
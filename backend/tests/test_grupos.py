@@ -0,0 +1,50 @@
+# tests/test_grupos.py
+"""Una pregunta de grupo contestada por HTTP ({miembro: 1}) da el mismo posterior que por /ws/partida."""
+import numpy as np
+import pytest
+
+import config
+import sintetico
+from rutas.partida_ws import EstadoPartida
+from servicios import naive_bayes
+from servicios.motores import MotorNaiveBayes
+
+
+@pytest.fixture()
+def snap(monkeypatch):
+    monkeypatch.setattr(config, "IG_GRUPOS", True)
+    snap = naive_bayes.construir(sintetico.dataframe_sintetico(300, seed=4).drop(columns=["id"]))
+    naive_bayes.publicar(snap)
+    assert snap.matrices["grupos"]
+    return snap
+
+
+def _por_ws(grupo, miembros, valor, previas):
+    """Posterior tras contestar el grupo ya preguntado con {"t": "g"} por /ws/partida."""
+    partida = EstadoPartida(MotorNaiveBayes())
+    partida.respuestas.update(previas)
+    partida.grupos[grupo] = miembros
+    assert partida.aplicar({"t": "g", "g": grupo, "v": valor}) is None
+    return naive_bayes.posterior(partida.respuestas)[1]
+
+
+def test_opcion_a_1_igual_que_ws(snap):
+    for grupo, g in snap.matrices["grupos"].items():
+        previas = {g["atributos"][0]: 0}  # un miembro ya contestado antes
+        miembros = [a for a in g["atributos"] if a not in previas]
+        for elegido in miembros:
+            _, http = naive_bayes.posterior({**previas, elegido: 1})
+            np.testing.assert_allclose(http, _por_ws(grupo, miembros, elegido, previas), rtol=0, atol=1e-15)
+
+
+def test_ninguna_igual_que_ws(snap):
+    for grupo, g in snap.matrices["grupos"].items():
+        _, http = naive_bayes.posterior({grupo: 0})
+        np.testing.assert_allclose(http, _por_ws(grupo, list(g["atributos"]), "", {}), rtol=0, atol=1e-15)
+
+
+def test_sin_grupos_no_completa(snap, monkeypatch):
+    monkeypatch.setattr(config, "IG_GRUPOS", False)
+    g = next(iter(snap.matrices["grupos"].values()))
+    respuestas = {g["atributos"][0]: 1}
+    assert naive_bayes._respuestas_grupo(respuestas, snap) is respuestas
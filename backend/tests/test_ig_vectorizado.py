@@ -0,0 +1,61 @@
+# tests/test_ig_vectorizado.py
+"""Ganancia de información vectorizada (local y en el pool de procesos) frente al cálculo escalar."""
+import numpy as np
+import pytest
+
+import sintetico
+from servicios import ig_paralelo, naive_bayes
+from servicios import ig_vectorizado as igv
+
+N_PERSONAJES = 300
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    sint = sintetico.modelos_sinteticos(N_PERSONAJES, seed=3)
+    return sint, naive_bayes.Instantanea.desde_modelos(sint["modelos"])
+
+
+def _ganancia_escalar(attr, respuestas, snap):
+    """Camino de antes: tres posteriores completos por atributo (H actual, si 1, si 0)."""
+    personajes, p_cur = naive_bayes._posterior_actual(respuestas, snap)
+    p1 = min(1.0, max(0.0, naive_bayes._p_attr_1(attr, personajes, p_cur, snap)))
+    h = {v: naive_bayes._entropia(naive_bayes._posterior_actual({**respuestas, attr: v}, snap)[1]) for v in (0, 1)}
+    return naive_bayes._entropia(p_cur) - (p1 * h[1] + (1.0 - p1) * h[0])
+
+
+def _casos(sint):
+    yield {}
+    for i, n in ((0, 3), (17, 6), (123, 10)):
+        yield sintetico.respuestas_de(i, sint, n=n, seed=i)
+    yield {**sintetico.respuestas_de(5, sint, n=4, seed=5), sint["atributos"][-1]: None}
+
+
+def test_posterior_igual_al_escalar(catalogo):
+    sint, snap = catalogo
+    m = snap.matrices
+    for respuestas in _casos(sint):
+        estado = igv.estado_posterior(m["log1"], m["log0"], m["red"], m["prior_log"],
+                                      igv.codificar_respuestas(m["indice"], respuestas))
+        _, esperado = naive_bayes._posterior_actual(respuestas, snap)
+        np.testing.assert_allclose(estado["probs"], esperado, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("ejecutor", ["local", "procesos"])
+def test_ganancias_y_orden_iguales_al_escalar(catalogo, ejecutor):
+    sint, snap = catalogo
+    m = snap.matrices
+    try:
+        for respuestas in _casos(sint):
+            candidatos = [a for a in m["attrs"] if respuestas.get(a) is None]
+            attrs, gain, *_ = ig_paralelo.evaluar_candidatos(m, snap.version, respuestas, candidatos,
+                                                            ejecutor=ejecutor, procesos=2)
+            esperado = np.asarray([_ganancia_escalar(a, respuestas, snap) for a in attrs])
+            np.testing.assert_allclose(gain, esperado, rtol=0, atol=1e-9)
+            # Mismo orden salvo empates: el escalar no crece siguiendo el orden vectorizado
+            orden = np.argsort(-gain, kind="stable")
+            assert np.all(np.diff(esperado[orden]) <= 1e-9)
+            mejor = igv.mejor_candidato([m["indice"][a] for a in attrs], gain)
+            assert esperado[mejor] >= esperado.max() - 1e-9
+    finally:
+        ig_paralelo.cerrar_pool()
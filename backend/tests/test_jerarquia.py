@@ -0,0 +1,69 @@
+# tests/test_jerarquia.py
+"""Posterior jerárquico frente al plano: la variación total no pasa de la cota que devuelve."""
+import numpy as np
+import pytest
+
+import config
+import sintetico
+from servicios import ig_vectorizado as igv
+from servicios import jerarquia, naive_bayes
+
+N_PERSONAJES = 3000
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    """(instantánea, matriz real) con personajes casi iguales a unos pocos perfiles."""
+    rng = np.random.default_rng(0)
+    grupos = sintetico.atributos_por_red(1)
+    todos = [a for attrs in grupos.values() for a in attrs]
+    perfiles = rng.random((60, len(todos))) < 0.2
+    x = (perfiles[rng.integers(len(perfiles), size=N_PERSONAJES)]
+         ^ (rng.random((N_PERSONAJES, len(todos))) < 0.02)).astype(np.int8)
+    p1 = (x + sintetico.ALPHA) / (1.0 + 2.0 * sintetico.ALPHA)
+    log1, log0 = np.log(p1), np.log(1.0 - p1)
+    personajes = [f"personaje_{i}" for i in range(N_PERSONAJES)]
+    modelos, col = {}, 0
+    for red, attrs in grupos.items():
+        modelos[red] = {
+            "personajes": personajes,
+            "prior_log": np.full(N_PERSONAJES, -np.log(N_PERSONAJES)),
+            "attr_logs": {a: {1: log1[:, col + j], 0: log0[:, col + j]} for j, a in enumerate(attrs)},
+            "attrs": attrs,
+        }
+        col += len(attrs)
+    return naive_bayes.Instantanea.desde_modelos(modelos), x
+
+
+def _evidencias(x, n_attrs):
+    rng = np.random.default_rng(1)
+    yield ()
+    for objetivo, n in ((0, 2), (11, 5), (222, 10), (1999, 20)):
+        cols = rng.choice(n_attrs, size=n, replace=False)
+        yield tuple((int(c), int(x[objetivo, c])) for c in cols)
+
+
+@pytest.mark.parametrize("tolerancia", [0.0, 1e-3, 1e-2])
+def test_error_dentro_de_la_cota(catalogo, tolerancia):
+    snap, x = catalogo
+    m = snap.matrices
+    indice = jerarquia.Jerarquia(m, hoja=16)
+    for evidencia in _evidencias(x, len(m["attrs"])):
+        res = indice.posterior(evidencia, tolerancia)
+        exacto = igv.estado_posterior(m["log1"], m["log0"], m["red"], m["prior_log"], evidencia)["probs"]
+        aprox = indice.densificar(res)
+        variacion = 0.5 * float(np.abs(aprox - exacto).sum())
+        assert aprox.sum() == pytest.approx(1.0)
+        assert variacion <= res["error"] + 1e-9
+        assert res["error"] <= tolerancia + 1e-9
+
+
+def test_posterior_del_motor_con_jerarquia(catalogo, monkeypatch):
+    snap, x = catalogo
+    monkeypatch.setattr(config, "JERARQUIA_TOLERANCIA", 1e-3)
+    monkeypatch.setattr(config, "JERARQUIA_MIN_PERSONAJES", 0)
+    attrs = snap.matrices["attrs"]
+    respuestas = {attrs[c]: int(x[42, c]) for c in range(0, len(attrs), 4)}
+    _, probs = naive_bayes.posterior(respuestas, snap=snap)
+    _, exacto = naive_bayes._posterior_actual(respuestas, snap)
+    assert 0.5 * float(np.abs(probs - exacto).sum()) <= 1e-3 + 1e-9